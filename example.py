@@ -1,4 +1,4 @@
-from page_painter import PagePainter
+from src.core.page_painter import PagePainter
 import os
 
 def main():
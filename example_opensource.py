@@ -1,4 +1,4 @@
-from page_painter_opensource import PagePainter
+from src.backends.page_painter_opensource import PagePainter
 import os
 
 def main():
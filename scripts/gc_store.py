@@ -0,0 +1,20 @@
+import argparse
+import os
+from src.utils.content_store import DEFAULT_STORE_DIR, ContentStore
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove stored images that no book directory uses any more")
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR, help="content store directory")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be removed")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.store):
+        print(f"Error: Directory not found: {args.store}")
+        raise SystemExit(1)
+
+    count, size = ContentStore(args.store).gc(dry_run=args.dry_run)
+    action = "Would remove" if args.dry_run else "Removed"
+    print(f"{action} {count} unreferenced file(s), {size / 1024 / 1024:.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import os
+from src.core.book_generator import BACKENDS, BookGenerator
+from src.core.illustration_cache import DEFAULT_CACHE_DIR, IllustrationCache
+from src.utils.content_store import DEFAULT_STORE_DIR, ContentStore
+from src.core.async_book_generator import AsyncBookGenerator
+from src.core.batch import BatchGenerator, check_manifest, iter_manifest
+from src.utils.metrics import METRICS
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate many books with the models loaded once")
+    parser.add_argument("source", help="directory of book JSON files or JSONL manifest")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="opensource")
+    parser.add_argument("--fallback", choices=sorted(BACKENDS), nargs="+", default=[],
+                        help="backends to use, in order, while the previous one is failing")
+    parser.add_argument("--workers", type=int, default=1, help="pages generated at the same time")
+    parser.add_argument("--vector-text", action="store_true", help="leave the text to the PDF builder")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="drive all pages from one event loop instead of a thread pool")
+    parser.add_argument("--concurrency", type=int, default=64, help="illustration requests in flight with --async")
+    parser.add_argument("--samples", type=int, default=1,
+                        help="candidate illustrations per page in one request, the best is kept")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_DIR,
+                        help=f"keep illustrations and other candidates in a cache directory (default {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--strength", type=float,
+                        help="start each page from the previous page's illustration (opensource backend)")
+    parser.add_argument("--store", nargs="?", const=DEFAULT_STORE_DIR,
+                        help=f"keep identical images once, hard linked into the books (default {DEFAULT_STORE_DIR})")
+    parser.add_argument("--memory-budget", type=int, metavar="MB",
+                        help="report peak memory per stage and release buffers above this budget")
+    parser.add_argument("--encoding",
+                        help="image format: png[:level], png-palette, webp[:quality] or jpeg[:quality]")
+    parser.add_argument("--encoders", type=int, help="processes encoding images (default: one per CPU)")
+    parser.add_argument("--deadline", type=float, metavar="MINUTES",
+                        help="share the pages of --backend and --fallback so the batch is done in time")
+    parser.add_argument("--budget", type=float, metavar="DOLLARS", help="most the paid backends may cost")
+    parser.add_argument("--profile", nargs="?", const="output/profile", metavar="DIR",
+                        help="write cProfile statistics, collapsed stacks and the top functions per stage here")
+    parser.add_argument("--metrics", nargs="?", const="output/metrics.prom", metavar="FILE",
+                        help="write counters and histograms of the run to this file in the Prometheus text format")
+    args = parser.parse_args()
+    backend = ",".join([args.backend] + args.fallback)
+
+    if not os.path.exists(args.source):
+        print(f"Error: File not found: {args.source}")
+        raise SystemExit(1)
+
+    # Create output directory if it doesn't exist
+    os.makedirs("output", exist_ok=True)
+
+    cache = IllustrationCache(args.cache) if args.cache else None
+    store = ContentStore(args.store) if args.store else None
+    generator = BookGenerator(backend=backend, samples=args.samples, cache=cache, strength=args.strength,
+                              store=store, memory_budget=args.memory_budget, encoding=args.encoding,
+                              encoders=args.encoders, budget=args.budget, profile=args.profile,
+                              deadline=args.deadline * 60 if args.deadline is not None else None)
+    try:
+        if args.use_async:
+            async_generator = AsyncBookGenerator(generator, concurrency=args.concurrency)
+            check_manifest(args.source)
+            progress = async_generator.run(iter_manifest(args.source), vector_text=args.vector_text)
+        else:
+            batch = BatchGenerator(generator, workers=args.workers)
+            progress = batch.run(args.source, vector_text=args.vector_text)
+    finally:
+        if args.metrics:
+            METRICS.write(args.metrics)
+    if any(book.failed for book in progress):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
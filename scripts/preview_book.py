@@ -0,0 +1,29 @@
+import argparse
+import os
+from src.core.book_generator import BACKENDS, BookGenerator
+from src.core.state import StateStore
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a quick preview of a book, or promote a preview to a full render")
+    parser.add_argument("path", help="book JSON file, or a preview directory with --promote")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="opensource")
+    parser.add_argument("--promote", action="store_true", help="render the preview in path in full quality, same seeds")
+    parser.add_argument("--vector-text", action="store_true", help="leave the text to the PDF builder")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"Error: File not found: {args.path}")
+        raise SystemExit(1)
+
+    # Create output directory if it doesn't exist
+    os.makedirs("output", exist_ok=True)
+
+    if args.promote:
+        generator = BookGenerator(backend=args.backend, state=StateStore())
+        generator.promote(args.path)
+    else:
+        generator = BookGenerator(backend=args.backend, preview=True)
+        generator.generate_book(args.path, vector_text=args.vector_text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import json
+import os
+from src.core.book_generator import job_generator
+from src.core.state import DEFAULT_STATE_PATH, StateStore
+
+def main():
+    parser = argparse.ArgumentParser(description="Resume books that were interrupted before all pages were generated")
+    parser.add_argument("job_ids", nargs="*", help="jobs to resume, all unfinished jobs if omitted")
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH, help="state database written by the generators")
+    parser.add_argument("--list", action="store_true", help="only list the recorded jobs")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.state):
+        print(f"Error: File not found: {args.state}")
+        raise SystemExit(1)
+    state = StateStore(args.state)
+
+    if args.list:
+        for job in state.jobs():
+            left = len(state.unfinished_pages(job['id']))
+            print(f"{job['id']}  {job['status']:8}  {job['backend']:12}  {left:4} left  {job['title']}")
+        return
+
+    job_ids = args.job_ids or [job['id'] for job in state.jobs() if job['status'] != 'done']
+    if not job_ids:
+        print("Nothing to resume")
+        return
+
+    # One generator per backend and settings, so each model is loaded only once for them
+    generators = {}
+    for job_id in job_ids:
+        job = state.job(job_id)
+        if job is None:
+            print(f"Error: Unknown job: {job_id}")
+            raise SystemExit(1)
+        key = (job['backend'], json.dumps(job['settings'], sort_keys=True))
+        if key not in generators:
+            generators[key] = job_generator(job, state)
+        try:
+            generators[key].resume(job_id)
+        except ValueError as e:
+            print(f"Error: {str(e)}")
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import argparse
+import json
+from src.utils.benchmark import DEFAULT_SIZES, print_report, run_benchmarks
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark page, cover, PDF and book generation with fake backends")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="book sizes in pages")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of the single page benchmarks")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per illustration")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of simulated failed generations")
+    parser.add_argument("--workers", type=int, default=1, help="pages generated at the same time")
+    parser.add_argument("--output", help="results JSON file (default output/bench/bench_<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results JSON file to compare against")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.repeat, args.latency, args.failure_rate, args.workers, args.output)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+if __name__ == "__main__":
+    main()
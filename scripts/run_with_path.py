@@ -1,9 +1,9 @@
 import os
+import runpy
 import sys
-import subprocess
 
-def run_script(script_name):
-    """Run a Python script with the correct Python path"""
+def run_script(script_name, args=()):
+    """Run a script in this interpreter with the project root on the Python path"""
     # Get absolute paths
     current_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(current_dir)
@@ -12,19 +12,16 @@ def run_script(script_name):
     if project_root not in sys.path:
         sys.path.insert(0, project_root)
     
-    # Run the script
+    # Run the script as if it was started directly, with its own arguments
     script_path = os.path.join(current_dir, script_name)
     print(f"Running {script_path} with PYTHONPATH={project_root}")
-    
-    env = os.environ.copy()
-    env["PYTHONPATH"] = project_root
-    
-    subprocess.run([sys.executable, script_path], env=env)
+    sys.argv = [script_path] + list(args)
+    runpy.run_path(script_path, run_name="__main__")
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python run_with_path.py <script_name>")
-        print("Example: python run_with_path.py create_book_pdf.py")
+    if len(sys.argv) < 2:
+        print("Usage: python run_with_path.py <script_name> [arguments...]")
+        print("Example: python run_with_path.py generate_book_dalle.py examples/example_book.json")
         sys.exit(1)
     
-    run_script(sys.argv[1])
+    run_script(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,19 @@
+import argparse
+from src.core.book_generator import BACKENDS
+from src.core.service import serve
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve book generation jobs over HTTP with the models kept loaded")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="opensource")
+    parser.add_argument("--fallback", choices=sorted(BACKENDS), nargs="+", default=[],
+                        help="backends to use, in order, while the previous one is failing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=1, help="pages generated at the same time")
+    args = parser.parse_args()
+    backend = ",".join([args.backend] + args.fallback)
+
+    serve(backend, args.host, args.port, args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import argparse
+from src.utils.standin_servers import FaultInjector, run_standins
+
+def main():
+    parser = argparse.ArgumentParser(description="Run local stand-ins for the OpenAI images and Stability APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--openai-port", type=int, default=8765)
+    parser.add_argument("--stability-port", type=int, default=50051)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra seconds up to this value")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests rejected with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with 5xx")
+    parser.add_argument("--artifact-size", help="WIDTHxHEIGHT of returned images instead of the requested size")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    artifact_size = None
+    if args.artifact_size:
+        artifact_size = tuple(int(v) for v in args.artifact_size.lower().split("x"))
+    faults = FaultInjector(args.latency, args.jitter, args.rate_limit_rate, args.error_rate, args.seed)
+    run_standins(args.openai_port, args.stability_port, args.host, faults, artifact_size)
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,13 @@ from setuptools import setup, find_packages
 setup(
     name="pagepainter",
     version="0.1.0",
-    package_dir={"": "src"},
-    packages=find_packages(where="src"),
+    # The modules import each other as src.*, so src itself is the top-level package
+    packages=find_packages(include=["src", "src.*"]),
+    entry_points={
+        "console_scripts": [
+            "pagepainter=src.cli:main",
+        ],
+    },
     install_requires=[
         "openai",
         "Pillow",
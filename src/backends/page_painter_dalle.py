@@ -1,9 +1,13 @@
-from openai import OpenAI
-from PIL import Image
+from openai import AsyncOpenAI, OpenAI
+from PIL import Image, ImageDraw
+import asyncio
 import os
 import io
+import httpx
 import requests
 from dotenv import load_dotenv
+from src.utils.metrics import METRICS
+from src.utils.page_layout import compose_page
 
 class PagePainter:
     def __init__(self):
@@ -14,8 +18,21 @@ class PagePainter:
         # Initialize OpenAI client
         self.client = OpenAI()
         
-    def generate_illustration(self, description, art_style=None, image_size=None):
-        """Generate an illustration using DALL-E 3"""
+        # Async clients are created on first use, inside the event loop that uses them
+        self.async_client = None
+        self.http_client = None
+        self.async_loop = None
+        
+        # Failed generations return a placeholder image unless errors should be raised,
+        # e.g. by a BackendChain that moves on to the next backend
+        self.raise_errors = False
+        
+    def generate_illustration(self, description, art_style=None, image_size=None, seed=None, preview=False):
+        """Generate an illustration using DALL-E 3
+        
+        Previews use DALL-E 2 at 256x256. DALL-E takes no seed, so promoted
+        previews are new images of the same prompts.
+        """
         try:
             # Set default image size if not provided
             if image_size is None:
@@ -30,14 +47,22 @@ class PagePainter:
             
             print(f"\nGenerating illustration with prompt: {prompt[:100]}...")
             
-            # Generate image with DALL-E 3
-            response = self.client.images.generate(
-                model="dall-e-3",
-                prompt=prompt,
-                size="1024x1024",
-                quality="standard",
-                n=1,
-            )
+            if preview:
+                response = self.client.images.generate(
+                    model="dall-e-2",
+                    prompt=prompt,
+                    size="256x256",
+                    n=1,
+                )
+            else:
+                # Generate image with DALL-E 3
+                response = self.client.images.generate(
+                    model="dall-e-3",
+                    prompt=prompt,
+                    size="1024x1024",
+                    quality="standard",
+                    n=1,
+                )
             
             # Get the image URL
             image_url = response.data[0].url
@@ -50,91 +75,98 @@ class PagePainter:
             
         except Exception as e:
             print(f"Error generating illustration: {str(e)}")
-            # Create a placeholder image
-            img = Image.new('RGB', (image_size["width"], image_size["height"]), color='white')
-            d = ImageDraw.Draw(img)
-            d.text((10, 10), "Image generation failed", fill='black')
-            d.text((10, 30), f"Error: {str(e)}", fill='black')
-            return img
+            if self.raise_errors:
+                raise
+            return self.placeholder(image_size, e)
     
-    def create_page(self, text, image, output_path):
-        """Create a page combining the illustration and text"""
-        # Create a new white canvas
-        canvas_width = 1200
-        canvas_height = 1600
-        canvas = Image.new('RGB', (canvas_width, canvas_height), 'white')
-        
-        # Resize the illustration to fit the top portion
-        image_height = int(canvas_height * 0.7)  # 70% for image
-        resized_image = image.resize((canvas_width, image_height))
-        
-        # Paste the illustration
-        canvas.paste(resized_image, (0, 0))
-        
-        # Add text
-        draw = ImageDraw.Draw(canvas)
+    def placeholder(self, image_size, error):
+        """Create a placeholder image for a failed generation"""
+        METRICS.inc("pagepainter_placeholders_total", backend="dalle")
+        img = Image.new('RGB', (image_size["width"], image_size["height"]), color='white')
+        d = ImageDraw.Draw(img)
+        d.text((10, 10), "Image generation failed", fill='black')
+        d.text((10, 30), f"Error: {str(error)}", fill='black')
+        return img
+    
+    def _async_clients(self):
+        """Async API and download clients of the running event loop
+
+        Their connections belong to the loop they were opened in, so every
+        new loop (e.g. every asyncio.run) gets new clients. Those of a loop
+        that was closed without aclose() can no longer be closed and are dropped.
+        """
+        loop = asyncio.get_running_loop()
+        if self.async_loop is not loop:
+            self.async_client = AsyncOpenAI()
+            self.http_client = httpx.AsyncClient()
+            self.async_loop = loop
+        return self.async_client, self.http_client
+    
+    async def aclose(self):
+        """Close the async clients before their event loop ends"""
+        if self.async_loop is asyncio.get_running_loop():
+            await self.async_client.close()
+            await self.http_client.aclose()
+        self.async_client = None
+        self.http_client = None
+        self.async_loop = None
+    
+    async def agenerate_illustration(self, description, art_style=None, image_size=None, seed=None, preview=False):
+        """Generate an illustration using DALL-E 3 without blocking the event loop
         
-        # Try to use Comic Sans MS, fall back to Arial, then default if neither is available
+        Previews use DALL-E 2 at 256x256, seeds are ignored as in generate_illustration.
+        """
+        if image_size is None:
+            image_size = {"width": 1024, "height": 1024}
         try:
-            font = ImageFont.truetype("comic.ttf", 72)  # Comic Sans MS with larger size
-        except:
-            try:
-                font = ImageFont.truetype("arial.ttf", 72)
-            except:
-                font = ImageFont.load_default()
-        
-        # Text area dimensions
-        text_area_height = canvas_height - image_height
-        text_margin = 80  # Increased margin
-        
-        # Word wrap for text
-        words = text.split()
-        lines = []
-        current_line = []
-        
-        for word in words:
-            current_line.append(word)
-            text_width = draw.textlength(' '.join(current_line), font=font)
-            if text_width > canvas_width - 2 * text_margin:
-                if len(current_line) == 1:
-                    lines.append(current_line[0])
-                    current_line = []
-                else:
-                    current_line.pop()
-                    lines.append(' '.join(current_line))
-                    current_line = [word]
-        
-        if current_line:
-            lines.append(' '.join(current_line))
-        
-        # Calculate total text height
-        line_spacing = 1.2  # 120% of font size
-        total_text_height = len(lines) * font.size * line_spacing
-        
-        # Calculate starting Y position to center text vertically in the text area
-        start_y = image_height + (text_area_height - total_text_height) / 2
-        
-        # Draw each line of text
-        for i, line in enumerate(lines):
-            # Center text horizontally
-            text_width = draw.textlength(line, font=font)
-            x = (canvas_width - text_width) / 2
-            y = start_y + i * font.size * line_spacing
+            if art_style:
+                prompt = f"{art_style}, {description}"
+            else:
+                prompt = f"watercolor style illustration, children's book style, {description}"
             
-            # Draw text with a slight shadow effect for better readability
-            shadow_offset = 2
-            draw.text((x + shadow_offset, y + shadow_offset), line, font=font, fill='grey')
-            draw.text((x, y), line, font=font, fill='black')
-        
-        # Save the final page
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        canvas.save(output_path)
-        return canvas
+            async_client, http_client = self._async_clients()
+            if preview:
+                response = await async_client.images.generate(
+                    model="dall-e-2",
+                    prompt=prompt,
+                    size="256x256",
+                    n=1,
+                )
+            else:
+                response = await async_client.images.generate(
+                    model="dall-e-3",
+                    prompt=prompt,
+                    size="1024x1024",
+                    quality="standard",
+                    n=1,
+                )
+            
+            # Download the image
+            response = await http_client.get(response.data[0].url)
+            response.raise_for_status()
+            return Image.open(io.BytesIO(response.content))
+            
+        except Exception as e:
+            print(f"Error generating illustration: {str(e)}")
+            if self.raise_errors:
+                raise
+            return self.placeholder(image_size, e)
+    
+    def create_page(self, text, image, output_path, render_text=True):
+        """Create a page combining the illustration and text"""
+        return compose_page(text, image, output_path, render_text)
 
-    def create_book_page(self, text, description, output_path, art_style=None, image_size=None):
+    def create_book_page(self, text, description, output_path, art_style=None, image_size=None, render_text=True):
         """Create a complete book page with illustration and text"""
         # Generate the illustration
         image = self.generate_illustration(description, art_style, image_size)
         
         # Add text to the image
-        self.create_page(text, image, output_path)
+        self.create_page(text, image, output_path, render_text)
+    
+    async def acreate_book_page(self, text, description, output_path, art_style=None, image_size=None, render_text=True):
+        """Create a complete book page, generating the illustration asynchronously"""
+        image = await self.agenerate_illustration(description, art_style, image_size)
+        
+        # Compositing and encoding are CPU work, keep them off the event loop
+        await asyncio.to_thread(self.create_page, text, image, output_path, render_text)
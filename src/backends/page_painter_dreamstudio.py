@@ -1,10 +1,19 @@
 import os
 from PIL import Image, ImageDraw, ImageFont
 import stability_sdk.interfaces.gooseai.generation.generation_pb2 as generation
+import stability_sdk.interfaces.gooseai.generation.generation_pb2_grpc as generation_grpc
 from stability_sdk import client
-import io
+import asyncio
+import grpc
+import uuid
 import warnings
 from dotenv import load_dotenv
+from src.utils.encoded_images import open_encoded
+from src.utils.page_layout import compose_page, save_canvas, wrap_text
+
+# Diffusion steps of full renders and of quick previews
+STEPS = 30
+PREVIEW_STEPS = 10
 
 class PagePainter:
     def __init__(self):
@@ -17,17 +26,29 @@ class PagePainter:
         if not api_key:
             raise ValueError("Please set STABILITY_KEY environment variable")
         
-        # Initialize the stability client
+        # Initialize the stability client, STABILITY_HOST can point it at a local stand-in
+        self.host = os.getenv('STABILITY_HOST', "grpc.stability.ai:443")
+        self.api_key = api_key
         self.stability_api = client.StabilityInference(
+            host=self.host,
             key=api_key,
             verbose=False,
         )
         
+        # The async channel and stub are created on first use, inside the event loop that uses them
+        self.async_channel = None
+        self.async_stub = None
+        self.async_loop = None
+        
         # Create output directory if it doesn't exist
         os.makedirs("output", exist_ok=True)
     
-    def generate_illustration(self, description, art_style=None, image_size=None):
-        """Generate an illustration based on the description and art style"""
+    def generate_illustration(self, description, art_style=None, image_size=None, seed=None, preview=False):
+        """Generate an illustration based on the description and art style
+        
+        preview renders with fewer steps; the same seed and prompt then give a
+        full render of the same composition.
+        """
         # Set default image size if not provided
         if image_size is None:
             image_size = {"width": 384, "height": 512}
@@ -42,8 +63,8 @@ class PagePainter:
         # Generate the image
         answers = self.stability_api.generate(
             prompt=prompt,
-            seed=42,  # Change this for different results
-            steps=30,
+            seed=42 if seed is None else seed,  # Change this for different results
+            steps=PREVIEW_STEPS if preview else STEPS,
             cfg_scale=7.5,
             width=image_size["width"],
             height=image_size["height"],
@@ -60,14 +81,122 @@ class PagePainter:
                         "Please modify the prompt and try again.")
                     return None
                 if artifact.type == generation.ARTIFACT_IMAGE:
-                    # Convert binary image data to PIL Image
-                    img = Image.open(io.BytesIO(artifact.binary))
-                    return img
+                    # Keep the encoded bytes, pixels are decoded only when the page needs them
+                    return open_encoded(artifact.binary)
+        
+        return None
+    
+    def generate_candidates(self, description, art_style=None, image_size=None, samples=4, seed=None, preview=False):
+        """Generate several candidate illustrations in a single request
+        
+        Samples blocked by the safety filter are returned too, marked with
+        image.info['filtered'], so the caller can rank them last.
+        """
+        if image_size is None:
+            image_size = {"width": 384, "height": 512}
+        if art_style:
+            prompt = f"{art_style}, {description}"
+        else:
+            prompt = f"watercolor style illustration, children's book style, {description}"
+        
+        answers = self.stability_api.generate(
+            prompt=prompt,
+            seed=42 if seed is None else seed,  # The samples use consecutive seeds
+            steps=PREVIEW_STEPS if preview else STEPS,
+            cfg_scale=7.5,
+            width=image_size["width"],
+            height=image_size["height"],
+            samples=samples,
+            sampler=generation.SAMPLER_K_DPMPP_2M
+        )
+        
+        images = []
+        for resp in answers:
+            for artifact in resp.artifacts:
+                if artifact.type == generation.ARTIFACT_IMAGE:
+                    img = open_encoded(artifact.binary)
+                    img.info['filtered'] = artifact.finish_reason == generation.FILTER
+                    img.info['seed'] = artifact.seed
+                    images.append(img)
+        return images
+    
+    def _open_async_stub(self):
+        """Open an asyncio gRPC channel the same way StabilityInference opens its blocking one"""
+        if self.host.endswith("443"):
+            credentials = grpc.composite_channel_credentials(
+                grpc.ssl_channel_credentials(), grpc.access_token_call_credentials(self.api_key)
+            )
+            channel = grpc.aio.secure_channel(self.host, credentials)
+        else:
+            channel = grpc.aio.insecure_channel(self.host)
+        return channel, generation_grpc.GenerationServiceStub(channel)
+    
+    def _async_stub(self):
+        """Async stub of the running event loop, every new loop (e.g. every asyncio.run) opens its own channel"""
+        loop = asyncio.get_running_loop()
+        if self.async_loop is not loop:
+            self.async_channel, self.async_stub = self._open_async_stub()
+            self.async_loop = loop
+        return self.async_stub
+    
+    async def aclose(self):
+        """Close the async channel before its event loop ends"""
+        if self.async_loop is asyncio.get_running_loop():
+            await self.async_channel.close()
+        self.async_channel = None
+        self.async_stub = None
+        self.async_loop = None
+    
+    async def agenerate_illustration(self, description, art_style=None, image_size=None, seed=None, preview=False):
+        """Generate an illustration with the async gRPC stub, without blocking the event loop
+        
+        seed and preview work as in generate_illustration.
+        """
+        if image_size is None:
+            image_size = {"width": 384, "height": 512}
+        if art_style:
+            prompt = f"{art_style}, {description}"
+        else:
+            prompt = f"watercolor style illustration, children's book style, {description}"
+        
+        stub = self._async_stub()
+        
+        # Same request as StabilityInference.generate builds for the blocking call
+        request = generation.Request(
+            engine_id=self.stability_api.engine,
+            request_id=str(uuid.uuid4()),
+            prompt=[generation.Prompt(text=prompt)],
+            image=generation.ImageParameters(
+                transform=generation.TransformType(diffusion=generation.SAMPLER_K_DPMPP_2M),
+                height=image_size["height"],
+                width=image_size["width"],
+                seed=[42 if seed is None else seed],
+                steps=PREVIEW_STEPS if preview else STEPS,
+                samples=1,
+                parameters=[generation.StepParameter(
+                    scaled_step=0, sampler=generation.SamplerParameters(cfg_scale=7.5)
+                )],
+            ),
+        )
+        
+        async for resp in stub.Generate(request, wait_for_ready=True):
+            for artifact in resp.artifacts:
+                if artifact.finish_reason == generation.FILTER:
+                    warnings.warn(
+                        "Your request activated the API's safety filters and could not be processed."
+                        "Please modify the prompt and try again.")
+                    return None
+                if artifact.type == generation.ARTIFACT_IMAGE:
+                    return open_encoded(artifact.binary)
         
         return None
 
-    def create_page(self, text, image, output_path):
+    def create_page(self, text, image, output_path, render_text=True):
         """Create a book page with text and illustration"""
+        if not render_text:
+            # Illustration band only, the text is drawn by the PDF builder
+            return compose_page(text, image, output_path, render_text=False)
+        
         # Create a new white canvas
         canvas_width = 1200
         canvas_height = 1600
@@ -109,29 +238,8 @@ class PagePainter:
         text_area_height = canvas_height - illustration_height - 100  # 50px margin top and bottom
         text_start_y = illustration_height + 50
         
-        # Word wrap text
-        words = text.split()
-        lines = []
-        current_line = []
-        
-        for word in words:
-            current_line.append(word)
-            test_line = ' '.join(current_line)
-            # Check if the line is too long
-            if draw.textlength(test_line, font=font) > text_area_width:
-                if len(current_line) > 1:
-                    # Remove the last word and store the line
-                    current_line.pop()
-                    lines.append(' '.join(current_line))
-                    current_line = [word]
-                else:
-                    # If a single word is too long, keep it as its own line
-                    lines.append(test_line)
-                    current_line = []
-        
-        # Add any remaining words as the last line
-        if current_line:
-            lines.append(' '.join(current_line))
+        # Word wrap text, a single word that is too long keeps its own line
+        lines = wrap_text(text, lambda line: draw.textlength(line, font=font), text_area_width)
         
         # Draw text lines
         y = text_start_y
@@ -144,11 +252,10 @@ class PagePainter:
             y += int(font.size * 1.5)  # Add some line spacing
         
         # Save the final page
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        canvas.save(output_path)
+        save_canvas(canvas, output_path)
         return canvas
 
-    def create_book_page(self, text, description, output_path, art_style=None, image_size=None):
+    def create_book_page(self, text, description, output_path, art_style=None, image_size=None, render_text=True):
         """Create a complete book page with illustration and text"""
         # Generate the illustration
         image = self.generate_illustration(description, art_style, image_size)
@@ -156,4 +263,13 @@ class PagePainter:
             raise ValueError("Failed to generate illustration")
         
         # Add text to the image
-        self.create_page(text, image, output_path)
+        self.create_page(text, image, output_path, render_text)
+    
+    async def acreate_book_page(self, text, description, output_path, art_style=None, image_size=None, render_text=True):
+        """Create a complete book page, generating the illustration asynchronously"""
+        image = await self.agenerate_illustration(description, art_style, image_size)
+        if image is None:
+            raise ValueError("Failed to generate illustration")
+        
+        # Compositing and encoding are CPU work, keep them off the event loop
+        await asyncio.to_thread(self.create_page, text, image, output_path, render_text)
@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import time
+from PIL import Image
+from src.utils.page_layout import compose_page
+
+
+def prompt_fails(prompt, failure_rate, seed=0):
+    """Deterministically decide whether a simulated generation of prompt fails"""
+    if failure_rate <= 0:
+        return False
+    digest = hashlib.sha256(f"{seed}:{prompt}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'big') / 2 ** 32 < failure_rate
+
+
+def synthetic_image(prompt, image_size=None):
+    """Deterministic stand-in illustration: a gradient whose colors depend on the prompt"""
+    if image_size is None:
+        image_size = {"width": 384, "height": 512}
+    digest = hashlib.sha256(prompt.encode('utf-8')).digest()
+    top, bottom = digest[:3], digest[3:6]
+
+    # A one pixel wide vertical gradient between two prompt dependent colors, stretched to size
+    width, height = image_size["width"], image_size["height"]
+    column = Image.new('RGB', (1, height))
+    column.putdata([
+        tuple(int(a + (b - a) * y / max(height - 1, 1)) for a, b in zip(top, bottom))
+        for y in range(height)
+    ])
+    return column.resize((width, height), Image.NEAREST)
+
+
+def preview_size(image_size=None):
+    """Half of an illustration size, for previews"""
+    if image_size is None:
+        image_size = {"width": 384, "height": 512}
+    return {"width": image_size["width"] // 2, "height": image_size["height"] // 2}
+
+
+class PagePainter:
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=0):
+        """Initialize a PagePainter that draws synthetic images, for tests, benchmarks and local runs
+
+        latency simulates the seconds a real backend takes per illustration and
+        failure_rate the share of prompts that fail (the same prompts for a given seed).
+        """
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.calls = 0
+
+    def generate_illustration(self, description, art_style=None, image_size=None, seed=None, preview=False):
+        """Generate a synthetic illustration for the description and art style
+
+        A seed gives a different image for the same prompt; previews are the
+        same images at half the size.
+        """
+        # Create the complete prompt with art style
+        if art_style:
+            prompt = f"{art_style}, {description}"
+        else:
+            # Default style if none provided
+            prompt = f"watercolor style illustration, children's book style, {description}"
+
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if prompt_fails(prompt, self.failure_rate, self.seed):
+            raise RuntimeError("Simulated generation failure")
+        if preview:
+            image_size = preview_size(image_size)
+        if seed is not None:
+            return synthetic_image(f"{prompt} #{seed}", image_size)
+        return synthetic_image(prompt, image_size)
+
+    def generate_candidates(self, description, art_style=None, image_size=None, samples=4, seed=None, preview=False):
+        """Generate several synthetic candidate illustrations in one simulated request"""
+        if art_style:
+            prompt = f"{art_style}, {description}"
+        else:
+            prompt = f"watercolor style illustration, children's book style, {description}"
+
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if prompt_fails(prompt, self.failure_rate, self.seed):
+            raise RuntimeError("Simulated generation failure")
+        if preview:
+            image_size = preview_size(image_size)
+        return [synthetic_image(f"{prompt} #{(seed or 0) + index}", image_size) for index in range(samples)]
+
+    def continue_illustration(self, image, description, art_style=None, image_size=None, strength=0.5, seed=None):
+        """Generate a synthetic illustration starting from another one, blended by strength"""
+        target = self.generate_illustration(description, art_style, image_size, seed)
+        return Image.blend(image.convert('RGB').resize(target.size), target, strength)
+
+    async def agenerate_illustration(self, description, art_style=None, image_size=None, seed=None, preview=False):
+        """Generate a synthetic illustration, waiting the simulated latency on the event loop"""
+        if art_style:
+            prompt = f"{art_style}, {description}"
+        else:
+            prompt = f"watercolor style illustration, children's book style, {description}"
+
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if prompt_fails(prompt, self.failure_rate, self.seed):
+            raise RuntimeError("Simulated generation failure")
+        if preview:
+            image_size = preview_size(image_size)
+        if seed is not None:
+            return synthetic_image(f"{prompt} #{seed}", image_size)
+        return synthetic_image(prompt, image_size)
+
+    def create_page(self, text, image, output_path, render_text=True):
+        """Create a page combining the illustration and text"""
+        return compose_page(text, image, output_path, render_text)
+
+    def create_book_page(self, text, description, output_path, art_style=None, image_size=None, render_text=True):
+        """Create a complete book page with illustration and text"""
+        # Generate the illustration
+        image = self.generate_illustration(description, art_style, image_size)
+
+        # Add text to the image
+        self.create_page(text, image, output_path, render_text)
+
+    async def acreate_book_page(self, text, description, output_path, art_style=None, image_size=None, render_text=True):
+        """Create a complete book page without blocking the event loop"""
+        image = await self.agenerate_illustration(description, art_style, image_size)
+        await asyncio.to_thread(self.create_page, text, image, output_path, render_text)
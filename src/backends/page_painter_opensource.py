@@ -1,7 +1,18 @@
 import torch
-from diffusers import StableDiffusionPipeline
-from PIL import Image, ImageDraw, ImageFont
+from diffusers import AutoencoderTiny, StableDiffusionImg2ImgPipeline, StableDiffusionPipeline
+import asyncio
 import os
+import threading
+import time
+from src.utils.memory import apply_memory_policy, choose_memory_policy
+from src.utils.metrics import METRICS
+from src.utils.page_layout import compose_page
+
+# Diffusion steps of full renders and of quick previews
+STEPS = 15
+PREVIEW_STEPS = 6
+# Tiny VAE decoder for previews, a fraction of the decoding time of the full VAE
+PREVIEW_VAE_ID = "madebyollin/taesd"
 
 class PagePainter:
     def __init__(self):
@@ -20,12 +31,65 @@ class PagePainter:
         
         self.pipe = self.pipe.to(self.device)
         
-        # Enable basic memory optimizations
-        self.pipe.enable_attention_slicing()
-        self.pipe.enable_vae_slicing()
+        # Memory savings are picked per render, see _apply_memory_policy
+        self.policy = None
+        
+        # The pipeline runs one generation at a time
+        self.lock = threading.Lock()
+        
+        # Loaded on the first preview
+        self.preview_pipe = None
+        
+        # Created on the first page continued from the previous one
+        self.img2img_pipe = None
+        
+    def _preview_pipeline(self):
+        """Pipeline sharing the loaded model but decoding with the tiny VAE"""
+        if self.preview_pipe is None:
+            components = dict(self.pipe.components)
+            components['vae'] = AutoencoderTiny.from_pretrained(PREVIEW_VAE_ID).to(self.device)
+            self.preview_pipe = StableDiffusionPipeline(**components)
+        return self.preview_pipe
+    
+    def _apply_memory_policy(self, pipe, image_size, samples=1):
+        """Enable the memory savings a render of samples images of image_size needs, called under the lock"""
+        policy = choose_memory_policy(image_size, samples)
+        apply_memory_policy(pipe, policy)
+        if policy != self.policy:
+            print(f"Memory policy for {samples}x {image_size['width']}x{image_size['height']}: {policy} "
+                  f"(estimated peak {policy.estimate / 1024 ** 3:.1f} GB)")
+            self.policy = policy
+        return policy
+    
+    def _run_pipeline(self, prompt, image_size, samples=1, seed=None, preview=False):
+        pipe = self._preview_pipeline() if preview else self.pipe
+        # A seeded generator makes the preview and the full render start from the same noise
+        generator = None if seed is None else torch.Generator(self.device).manual_seed(seed)
+        steps = PREVIEW_STEPS if preview else STEPS  # Reduced for faster generation
+        with self.lock, torch.inference_mode():
+            policy = self._apply_memory_policy(pipe, image_size, samples)
+            start = time.perf_counter()
+            images = pipe(
+                prompt,
+                num_inference_steps=steps,
+                guidance_scale=7.5,
+                height=image_size["height"],
+                width=image_size["width"],
+                num_images_per_prompt=samples,
+                generator=generator
+            ).images
+            elapsed = time.perf_counter() - start
+            # Including the text encoder and VAE decode, which are small next to the steps
+            METRICS.observe("pagepainter_diffusion_step_seconds", elapsed / steps)
+            METRICS.observe("pagepainter_render_seconds", elapsed, policy=str(policy))
+        return images
+    
+    def generate_illustration(self, description, art_style=None, image_size=None, seed=None, preview=False):
+        """Generate an illustration based on the description and art style
         
-    def generate_illustration(self, description, art_style=None, image_size=None):
-        """Generate an illustration based on the description and art style"""
+        preview renders with fewer steps and the tiny VAE decoder; the same
+        seed then gives a full render of the same composition.
+        """
         # Set default image size if not provided
         if image_size is None:
             image_size = {"width": 384, "height": 512}
@@ -38,95 +102,72 @@ class PagePainter:
             prompt = f"watercolor style illustration, children's book style, {description}"
         
         # Generate the image with optimized settings for CPU
-        with torch.inference_mode():
-            image = self.pipe(
+        return self._run_pipeline(prompt, image_size, seed=seed, preview=preview)[0]
+    
+    def generate_candidates(self, description, art_style=None, image_size=None, samples=4, seed=None, preview=False):
+        """Generate several candidate illustrations in one pipeline batch"""
+        if image_size is None:
+            image_size = {"width": 384, "height": 512}
+        if art_style:
+            prompt = f"{art_style}, {description}"
+        else:
+            prompt = f"watercolor style illustration, children's book style, {description}"
+        
+        return self._run_pipeline(prompt, image_size, samples, seed, preview)
+    
+    def continue_illustration(self, image, description, art_style=None, image_size=None, strength=0.5, seed=None):
+        """Generate an illustration starting from another one, e.g. the previous page
+        
+        The image is noised to strength (0 to 1) and only that fraction of the
+        denoising steps is run, so strength 0.5 halves the UNet evaluations.
+        Lower strengths keep more of the characters and composition.
+        """
+        if image_size is None:
+            image_size = {"width": 384, "height": 512}
+        if art_style:
+            prompt = f"{art_style}, {description}"
+        else:
+            prompt = f"watercolor style illustration, children's book style, {description}"
+        
+        if self.img2img_pipe is None:
+            # Same weights as the text to image pipeline, nothing is loaded twice
+            self.img2img_pipe = StableDiffusionImg2ImgPipeline(**self.pipe.components)
+        
+        init_image = image.convert('RGB').resize((image_size["width"], image_size["height"]))
+        generator = None if seed is None else torch.Generator(self.device).manual_seed(seed)
+        with self.lock, torch.inference_mode():
+            policy = self._apply_memory_policy(self.img2img_pipe, image_size)
+            start = time.perf_counter()
+            image = self.img2img_pipe(
                 prompt,
-                num_inference_steps=15,  # Reduced for faster generation
+                image=init_image,
+                strength=strength,
+                num_inference_steps=STEPS,  # The pipeline runs int(STEPS * strength) of them
                 guidance_scale=7.5,
-                height=image_size["height"],
-                width=image_size["width"]
+                generator=generator
             ).images[0]
-        
+            elapsed = time.perf_counter() - start
+            METRICS.observe("pagepainter_diffusion_step_seconds", elapsed / max(int(STEPS * strength), 1))
+            METRICS.observe("pagepainter_render_seconds", elapsed, policy=str(policy))
         return image
     
-    def create_page(self, text, image, output_path):
+    async def agenerate_illustration(self, description, art_style=None, image_size=None, seed=None, preview=False):
+        """Generate an illustration in a worker thread, the pipeline itself is not async"""
+        return await asyncio.to_thread(self.generate_illustration, description, art_style, image_size, seed, preview)
+    
+    def create_page(self, text, image, output_path, render_text=True):
         """Create a page combining the illustration and text"""
-        # Create a new white canvas
-        canvas_width = 1200
-        canvas_height = 1600
-        canvas = Image.new('RGB', (canvas_width, canvas_height), 'white')
-        
-        # Resize the illustration to fit the top portion
-        image_height = int(canvas_height * 0.7)  # 70% for image
-        resized_image = image.resize((canvas_width, image_height))
-        
-        # Paste the illustration
-        canvas.paste(resized_image, (0, 0))
-        
-        # Add text
-        draw = ImageDraw.Draw(canvas)
-        
-        # Try to use Comic Sans MS, fall back to Arial, then default if neither is available
-        try:
-            font = ImageFont.truetype("comic.ttf", 72)  # Comic Sans MS with larger size
-        except:
-            try:
-                font = ImageFont.truetype("arial.ttf", 72)
-            except:
-                font = ImageFont.load_default()
-        
-        # Text area dimensions
-        text_area_height = canvas_height - image_height
-        text_margin = 80  # Increased margin
-        
-        # Word wrap for text
-        words = text.split()
-        lines = []
-        current_line = []
-        
-        for word in words:
-            current_line.append(word)
-            text_width = draw.textlength(' '.join(current_line), font=font)
-            if text_width > canvas_width - 2 * text_margin:
-                if len(current_line) == 1:
-                    lines.append(current_line[0])
-                    current_line = []
-                else:
-                    current_line.pop()
-                    lines.append(' '.join(current_line))
-                    current_line = [word]
-        
-        if current_line:
-            lines.append(' '.join(current_line))
-        
-        # Calculate total text height
-        line_spacing = 1.2  # 120% of font size
-        total_text_height = len(lines) * font.size * line_spacing
-        
-        # Calculate starting Y position to center text vertically in the text area
-        start_y = image_height + (text_area_height - total_text_height) / 2
-        
-        # Draw each line of text
-        for i, line in enumerate(lines):
-            # Center text horizontally
-            text_width = draw.textlength(line, font=font)
-            x = (canvas_width - text_width) / 2
-            y = start_y + i * font.size * line_spacing
-            
-            # Draw text with a slight shadow effect for better readability
-            shadow_offset = 2
-            draw.text((x + shadow_offset, y + shadow_offset), line, font=font, fill='grey')
-            draw.text((x, y), line, font=font, fill='black')
-        
-        # Save the final page
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        canvas.save(output_path)
-        return canvas
+        return compose_page(text, image, output_path, render_text)
 
-    def create_book_page(self, text, description, output_path, art_style=None, image_size=None):
+    def create_book_page(self, text, description, output_path, art_style=None, image_size=None, render_text=True):
         """Create a complete book page with illustration and text"""
         # Generate the illustration
         image = self.generate_illustration(description, art_style, image_size)
         
         # Add text to the image
-        self.create_page(text, image, output_path)
+        self.create_page(text, image, output_path, render_text)
+    
+    async def acreate_book_page(self, text, description, output_path, art_style=None, image_size=None, render_text=True):
+        """Create a complete book page without blocking the event loop"""
+        image = await self.agenerate_illustration(description, art_style, image_size)
+        await asyncio.to_thread(self.create_page, text, image, output_path, render_text)
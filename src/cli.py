@@ -0,0 +1,295 @@
+"""pagepainter command line
+
+    pagepainter generate book.json --backend dalle
+    pagepainter cover book.json --backend dreamstudio
+    pagepainter cover book.json --backend dalle --variants 4 --template poster
+    pagepainter pdf book.json output/book_<title>_<timestamp>
+    pagepainter preview book.json --backend opensource
+    pagepainter generate book.json --backend opensource --profile
+    pagepainter bench --sizes 10 100
+    pagepainter convert book.json book.jsonl
+    pagepainter plan book.json --backend opensource,dalle --deadline 60 --budget 2
+    pagepainter distribute book.json --queue /shared/queue
+    pagepainter worker --queue /shared/queue --backend opensource
+    pagepainter serve --backend opensource --port 8080
+
+Everything runs in this process. Each command imports only what it needs, so
+e.g. building a PDF does not import the OpenAI client, torch or the Stability SDK.
+"""
+import argparse
+import os
+import sys
+
+# Where --profile writes its files when no directory is given
+DEFAULT_PROFILE_DIR = "output/profile"
+# Where --metrics writes the metrics of the run when no file is given
+DEFAULT_METRICS_FILE = "output/metrics.prom"
+
+
+def generate(args):
+    from src.core.book_generator import BookGenerator
+    from src.core.illustration_cache import IllustrationCache
+    from src.core.state import StateStore
+    from src.utils.content_store import ContentStore
+
+    from src.utils.metrics import METRICS
+
+    os.makedirs("output", exist_ok=True)
+    generator = BookGenerator(
+        backend=args.backend,
+        # Record progress so the book can be resumed with scripts/resume_book.py
+        state=StateStore(),
+        samples=args.samples,
+        cache=IllustrationCache(args.cache) if args.cache else None,
+        strength=args.strength,
+        store=ContentStore(args.store) if args.store else None,
+        memory_budget=args.memory_budget,
+        encoding=args.encoding,
+        encoders=args.encoders,
+        deadline=args.deadline * 60 if args.deadline is not None else None,
+        budget=args.budget,
+        profile=args.profile,
+    )
+    try:
+        generator.generate_book(args.book, vector_text=args.vector_text)
+    finally:
+        if args.metrics:
+            METRICS.write(args.metrics)
+
+
+def cover(args):
+    from datetime import datetime
+    from src.core.book_generator import load_book, load_cover_maker, make_cover, make_cover_variants
+    from src.utils.cover_layout import TEMPLATES
+
+    book_data = load_book(args.book)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_dir = args.output_dir or f"output/cover_{timestamp}"
+    os.makedirs(output_dir, exist_ok=True)
+
+    if args.template and args.template not in TEMPLATES:
+        raise SystemExit(f"Error: unknown cover template: {args.template} (use {', '.join(TEMPLATES)})")
+    cover_maker = load_cover_maker(args.backend)
+    if args.template:
+        cover_maker.template = TEMPLATES[args.template]
+    if args.variants:
+        print(f"\nGenerating {args.variants} cover variants...")
+        paths = [os.path.join(output_dir, f"cover_{i}.png") for i in range(1, args.variants + 1)]
+        for cover_path in make_cover_variants(cover_maker, book_data, paths):
+            print(f"Cover saved as: {cover_path}")
+        return
+
+    print("\nGenerating book cover...")
+    cover_path = make_cover(cover_maker, book_data, os.path.join(output_dir, "cover.png"))
+    print(f"Cover saved as: {cover_path}")
+
+
+def pdf(args):
+    from src.utils.create_pdf import create_pdf
+    from src.utils.profiling import Profiler
+
+    profiler = Profiler(args.profile) if args.profile else None
+    create_pdf(args.book, args.images_dir, args.output_dir, args.vector_text, args.max_dpi, profiler)
+    if profiler is not None:
+        profiler.report()
+
+
+def preview(args):
+    from src.core.book_generator import BookGenerator
+    from src.core.state import StateStore
+
+    os.makedirs("output", exist_ok=True)
+    if args.promote:
+        BookGenerator(backend=args.backend, state=StateStore(), profile=args.profile).promote(args.path)
+    else:
+        generator = BookGenerator(backend=args.backend, preview=True, profile=args.profile)
+        generator.generate_book(args.path, vector_text=args.vector_text)
+
+
+def bench(args):
+    import json
+    from src.utils.benchmark import print_report, run_benchmarks
+
+    report = run_benchmarks(args.sizes, args.repeat, args.latency, args.failure_rate, args.workers, args.output)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+
+def convert(args):
+    from src.utils.book_io import load_book, write_book
+
+    write_book(load_book(args.book), args.output)
+    print(f"Book written to: {args.output}")
+
+
+def plan(args):
+    from src.core.book_generator import load_book
+    from src.core.scheduler import Scheduler
+
+    # Only the names of the backends are needed to plan, none is loaded
+    scheduler = Scheduler([(name, None) for name in args.backend.split(",")],
+                          args.deadline * 60 if args.deadline is not None else None, args.budget)
+    scheduler.schedule(len(load_book(args.book)['pages']))
+
+
+def distribute(args):
+    from src.core.book_generator import BookGenerator, load_book
+    from src.core.work_queue import Coordinator, WorkQueue
+
+    # The coordinator only lays out the books, the workers load the models
+    generator = BookGenerator(backend="fake", output_dir=args.output_dir, encoding=args.encoding, encoders=0)
+    queue = WorkQueue(args.queue, lease_seconds=args.lease)
+    progress = Coordinator(generator, queue).build_book(load_book(args.book), args.vector_text, args.timeout)
+    if progress.failed:
+        raise SystemExit(1)
+
+
+def worker(args):
+    from src.core.book_generator import BookGenerator
+    from src.core.work_queue import Worker, WorkQueue
+
+    from src.utils.metrics import METRICS
+
+    # Each task is written in the encoding distribute was given
+    generator = BookGenerator(backend=args.backend, profile=args.profile)
+    try:
+        Worker(generator, WorkQueue(args.queue, lease_seconds=args.lease)).run(args.idle_timeout)
+    finally:
+        if args.metrics:
+            METRICS.write(args.metrics)
+
+
+def serve(args):
+    from src.core.service import serve
+
+    serve(args.backend, args.host, args.port, args.workers)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pagepainter", description="AI-powered children's book generator")
+    commands = parser.add_subparsers(dest="command", required=True)
+    # Backend names are checked when the backend is loaded, importing the registry here would not be lazy
+    backend_help = "dalle, dreamstudio, opensource or fake; a comma separated list falls back in order"
+    deadline_help = "share the pages of the backends so the book is done in time"
+    budget_help = "most the paid backends may cost"
+    profile_help = "write cProfile statistics, collapsed stacks and the top functions per stage to this directory"
+    metrics_help = "write counters and histograms of the run to this file in the Prometheus text format"
+
+    command = commands.add_parser("generate", help="generate a complete book")
+    command.add_argument("book", help="book JSON or JSONL file")
+    command.add_argument("--backend", default="opensource", help=backend_help)
+    command.add_argument("--vector-text", action="store_true", help="leave the text to the PDF builder")
+    command.add_argument("--samples", type=int, default=1, help="candidate illustrations per page, the best is kept")
+    command.add_argument("--cache", nargs="?", const="output/cache", help="illustration cache directory")
+    command.add_argument("--strength", type=float, help="start each page from the previous page's illustration")
+    command.add_argument("--store", nargs="?", const="output/store", help="content store for the images")
+    command.add_argument("--memory-budget", type=int, metavar="MB",
+                         help="report peak memory per stage and release buffers above this budget")
+    command.add_argument("--encoding", help="image format: png[:level], png-palette, webp[:quality] or jpeg[:quality]")
+    command.add_argument("--encoders", type=int, help="processes encoding images (default: one per CPU)")
+    command.add_argument("--deadline", type=float, metavar="MINUTES", help=deadline_help)
+    command.add_argument("--budget", type=float, metavar="DOLLARS", help=budget_help)
+    command.add_argument("--profile", nargs="?", const=DEFAULT_PROFILE_DIR, metavar="DIR", help=profile_help)
+    command.add_argument("--metrics", nargs="?", const=DEFAULT_METRICS_FILE, metavar="FILE", help=metrics_help)
+    command.set_defaults(run=generate)
+
+    command = commands.add_parser("cover", help="generate only the cover of a book")
+    command.add_argument("book", help="book JSON file")
+    command.add_argument("--backend", default="dalle", help="dalle, dreamstudio, opensource or fake")
+    command.add_argument("--output-dir", help="directory for cover.png (default output/cover_<timestamp>)")
+    command.add_argument("--variants", type=int, help="render this many covers with different illustrations")
+    # Template names are checked when the cover is made, the registry is not imported here
+    command.add_argument("--template", help="cover template: classic, poster, storybook or framed")
+    command.set_defaults(run=cover)
+
+    command = commands.add_parser("pdf", help="build the PDF of a generated book")
+    command.add_argument("book", help="book JSON or JSONL file")
+    command.add_argument("images_dir", help="directory with the cover and page images")
+    command.add_argument("--output-dir", help="directory for the PDF (default output/pdf_<timestamp>)")
+    command.add_argument("--vector-text", action="store_true", help="draw the text as real text")
+    command.add_argument("--max-dpi", type=int, help="scale the images down to this resolution")
+    command.add_argument("--profile", nargs="?", const=DEFAULT_PROFILE_DIR, metavar="DIR", help=profile_help)
+    command.set_defaults(run=pdf)
+
+    command = commands.add_parser("preview", help="render a quick preview, or promote one to a full render")
+    command.add_argument("path", help="book JSON file, or a preview directory with --promote")
+    command.add_argument("--backend", default="opensource", help=backend_help)
+    command.add_argument("--promote", action="store_true", help="render the preview in path in full quality")
+    command.add_argument("--profile", nargs="?", const=DEFAULT_PROFILE_DIR, metavar="DIR", help=profile_help)
+    command.add_argument("--vector-text", action="store_true", help="leave the text to the PDF builder")
+    command.set_defaults(run=preview)
+
+    command = commands.add_parser("bench", help="benchmark generation with fake backends")
+    command.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="book sizes in pages")
+    command.add_argument("--repeat", type=int, default=5, help="runs of the single page benchmarks")
+    command.add_argument("--latency", type=float, default=0.0, help="simulated seconds per illustration")
+    command.add_argument("--failure-rate", type=float, default=0.0, help="share of simulated failed generations")
+    command.add_argument("--workers", type=int, default=1, help="pages generated at the same time")
+    command.add_argument("--output", help="results JSON file (default output/bench/bench_<timestamp>.json)")
+    command.add_argument("--compare", help="earlier results JSON file to compare against")
+    command.set_defaults(run=bench)
+
+    command = commands.add_parser("convert", help="convert a book between the JSON and JSONL formats")
+    command.add_argument("book", help="book JSON or JSONL file")
+    command.add_argument("output", help="output file, JSONL if it ends with .jsonl")
+    command.set_defaults(run=convert)
+
+    command = commands.add_parser("plan", help="show how pages would be shared between backends")
+    command.add_argument("book", help="book JSON or JSONL file")
+    command.add_argument("--backend", default="opensource,dreamstudio,dalle", help=backend_help)
+    command.add_argument("--deadline", type=float, metavar="MINUTES", help=deadline_help)
+    command.add_argument("--budget", type=float, metavar="DOLLARS", help=budget_help)
+    command.set_defaults(run=plan)
+
+    queue_help = "work queue directory shared by the coordinator and the workers"
+    lease_help = "seconds without a heartbeat after which a worker's task is given to another worker"
+    command = commands.add_parser("distribute", help="generate a book on workers of a shared work queue")
+    command.add_argument("book", help="book JSON or JSONL file")
+    command.add_argument("--queue", required=True, help=queue_help)
+    command.add_argument("--lease", type=float, default=300, help=lease_help)
+    command.add_argument("--output-dir", default="output", help="shared directory for the book directory")
+    command.add_argument("--vector-text", action="store_true", help="leave the text to the PDF builder")
+    command.add_argument("--timeout", type=float, help="give up after this many seconds")
+    command.add_argument("--encoding", help="image format: png[:level], png-palette, webp[:quality] or jpeg[:quality]")
+    command.set_defaults(run=distribute)
+
+    command = commands.add_parser("worker", help="render the tasks of a shared work queue")
+    command.add_argument("--queue", required=True, help=queue_help)
+    command.add_argument("--backend", default="opensource", help=backend_help)
+    command.add_argument("--lease", type=float, default=300, help=lease_help)
+    command.add_argument("--idle-timeout", type=float, help="stop after the queue was empty this many seconds")
+    command.add_argument("--profile", nargs="?", const=DEFAULT_PROFILE_DIR, metavar="DIR", help=profile_help)
+    command.add_argument("--metrics", nargs="?", const=DEFAULT_METRICS_FILE, metavar="FILE", help=metrics_help)
+    command.set_defaults(run=worker)
+
+    command = commands.add_parser("serve", help="serve book generation jobs over HTTP with the models kept loaded")
+    command.add_argument("--backend", default="opensource", help=backend_help)
+    command.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    command.add_argument("--port", type=int, default=8080, help="port to listen on")
+    command.add_argument("--workers", type=int, default=1, help="pages generated at the same time")
+    command.set_defaults(run=serve)
+    return parser
+
+
+def main(argv=None):
+    from src.utils.book_spec import BookSpecError
+
+    args = build_parser().parse_args(argv)
+    for name in ("book", "path", "images_dir"):
+        path = getattr(args, name, None)
+        if path is not None and not os.path.exists(path):
+            print(f"Error: File not found: {path}")
+            return 1
+    try:
+        args.run(args)
+    except BookSpecError as e:
+        print(f"Error: invalid book specification: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
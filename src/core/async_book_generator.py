@@ -0,0 +1,139 @@
+import asyncio
+import time
+from src.core.batch import BookProgress
+from src.core.book_generator import BookGenerator, compile_book
+from src.utils.metrics import METRICS
+
+
+class AsyncBookGenerator:
+    def __init__(self, generator=None, backend="dalle", concurrency=64):
+        """Generate the pages of many books from one event loop
+
+        Backends with agenerate_illustration keep hundreds of requests in flight
+        without a thread each; the others run in worker threads. Compositing and
+        encoding always run in worker threads. Identical prompts in flight at
+        the same time share one request. Pages do not wait for each other, so
+        they are not continued from the previous page even with a strength.
+        """
+        self.generator = generator or BookGenerator(backend=backend)
+        self.concurrency = concurrency
+        self.semaphore = None
+        self.inflight = {}
+
+    async def _illustrate(self, task):
+        page_maker = self.generator.page_maker
+        async with self.semaphore:
+            if self.generator.samples > 1 or self.generator.cache is not None:
+                # Candidate batches and the cache are handled by the blocking generator
+                return await asyncio.to_thread(
+                    self.generator._generate_illustration, task['description'], task['art_style'],
+                    task['image_size'], task['seed'], task['preview']
+                )
+            # Only passed when set, so backends without seeds or previews keep working
+            options = {}
+            if task['seed'] is not None:
+                options['seed'] = task['seed']
+            if task['preview']:
+                options['preview'] = True
+            start = time.perf_counter()
+            if hasattr(page_maker, 'agenerate_illustration'):
+                image = await page_maker.agenerate_illustration(
+                    task['description'], task['art_style'], task['image_size'], **options
+                )
+            else:
+                image = await asyncio.to_thread(
+                    lambda: page_maker.generate_illustration(
+                        task['description'], task['art_style'], task['image_size'], **options
+                    )
+                )
+        if image is None:
+            raise ValueError("Failed to generate illustration")
+        # Load lazily opened images before they are shared between pages
+        await asyncio.to_thread(image.load)
+        self.generator.record_illustration(image, time.perf_counter() - start)
+        return image
+
+    async def agenerate_page(self, task):
+        """Generate one page from a task returned by BookGenerator.page_tasks"""
+        with METRICS.outcome("pagepainter_pages_total", kind="page"):
+            return await self._agenerate_page(task)
+
+    async def _agenerate_page(self, task):
+        key = self.generator.illustration_key(task)
+        future = self.inflight.get(key)
+        if future is None:
+            future = self.inflight[key] = asyncio.ensure_future(self._illustrate(task))
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        image = await asyncio.shield(future)
+        self.generator.charge_page(task, image)
+
+        await asyncio.to_thread(self._save_page, task, image)
+        return task['output_path']
+
+    def _save_page(self, task, image):
+        with self.generator._stage("page"):
+            self.generator.save_page(task, image)
+
+    async def abuild_book(self, book_data, vector_text=False, name=None):
+        """Generate the cover and all pages of a book concurrently and return its progress"""
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+
+        spec = compile_book(book_data)
+        book_dir = self.generator.create_book_directory(spec.cover.title)
+        book = BookProgress(name or spec.cover.title, book_dir, len(spec) + 1)
+
+        async def run(label, coroutine):
+            try:
+                await coroutine
+                book.done += 1
+            except Exception as e:
+                print(f"Error generating {label} of {book.name}: {str(e)}")
+                book.errors.append(f"{label}: {str(e)}")
+
+        running = {asyncio.ensure_future(run("cover", asyncio.to_thread(self.generator.generate_cover, spec, book_dir)))}
+        # Pages are read as earlier ones finish, a book of any length keeps at most concurrency pages started
+        for i, task in enumerate(self.generator.iter_page_tasks(spec, book_dir, vector_text), 1):
+            if len(running) >= self.concurrency:
+                _, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            running.add(asyncio.ensure_future(run(f"page {i}", self.agenerate_page(task))))
+        await asyncio.gather(*running)
+        self.generator.record_book(book_dir, book.failed > 0)
+        print(f"Book {book.name} finished: {book.done}/{book.total} done, "
+              f"{book.failed} failed, files in {book.book_dir}")
+        return book
+
+    async def abuild_books(self, books, vector_text=False):
+        """Generate (name, book_data) pairs concurrently and return their progress
+
+        books may be an iterator like iter_manifest, at most concurrency books are read and started at a time.
+        """
+        progress = []
+        running = set()
+        for name, book_data in books:
+            if len(running) >= self.concurrency:
+                _, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            future = asyncio.ensure_future(self.abuild_book(book_data, vector_text, name))
+            progress.append(future)
+            running.add(future)
+        return list(await asyncio.gather(*progress))
+
+    async def aclose(self):
+        """Close the async clients of the backend, they belong to the event loop that is ending"""
+        if hasattr(self.generator.page_maker, 'aclose'):
+            await self.generator.page_maker.aclose()
+
+    async def _arun(self, books, vector_text=False):
+        try:
+            return await self.abuild_books(books, vector_text)
+        finally:
+            await self.aclose()
+
+    def run(self, books, vector_text=False):
+        """Blocking entry point: generate the books on a new event loop"""
+        # The semaphore and the clients of the backend belong to the loop they were first used in
+        self.semaphore = None
+        progress = asyncio.run(self._arun(books, vector_text))
+        if self.generator.profiler is not None:
+            self.generator.profiler.report()
+        return progress
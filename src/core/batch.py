@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from src.core.book_generator import BookGenerator, compile_book, load_book
+from src.utils.book_spec import BookSpec, BookSpecError
+
+
+# Covers and pages queued per worker, more are read from the manifest as they finish
+QUEUED_PER_WORKER = 4
+
+
+def iter_manifest(source):
+    """Yield (name, book_data) for every book of a batch, loading each book only when it is reached
+
+    source is either a directory of book JSON or JSONL files or a JSONL
+    manifest where each line is a path to a book file (relative to the
+    manifest), an object with a "path" key, or an inline book specification.
+    """
+    if os.path.isdir(source):
+        for file_name in sorted(os.listdir(source)):
+            if file_name.endswith(('.json', '.jsonl')):
+                yield file_name, load_book(os.path.join(source, file_name))
+        return
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, dict) and 'path' in entry:
+                entry = entry['path']
+            if isinstance(entry, str):
+                yield entry, load_book(os.path.join(base_dir, entry))
+            else:
+                yield f"{source}:{line_number}", entry
+
+
+def validated(books):
+    """Yield every (name, book_data) once its specification is checked, naming the book of an invalid one"""
+    for name, book_data in books:
+        try:
+            BookSpec.from_dict(book_data)
+        except BookSpecError as e:
+            raise BookSpecError(f"{name}: {e.where}", e.message) from e
+        yield name, book_data
+
+
+def load_manifest(source):
+    """Return (name, book_data) for every book of a batch (see iter_manifest), all of them validated"""
+    return list(validated(iter_manifest(source)))
+
+
+def check_manifest(source):
+    """Validate the books of a batch one at a time, so an invalid one stops it before anything is generated
+
+    Returns the number of books.
+    """
+    return sum(1 for _ in validated(iter_manifest(source)))
+
+
+class BookProgress:
+    def __init__(self, name, book_dir, total):
+        """Completion tracking for one book of a batch (cover and pages)"""
+        self.name = name
+        self.book_dir = book_dir
+        self.total = total
+        self.done = 0
+        self.errors = []
+
+    @property
+    def failed(self):
+        return len(self.errors)
+
+    @property
+    def finished(self):
+        return self.done + self.failed == self.total
+
+
+class BatchGenerator:
+    def __init__(self, generator=None, backend="opensource", workers=1):
+        """Generate many books with one set of loaded models
+
+        Covers and pages of all books go through the same worker pool. The
+        Stable Diffusion pipeline already uses every CPU core, so more than one
+        worker only pays off for the API backends.
+        """
+        self.generator = generator or BookGenerator(backend=backend)
+        self.workers = workers
+        self.lock = threading.Lock()
+
+    def _jobs(self, source, vector_text, progress):
+        """Yield (book, label, function, args) of every cover and page, reading the books as they are reached"""
+        for name, book_data in iter_manifest(source):
+            spec = compile_book(book_data)
+            book_dir = self.generator.create_book_directory(spec.cover.title)
+            self.generator.plan_pages(self.generator.iter_page_tasks(spec, book_dir, vector_text))
+            book = BookProgress(name, book_dir, len(spec) + 1)
+            progress.append(book)
+
+            yield book, "cover", self.generator.generate_cover, (spec, book_dir)
+            for i, task in enumerate(self.generator.iter_page_tasks(spec, book_dir, vector_text), 1):
+                yield book, f"page {i}", self.generator.generate_page, (task,)
+
+    def _record(self, futures, done):
+        for future in done:
+            book, label = futures.pop(future)
+            with self.lock:
+                try:
+                    future.result()
+                    book.done += 1
+                except Exception as e:
+                    print(f"Error generating {label} of {book.name}: {str(e)}")
+                    book.errors.append(f"{label}: {str(e)}")
+                if book.finished:
+                    self.generator.record_book(book.book_dir, book.failed > 0)
+                    print(f"Book {book.name} finished: {book.done}/{book.total} done, "
+                          f"{book.failed} failed, files in {book.book_dir}")
+
+    def run(self, source, vector_text=False):
+        """Generate every book of a directory or JSONL manifest and return their progress
+
+        Only a few covers and pages per worker are queued at a time and the
+        books are read as the queue drains, so catalogs and books of any
+        length start at once and take constant memory.
+        """
+        count = check_manifest(source)
+        print(f"Generating {count} books with {self.workers} worker(s)...")
+
+        progress = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {}
+            for book, label, function, args in self._jobs(source, vector_text, progress):
+                if len(futures) >= self.workers * QUEUED_PER_WORKER:
+                    self._record(futures, wait(futures, return_when=FIRST_COMPLETED).done)
+                futures[pool.submit(function, *args)] = (book, label)
+            self._record(futures, as_completed(list(futures)))
+
+        failed = sum(1 for book in progress if book.failed)
+        print(f"\nBatch complete! {len(progress) - failed} of {len(progress)} books without errors")
+        print(f"{self.generator.illustrator.reused} illustrations reused for pages with identical prompts")
+        self.generator.report()
+        return progress
@@ -0,0 +1,30 @@
+import time
+from src.backends.page_painter_fake import prompt_fails, synthetic_image
+from src.utils.cover_layout import TEMPLATES, render_cover
+
+
+class BookCover:
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=0, template="classic"):
+        """Initialize a BookCover that draws synthetic covers, for tests, benchmarks and local runs"""
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.template = TEMPLATES[template]
+        self.calls = 0
+
+    def generate_cover_image(self, title, art_style=None, image_size=None, seed=None):
+        """Generate a synthetic cover illustration based on the title, a different one for every seed"""
+        prompt = f"{art_style}, book cover illustration of {title}"
+        if seed is not None:
+            prompt += f", variant {seed}"
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if prompt_fails(prompt, self.failure_rate, self.seed):
+            raise RuntimeError("Simulated generation failure")
+        return synthetic_image(prompt, image_size)
+
+    def create_cover(self, title, other_info=None, output_path="output/cover.png", art_style=None, image_size=None):
+        """Create a complete book cover with title and other information"""
+        cover_image = self.generate_cover_image(title, art_style, image_size)
+        return render_cover(cover_image, title, other_info or (), self.template, output_path)
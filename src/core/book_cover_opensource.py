@@ -1,17 +1,33 @@
 import torch
 from diffusers import StableDiffusionPipeline
-from PIL import Image, ImageDraw, ImageFont
 import os
-from datetime import datetime
+import threading
+import time
+from src.utils.cover_layout import TEMPLATES, render_cover
+from src.utils.memory import apply_memory_policy, choose_memory_policy
+from src.utils.metrics import METRICS
 
 class BookCover:
-    def __init__(self):
-        """Initialize the BookCover with the Stable Diffusion model"""
-        # Initialize the model
-        model_id = "CompVis/stable-diffusion-v1-4"
-        
+    def __init__(self, pipe=None, template="poster", lock=None):
+        """Initialize the BookCover with the Stable Diffusion model
+
+        An already loaded pipeline (e.g. the PagePainter's) can be passed in
+        to avoid loading the model a second time, together with the lock its
+        owner holds around every render on it.
+        """
         # Force CPU mode for better compatibility
         self.device = "cpu"
+        self.template = TEMPLATES[template]
+        
+        # The pipeline runs one generation at a time, cover variants and pages sharing it wait for it
+        self.lock = lock or threading.Lock()
+        
+        if pipe is not None:
+            self.pipe = pipe
+            return
+        
+        # Initialize the model
+        model_id = "CompVis/stable-diffusion-v1-4"
         
         # Load the pipeline
         self.pipe = StableDiffusionPipeline.from_pretrained(
@@ -21,12 +37,8 @@ class BookCover:
         
         self.pipe = self.pipe.to(self.device)
         
-        # Enable basic memory optimizations
-        self.pipe.enable_attention_slicing()
-        self.pipe.enable_vae_slicing()
-        
-    def generate_cover_image(self, title, art_style=None, image_size=None):
-        """Generate the cover illustration based on the title"""
+    def generate_cover_image(self, title, art_style=None, image_size=None, seed=None):
+        """Generate the cover illustration based on the title, seeded for reproducible variants"""
         # Set default image size if not provided
         if image_size is None:
             image_size = {"width": 384, "height": 512}
@@ -38,14 +50,24 @@ class BookCover:
             prompt = f"watercolor style illustration, children's book style, book cover illustration of {title}, professional book cover art"
         
         # Generate the image
-        with torch.inference_mode():
+        generator = None if seed is None else torch.Generator(self.device).manual_seed(seed)
+        with self.lock, torch.inference_mode():
+            # Only the memory savings this cover size needs, large covers decode in tiles; chosen
+            # under the lock so a page sharing the pipeline can't switch them before the render
+            policy = choose_memory_policy(image_size)
+            apply_memory_policy(self.pipe, policy)
+            start = time.perf_counter()
             image = self.pipe(
                 prompt,
                 num_inference_steps=15,
                 guidance_scale=7.5,
                 height=image_size["height"],
-                width=image_size["width"]
+                width=image_size["width"],
+                generator=generator
             ).images[0]
+            elapsed = time.perf_counter() - start
+            METRICS.observe("pagepainter_render_seconds", elapsed, policy=str(policy))
+        print(f"Cover illustration rendered in {elapsed:.1f}s with {policy}")
         
         return image
     
@@ -53,82 +75,7 @@ class BookCover:
         """Create a complete book cover with title and other information"""
         # Generate the cover illustration
         cover_image = self.generate_cover_image(title, art_style, image_size)
-        
-        # Create a new white canvas (typical book cover proportions)
-        canvas_width = 1200
-        canvas_height = 1800
-        canvas = Image.new('RGB', (canvas_width, canvas_height), 'white')
-        
-        # Resize and paste the illustration
-        illustration_height = int(canvas_height * 0.8)  # Leave space for text
-        resized_image = cover_image.resize((canvas_width, illustration_height))
-        canvas.paste(resized_image, (0, 0))
-        
-        # Add text
-        draw = ImageDraw.Draw(canvas)
-        
-        # Try to use different fonts for title and other text
-        try:
-            title_font = ImageFont.truetype("arial.ttf", 120)  # Larger size for title
-            info_font = ImageFont.truetype("arial.ttf", 48)    # Smaller size for other info
-        except:
-            title_font = ImageFont.load_default()
-            info_font = ImageFont.load_default()
-        
-        # Add title at the top
-        # Word wrap for title
-        words = title.split()
-        lines = []
-        current_line = []
-        margin = 60
-        
-        for word in words:
-            current_line.append(word)
-            text_width = draw.textlength(' '.join(current_line), font=title_font)
-            if text_width > canvas_width - 2 * margin:
-                if len(current_line) == 1:
-                    lines.append(current_line[0])
-                    current_line = []
-                else:
-                    current_line.pop()
-                    lines.append(' '.join(current_line))
-                    current_line = [word]
-        
-        if current_line:
-            lines.append(' '.join(current_line))
-        
-        # Draw title with shadow effect
-        title_y = 50  # Top margin
-        for line in lines:
-            text_width = draw.textlength(line, font=title_font)
-            x = (canvas_width - text_width) / 2
-            
-            # Draw shadow
-            shadow_offset = 4
-            draw.text((x + shadow_offset, title_y + shadow_offset), line, 
-                     font=title_font, fill='grey')
-            # Draw text
-            draw.text((x, title_y), line, font=title_font, fill='black')
-            title_y += int(title_font.size * 1.2)  # Move down for next line
-        
-        # Add other info at the bottom
-        if other_info:
-            info_y = canvas_height - 200  # Bottom margin
-            for info in other_info:
-                text_width = draw.textlength(info, font=info_font)
-                x = (canvas_width - text_width) / 2
-                draw.text((x, info_y), info, font=info_font, fill='black')
-                info_y += int(info_font.size * 1.2)
-        
-        # Add current year at the bottom
-        year = str(datetime.now().year)
-        year_width = draw.textlength(year, font=info_font)
-        x = (canvas_width - year_width) / 2
-        draw.text((x, canvas_height - 80), year, font=info_font, fill='black')
-        
-        # Save the final cover
-        canvas.save(output_path)
-        return canvas
+        return render_cover(cover_image, title, other_info or (), self.template, output_path)
 
 def main():
     # Create output directory if it doesn't exist
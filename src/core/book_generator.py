@@ -0,0 +1,741 @@
+import importlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import wait as wait_futures
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from src.core.coalesce import CoalescingIllustrator
+from src.core.failover import BackendChain
+from src.core.illustration_cache import IllustrationCache
+from src.core.scheduler import BACKEND_PROFILES, DEFAULT_PROFILE, Scheduler
+from src.utils.book_io import file_digest, inputs_hash, load_book
+from src.utils.book_spec import BookSpec, book_settings, cover_spec
+from src.utils.contact_sheet import create_contact_sheet
+from src.utils.content_store import ContentStore
+from src.utils.cover_layout import create_cover_variants
+from src.utils.create_pdf import create_pdf
+from src.utils.encoded_images import decode_all
+from src.utils.image_encoding import EncoderPool, write_image
+from src.utils.memory import MemoryMonitor
+from src.utils.metrics import METRICS
+from src.utils.profiling import Profiler
+from src.utils.image_scoring import image_score, pick_best
+from src.utils.page_layout import cover_filename, page_filename
+
+
+# Seeds of the pages of a preview, read back when it is promoted to a full render
+SEEDS_FILE = "seeds.json"
+# Resolution of the images in preview PDFs
+PREVIEW_DPI = 72
+# Pages queued for encoding per encoder process before generation waits for them
+WRITES_PER_ENCODER = 2
+
+# Page maker and cover maker modules of each backend. They are imported lazily
+# so that e.g. the DALL-E backend does not need torch or the Stability SDK.
+BACKENDS = {
+    "dalle": ("src.backends.page_painter_dalle", "src.core.book_cover_dalle"),
+    "dreamstudio": ("src.backends.page_painter_dreamstudio", "src.core.book_cover_dreamstudio"),
+    "opensource": ("src.backends.page_painter_opensource", "src.core.book_cover_opensource"),
+    # Synthetic images, for tests and local runs without API keys or models
+    "fake": ("src.backends.page_painter_fake", "src.core.book_cover_fake"),
+}
+
+
+def load_backend(name):
+    """Create the page maker and cover maker of a backend
+
+    A comma separated list of backends, e.g. "dalle,dreamstudio,opensource",
+    creates a BackendChain that moves pages on to the next backend while one
+    is failing. The cover is made by the first backend.
+    """
+    names = name.split(",")
+    if len(names) > 1:
+        makers = [load_backend(backend) for backend in names]
+        chain = BackendChain([(backend, page_maker) for backend, (page_maker, _) in zip(names, makers)])
+        return chain, makers[0][1]
+
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}', choose one of: {', '.join(BACKENDS)}")
+    page_module, cover_module = BACKENDS[name]
+
+    page_maker = importlib.import_module(page_module).PagePainter()
+    cover_class = importlib.import_module(cover_module).BookCover
+    if hasattr(page_maker, 'pipe'):
+        # Share the already loaded Stable Diffusion pipeline instead of loading it twice, and its lock
+        # so covers and pages never render on it (or change its memory savings) at the same time
+        cover_maker = cover_class(pipe=page_maker.pipe, lock=page_maker.lock)
+    else:
+        cover_maker = cover_class()
+    return page_maker, cover_maker
+
+
+def job_generator(job, state):
+    """BookGenerator with the backend and settings a recorded job was started with, to resume it"""
+    settings = dict(job['settings'])
+    if settings.get('cache'):
+        settings['cache'] = IllustrationCache(settings['cache'])
+    if settings.get('store'):
+        settings['store'] = ContentStore(settings['store'])
+    return BookGenerator(backend=job['backend'], state=state, **settings)
+
+
+def load_scheduler(name, deadline=None, budget=None):
+    """Create a Scheduler over a comma separated list of backends, the cover is made by the first"""
+    names = name.split(",")
+    makers = [load_backend(backend) for backend in names]
+    scheduler = Scheduler([(backend, page_maker) for backend, (page_maker, _) in zip(names, makers)], deadline, budget)
+    return scheduler, makers[0][1]
+
+
+def load_cover_maker(name):
+    """Create only the cover maker of a backend"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}', choose one of: {', '.join(BACKENDS)}")
+    return importlib.import_module(BACKENDS[name][1]).BookCover()
+
+
+def make_cover(cover_maker, book_data, cover_path, preview=False, encoder=None, store=None):
+    """Generate the cover of a book with the cover maker of any backend
+
+    With an EncoderPool the cover is encoded by the pool instead of saved by
+    the cover maker, with a ContentStore it is written into the store (see write_image).
+    """
+    if isinstance(book_data, BookSpec):
+        cover, default_style = book_data.cover, book_data.art_style
+    else:
+        # Cover tasks of a work queue come without the pages
+        cover, default_style = cover_spec(book_data), book_settings(book_data)[0]
+    image_size = cover.image_size
+    if preview:
+        image_size = {key: value // 2 for key, value in image_size.items()}
+    output_path = None if encoder is not None or store is not None else cover_path
+
+    if hasattr(cover_maker, 'generate_cover'):
+        # The DALL-E cover words the author and illustrator lines itself
+        cover_info = {"title": cover.title, "author": cover.author, "illustrator": cover.illustrator,
+                      "additional_info": cover.additional_info}
+        canvas = cover_maker.generate_cover(cover_info, cover.art_style, output_path, default_style)
+    else:
+        canvas = cover_maker.create_cover(
+            title=cover.title,
+            other_info=cover.other_info,
+            output_path=output_path,
+            art_style=cover.art_style,
+            image_size=image_size
+        )
+    if output_path is None:
+        write_image(canvas, cover_path, encoder, store).result()
+    return cover_path
+
+
+def make_cover_variants(cover_maker, book_data, cover_paths, workers=None):
+    """Generate one cover per path with different illustrations and the same typography, in parallel
+
+    The title and lines are laid out once for all of them (see create_cover_variants).
+    """
+    cover = book_data.cover if isinstance(book_data, BookSpec) else cover_spec(book_data)
+    create_cover_variants(cover_maker, cover.title, cover.other_info, cover_paths, cover.art_style,
+                          cover.image_size, workers)
+    return cover_paths
+
+
+def compile_book(book_data):
+    """BookSpec of a book specification, which load_book has already validated"""
+    if isinstance(book_data, BookSpec):
+        return book_data
+    return BookSpec.from_dict(book_data, validate=False)
+
+
+def page_seed(art_style, description):
+    """Seed of a page that has none in its specification, stable for the same prompt"""
+    return int(inputs_hash([art_style, description])[:8], 16)
+
+
+class PreviousPage:
+    def __init__(self):
+        """Illustration of a page, awaited by the page that continues from it"""
+        self.ready = threading.Event()
+        self.image = None
+
+
+class BookGenerator:
+    def __init__(self, backend="opensource", page_maker=None, cover_maker=None, output_dir="output", state=None,
+                 samples=1, scorer=None, cache=None, preview=False, strength=None, store=None,
+                 memory_budget=None, encoding=None, encoders=None, deadline=None, budget=None, profile=None):
+        """Initialize the book generator with cover and page makers
+
+        The makers are created from the backend name unless they are passed in,
+        so one generator keeps its models loaded across many books. With a
+        StateStore the progress of every book is recorded so it can be resumed.
+
+        With samples > 1 backends that support it generate that many candidates
+        per page in one request and the best one is kept (see pick_best, scorer
+        can replace its score). An IllustrationCache keeps the other candidates
+        and reuses illustrations generated before.
+
+        With preview=True the backends render quick low quality illustrations
+        with recorded seeds, and every book gets a contact sheet and a low
+        resolution PDF. promote() renders an approved preview in full quality.
+
+        With a strength (0 to 1) backends that support it start every page
+        but the first from the illustration of the previous page, keeping the
+        characters consistent and running only that fraction of the steps.
+        Pages are then generated in order within a book.
+
+        With a ContentStore the cover and page files are kept once by content
+        and the book directories hold hard links to them.
+
+        With a memory_budget in MB the peak memory of every stage is reported
+        after each book, and above the budget the illustrations kept for later
+        pages with the same prompt are dropped (they are generated again).
+
+        With an encoding (e.g. "png:1", "png-palette", "webp:80", "jpeg:90",
+        see parse_encoding) the cover and pages are written in that format by
+        an EncoderPool of encoders processes instead of as default PNGs.
+
+        With a deadline (seconds) or a budget (dollars) the backends of a
+        comma separated list are not tried in order but share the pages
+        through a Scheduler, which prints its plan before the pages start.
+
+        With a profile directory every stage runs under a Profiler, and the
+        statistics, collapsed stacks and a summary of the top functions per
+        stage are written there after each book. The PyTorch profiler records
+        the operators of the opensource backend too.
+        """
+        print("Initializing book generator...")
+        if page_maker is None or cover_maker is None:
+            if deadline is not None or budget is not None:
+                page_maker, cover_maker = load_scheduler(backend, deadline, budget)
+            else:
+                page_maker, cover_maker = load_backend(backend)
+        self.backend = backend
+        self.cover_maker = cover_maker
+        self.page_maker = page_maker
+        self.output_dir = output_dir
+        self.state = state
+        self.samples = samples
+        self.scorer = scorer
+        self.cache = cache
+        self.preview = preview
+        self.strength = strength
+        self.store = store
+        self.memory = MemoryMonitor(memory_budget) if memory_budget is not None else None
+        self.encoder = EncoderPool(encoding, encoders) if encoding is not None else None
+        self.extension = self.encoder.extension if self.encoder is not None else ".png"
+        self.profiler = None
+        if profile is not None:
+            self.profiler = Profiler(profile, torch_ops="opensource" in backend.split(","))
+        if strength is not None and not hasattr(page_maker, 'continue_illustration'):
+            print(f"Warning: the {backend} backend cannot continue from previous pages, strength is ignored")
+            self.strength = None
+        # Pages waiting for the illustration of the page before, by its output path
+        self.continuations = {}
+        # Backend that produced each recorded file, by path
+        self.produced_by = {}
+        # Pages with the same prompt share one illustration
+        self.illustrator = CoalescingIllustrator(self._generate_illustration)
+        # Estimated spend on the illustrations of every book being generated, by book directory
+        self.book_costs = Counter()
+        # Pages still being encoded, by output path (see save_page)
+        self.writes = {}
+        # Illustrations a Scheduler has planned a backend call for, by illustration key
+        self.scheduled = Counter()
+        self.lock = threading.Lock()
+
+    def create_book_directory(self, book_title):
+        """Create a directory for the book's files"""
+        # Create a safe filename from the title
+        safe_title = "".join(x for x in book_title if x.isalnum() or x in (' ', '-', '_')).rstrip()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        dir_name = os.path.join(self.output_dir, f"book_{safe_title}_{timestamp}")
+
+        # Books with the same title generated in the same second get their own directory
+        suffix = 1
+        while os.path.exists(dir_name):
+            suffix += 1
+            dir_name = os.path.join(self.output_dir, f"book_{safe_title}_{timestamp}_{suffix}")
+
+        os.makedirs(dir_name)
+        return dir_name
+
+    def generate_cover(self, book_data, book_dir):
+        """Generate the book cover and return its path"""
+        cover_path = os.path.join(book_dir, cover_filename(self.extension))
+        with self._stage("cover"), METRICS.outcome("pagepainter_pages_total", kind="cover"):
+            make_cover(self.cover_maker, book_data, cover_path, self.preview, self.encoder, self.store)
+        if self.state is not None:
+            self.produced_by[cover_path] = self.backend.split(",")[0]
+        return cover_path
+
+    def use_encoding(self, encoding):
+        """Write the following covers and pages in encoding (a spec or None for default PNGs)
+
+        A Worker switches to the encoding of each queue task, the pool of the
+        previous encoding is shut down once its pages are written.
+        """
+        current = str(self.encoder.encoding) if self.encoder is not None else None
+        if encoding == current:
+            return
+        self.wait_writes()
+        workers = None
+        if self.encoder is not None:
+            workers = self.encoder.workers
+            self.encoder.shutdown()
+        self.encoder = EncoderPool(encoding, workers) if encoding is not None else None
+        self.extension = self.encoder.extension if self.encoder is not None else ".png"
+
+    def page_tasks(self, book_data, book_dir, vector_text=False):
+        """Return the keyword arguments of create_book_page for every page of the book"""
+        return list(self.iter_page_tasks(book_data, book_dir, vector_text))
+
+    def iter_page_tasks(self, book_data, book_dir, vector_text=False):
+        """Yield the page tasks one at a time, the pages of JSONL books are read as they are needed"""
+        spec = compile_book(book_data)
+
+        previous_path = None
+        for page in spec.pages:
+            seed = page.seed
+            if seed is None and self.preview:
+                seed = page_seed(page.art_style, page.description)
+            task = {
+                'text': page.text,
+                'description': page.description,
+                'output_path': os.path.join(book_dir, page_filename(page.index, vector_text, self.extension)),
+                'art_style': page.art_style,
+                'image_size': page.image_size,
+                'render_text': not vector_text,
+                'seed': seed,
+                'preview': self.preview,
+                'continue_from': previous_path if self.strength is not None else None,
+                'key': page.key,
+            }
+            previous_path = task['output_path']
+            yield task
+
+    def illustration_key(self, task):
+        """Key of the illustration a page task needs, equal for identical final prompts"""
+        # The page key already covers the prompt and size, a preview seed is added here
+        return inputs_hash([task['key'], task['seed'], task['preview'], task['continue_from']])
+
+    def plan_pages(self, tasks):
+        """Announce the pages about to be generated
+
+        Identical illustrations are then generated once, and pages continuing
+        from a page in the same plan wait for its illustration. tasks is read
+        once, only the keys of the illustrations are kept.
+        """
+        keys = Counter()
+        continued = 0
+        previous_path = None
+        for task in tasks:
+            # Pages continue from the page before them, which is planned if it came just before
+            if task['continue_from'] is not None and task['continue_from'] == previous_path:
+                self.continuations[task['continue_from']] = PreviousPage()
+                continued += 1
+            else:
+                keys[self.illustration_key(task)] += 1
+            previous_path = task['output_path']
+        # Illustrations needed by a single page are not kept, so only shared ones are planned
+        self.illustrator.plan({key: count for key, count in keys.items() if count > 1})
+        if hasattr(self.page_maker, 'schedule'):
+            # Pages with the same illustration need it only once
+            self.page_maker.schedule(len(keys) + continued, self.samples)
+            with self.lock:
+                self.scheduled.update(keys.keys())
+
+    def _generate_illustration(self, description, art_style, image_size, seed=None, preview=False):
+        key = inputs_hash([self.backend, art_style, description, image_size, seed, preview])
+        if self.cache is not None:
+            image = self.cache.get(key)
+            if image is not None:
+                METRICS.inc("pagepainter_illustrations_reused_total")
+                return image
+
+        # Only passed when set, so backends without seeds or previews keep working
+        options = {}
+        if seed is not None:
+            options['seed'] = seed
+        if preview:
+            options['preview'] = True
+
+        candidates = []
+        start = time.perf_counter()
+        if self.samples > 1 and hasattr(self.page_maker, 'generate_candidates'):
+            candidates = self.page_maker.generate_candidates(
+                description, art_style, image_size, self.samples, **options
+            )
+            # Scoring needs the pixels of every candidate, decode them side by side
+            image, candidates = pick_best(decode_all(candidates), self.scorer)
+            if image_score(image) == 0:
+                raise ValueError("All candidate illustrations were blank or filtered")
+        else:
+            image = self.page_maker.generate_illustration(description, art_style, image_size, **options)
+        if image is None:
+            raise ValueError("Failed to generate illustration")
+        self.record_illustration(image, time.perf_counter() - start, 1 + len(candidates))
+
+        if self.cache is not None:
+            # Written from the encoded bytes while the pixels are not decoded yet
+            self.cache.put(key, [image] + candidates)
+        # Load lazily opened images before they are shared between pages,
+        # from here on only the pixels are needed
+        image.load()
+        image.info.pop('encoded', None)
+        return image
+
+    def _unschedule(self, key, image):
+        """Take a planned illustration the Scheduler did not generate (cached, or shared across plans) off its plan"""
+        with self.lock:
+            planned = self.scheduled[key] > 0
+            if planned:
+                self.scheduled[key] -= 1
+                if not self.scheduled[key]:
+                    del self.scheduled[key]
+            # Only the first page of a freshly scheduled illustration was served by its backend call
+            served = image.info.pop('scheduled', False)
+        if planned and not served:
+            self.page_maker.skip()
+
+    def record_illustration(self, image, seconds, count=1):
+        """Count a generated illustration (and its other candidates) in the metrics
+
+        The estimated price is kept in image.info['cost'] until the first page
+        using the illustration charges it to its book (see charge_page).
+        """
+        backend = image.info.get('backend', self.backend)
+        price = BACKEND_PROFILES.get(backend, DEFAULT_PROFILE)['price'] * count
+        METRICS.inc("pagepainter_illustrations_total", count, backend=backend)
+        METRICS.observe("pagepainter_illustration_seconds", seconds, backend=backend)
+        if price:
+            METRICS.inc("pagepainter_spend_dollars_total", price, backend=backend)
+        image.info['cost'] = price
+
+    def charge_page(self, task, image):
+        """Add the price of a page's illustration to its book, pages sharing an illustration pay once"""
+        cost = image.info.pop('cost', 0.0)
+        with self.lock:
+            self.book_costs[os.path.dirname(task['output_path'])] += cost
+
+    def record_book(self, book_dir, failed=False):
+        """Count a finished book and observe its estimated spend"""
+        with self.lock:
+            cost = self.book_costs.pop(book_dir, 0.0)
+        METRICS.inc("pagepainter_books_total", status="failed" if failed else "done")
+        METRICS.observe("pagepainter_book_cost_dollars", cost)
+
+    @contextmanager
+    def _stage(self, name):
+        with self.memory.stage(name) if self.memory is not None else nullcontext(), \
+                self.profiler.stage(name) if self.profiler is not None else nullcontext(), \
+                METRICS.time("pagepainter_stage_seconds", stage=name):
+            yield
+
+    def report(self):
+        """Print the memory and profile reports, where they are enabled"""
+        if self.memory is not None:
+            self.memory.report()
+        if self.profiler is not None:
+            self.profiler.report()
+
+    def generate_page(self, task, wait=True):
+        """Generate one page from a task returned by page_tasks
+
+        With wait=False the page may still be encoding when this returns, see save_page.
+        """
+        with METRICS.outcome("pagepainter_pages_total", kind="page"):
+            return self._generate_page(task, wait)
+
+    def _generate_page(self, task, wait=True):
+        previous = self.continuations.get(task['continue_from']) if task['continue_from'] else None
+        image = None
+        with self._stage("illustration"):
+            try:
+                if previous is not None:
+                    # Pages are queued in order, so the previous page is already being generated
+                    previous.ready.wait()
+                    # Removed only once ready, the previous page looks it up to hand its illustration over
+                    self.continuations.pop(task['continue_from'], None)
+                if previous is not None and previous.image is not None:
+                    start = time.perf_counter()
+                    image = self.page_maker.continue_illustration(
+                        previous.image, task['description'], task['art_style'], task['image_size'],
+                        self.strength, task['seed']
+                    )
+                    self.record_illustration(image, time.perf_counter() - start)
+                else:
+                    key = self.illustration_key(task)
+                    image = self.illustrator(
+                        key, task['description'], task['art_style'], task['image_size'], task['seed'], task['preview']
+                    )
+                    self._unschedule(key, image)
+            finally:
+                # Without an illustration the next page starts from noise
+                following = self.continuations.get(task['output_path'])
+                if following is not None:
+                    following.image = image
+                    following.ready.set()
+
+        self.charge_page(task, image)
+        with self._stage("page"):
+            page = self.save_page(task, image, wait)
+            # The page is on disk, free its pixels now rather than whenever the frame goes away
+            if page is not None:
+                page.close()
+        if self.state is not None:
+            self.produced_by[task['output_path']] = image.info.get('backend', self.backend)
+        if self.memory is not None:
+            self.memory.release(self.illustrator.clear)
+        return task['output_path']
+
+    def save_page(self, task, image, wait=True):
+        """Compose a page from its illustration and write it to its output path
+
+        With wait=False a page encoded by the EncoderPool is left to it and
+        None is returned, the next page is generated while it is encoded.
+        wait_writes() waits for those pages.
+        """
+        if self.encoder is None and self.store is None:
+            return self.page_maker.create_page(task['text'], image, task['output_path'], task['render_text'])
+        page = self.page_maker.create_page(task['text'], image, None, task['render_text'])
+        future = write_image(page, task['output_path'], self.encoder, self.store)
+        if wait or future.done():
+            future.result()
+            return page
+        # The encoder reads the page until it is written
+        future.add_done_callback(lambda _: page.close())
+        with self.lock:
+            self.writes[task['output_path']] = future
+            queued = list(self.writes.values())
+        future.add_done_callback(lambda done: self._written(task['output_path'], done))
+        # Generation stays at most a few pages ahead of the encoders, so pages do not pile up in memory
+        if len(queued) > WRITES_PER_ENCODER * max(self.encoder.workers, 1):
+            wait_futures(queued[:len(queued) - WRITES_PER_ENCODER * max(self.encoder.workers, 1)])
+        return None
+
+    def _written(self, path, future):
+        """Forget a page once it is on disk, failed writes are kept for wait_writes to report"""
+        if future.exception() is None:
+            with self.lock:
+                if self.writes.get(path) is future:
+                    del self.writes[path]
+
+    def wait_writes(self, book_dir=None):
+        """Wait for the pages still being encoded (those of book_dir), return the errors by output path"""
+        with self.lock:
+            writes = {path: future for path, future in self.writes.items()
+                      if book_dir is None or os.path.dirname(path) == book_dir}
+        errors = {}
+        for path, future in writes.items():
+            try:
+                future.result()
+            except Exception as e:
+                errors[path] = e
+        with self.lock:
+            for path in writes:
+                self.writes.pop(path, None)
+        return errors
+
+    def settings(self):
+        """The options the pages of a job depend on, recorded with it so it is resumed with the same ones"""
+        return {
+            'samples': self.samples,
+            'cache': self.cache.directory if self.cache is not None else None,
+            'preview': self.preview,
+            'strength': self.strength,
+            'store': self.store.directory if self.store is not None else None,
+            'encoding': str(self.encoder.encoding) if self.encoder is not None else None,
+        }
+
+    def job_pages(self, book_data, book_dir, vector_text=False):
+        """Yield (index, inputs, output_path) of the cover (index 0) and every page"""
+        spec = compile_book(book_data)
+        cover_inputs = {
+            'cover': book_data['cover'],
+            'art_style': spec.cover.art_style,
+            'image_size': spec.cover.image_size,
+        }
+        yield 0, cover_inputs, os.path.join(book_dir, cover_filename(self.extension))
+        for i, task in enumerate(self.iter_page_tasks(spec, book_dir, vector_text), 1):
+            inputs = {key: value for key, value in task.items() if key != 'output_path'}
+            yield i, inputs, task['output_path']
+
+    def _tracked(self, job_id, index, function, *args, written=None):
+        """Run the generation of the cover or a page, recording it in the state store
+
+        A page still being encoded is added to written (by index, as
+        (backend, future)) and recorded as soon as it is on disk, see _record_write.
+        """
+        if job_id is None:
+            return function(*args)
+        self.state.start_page(job_id, index)
+        try:
+            result = function(*args)
+        except Exception as e:
+            self.state.fail_page(job_id, index, str(e))
+            raise
+        backend = self.produced_by.pop(result, None)
+        with self.lock:
+            future = self.writes.get(result)
+            if future is not None and written is not None:
+                written[index] = (backend, future)
+        if future is None or written is None:
+            self.state.finish_page(job_id, index, backend)
+        else:
+            future.add_done_callback(lambda done: self._record_write(job_id, index, backend, done, written))
+        return result
+
+    def _record_write(self, job_id, index, backend, future, written):
+        """Record a page done or failed once its write finished and drop it from written"""
+        error = future.exception()
+        if error is None:
+            self.state.finish_page(job_id, index, backend)
+        else:
+            self.state.fail_page(job_id, index, str(error))
+        with self.lock:
+            written.pop(index, None)
+
+    def _finish_writes(self, job_id, book_dir, written):
+        """Wait for the pages of a book still being encoded and record them, return the errors by path"""
+        errors = self.wait_writes(book_dir)
+        if job_id is not None:
+            # Callbacks of finished writes may not have run yet, the book is only done once they are recorded
+            with self.lock:
+                remaining = list(written.items())
+            for index, (backend, future) in remaining:
+                self._record_write(job_id, index, backend, future, written)
+        return errors
+
+    def _generate(self, job_id, book_data, book_dir, vector_text=False, indices=None):
+        """Generate the cover and pages of a book, or only those in indices"""
+        spec = compile_book(book_data)
+        if indices is None or 0 in indices:
+            print("\nGenerating book cover...")
+            cover_path = self._tracked(job_id, 0, self.generate_cover, spec, book_dir)
+            print(f"Cover saved as: {cover_path}")
+
+        def selected():
+            # Read again for every pass, so a book of any length is never held in memory
+            for i, task in enumerate(self.iter_page_tasks(spec, book_dir, vector_text), 1):
+                if indices is None or i in indices:
+                    yield i, task
+
+        self.plan_pages(task for _, task in selected())
+
+        print("\nGenerating book pages...")
+        written = {}
+        try:
+            for i, task in selected():
+                print(f"\nGenerating page {i}...")
+                # Encoded by the EncoderPool while the next pages are generated
+                page_path = self._tracked(job_id, i, self.generate_page, task, False, written=written)
+                print(f"Page {i} saved as: {page_path}")
+        finally:
+            errors = self._finish_writes(job_id, book_dir, written)
+        if errors:
+            path, error = next(iter(errors.items()))
+            raise RuntimeError(f"Failed to write {path}: {str(error)}") from error
+
+        if job_id is not None:
+            self.state.finish_job(job_id)
+        print(f"\nBook generation complete! All files are in: {book_dir}")
+        self.record_book(book_dir)
+        self.report()
+
+    def build_book(self, book_data, vector_text=False):
+        """Generate a complete book from an already loaded specification"""
+        # Invalid specifications fail here, before anything is created
+        spec = BookSpec.from_dict(book_data)
+
+        # Create book directory
+        book_dir = self.create_book_directory(spec.cover.title)
+        print(f"Creating book in directory: {book_dir}")
+
+        job_id = None
+        if self.state is not None:
+            job_id = self.state.create_job(
+                book_data, self.backend, book_dir, self.job_pages(book_data, book_dir, vector_text), vector_text,
+                self.settings()
+            )
+            print(f"Recording progress as job {job_id} in {self.state.path}")
+
+        self._generate(job_id, spec, book_dir, vector_text)
+        if self.preview:
+            self.finish_preview(book_data, book_dir, vector_text)
+        return book_dir
+
+    def finish_preview(self, book_data, book_dir, vector_text=False):
+        """Save the specification, page seeds, a contact sheet and a low resolution PDF of a preview"""
+        book_json = os.path.join(book_dir, "book.json")
+        with open(book_json, 'w', encoding='utf-8') as f:
+            # default=list writes the lazily read pages of JSONL books
+            json.dump(book_data, f, ensure_ascii=False, indent=4, default=list)
+        tasks = self.page_tasks(book_data, book_dir, vector_text)
+        with open(os.path.join(book_dir, SEEDS_FILE), 'w', encoding='utf-8') as f:
+            json.dump({"vector_text": vector_text, "pages": [task['seed'] for task in tasks]}, f, indent=4)
+
+        image_paths = [os.path.join(book_dir, cover_filename(self.extension))] + [task['output_path'] for task in tasks]
+        labels = ["cover"] + [f"page {i}" for i in range(1, len(tasks) + 1)]
+        sheet_path = create_contact_sheet(image_paths, os.path.join(book_dir, "contact_sheet.png"), labels=labels)
+        print(f"Contact sheet saved as: {sheet_path}")
+        create_pdf(book_json, book_dir, book_dir, vector_text, max_dpi=PREVIEW_DPI, profiler=self.profiler)
+        if self.profiler is not None:
+            self.profiler.report()
+
+    def promote(self, preview_dir):
+        """Render an approved preview in full quality with the seeds of its pages"""
+        book_data = load_book(os.path.join(preview_dir, "book.json"))
+        with open(os.path.join(preview_dir, SEEDS_FILE), 'r', encoding='utf-8') as f:
+            seeds = json.load(f)
+        for page, seed in zip(book_data['pages'], seeds['pages']):
+            page['seed'] = seed
+        print(f"Promoting preview {preview_dir} to a full render...")
+        return self.build_book(book_data, seeds['vector_text'])
+
+    def generate_book(self, json_path, vector_text=False):
+        """Generate a complete book from JSON specification
+
+        With vector_text=True the pages are saved without text, for
+        create_pdf(..., vector_text=True) to draw it as real text.
+        """
+        print(f"Loading book data from {json_path}...")
+        return self.build_book(load_book(json_path), vector_text)
+
+    def resume(self, job_id):
+        """Generate only the unfinished pages of a recorded job and return its directory"""
+        job = self.state.job(job_id)
+        if job is None:
+            raise ValueError(f"Unknown job: {job_id}")
+
+        source = job['pages_source']
+        if source is not None:
+            if not os.path.exists(source['path']):
+                raise ValueError(f"Job {job_id} reads its pages from {source['path']}, which no longer exists")
+            if file_digest(source['path']) != source['sha256']:
+                raise ValueError(f"Job {job_id} reads its pages from {source['path']}, which changed since it started")
+        if job['backend'] != self.backend:
+            raise ValueError(f"Job {job_id} was generated with the {job['backend']} backend, "
+                             f"not {self.backend}; resume it with the same backend")
+        # Pages are generated to the files recorded for them from the same inputs, or not at all
+        pages = self.state.pages(job_id)
+        planned = self.job_pages(job['spec'], job['book_dir'], job['vector_text'])
+        changed = [
+            page['page_index'] for page, (_, inputs, output_path) in zip(pages, planned)
+            if page['inputs_hash'] != inputs_hash(inputs) or page['output_path'] != output_path
+        ]
+        if changed:
+            raise ValueError(f"Job {job_id} was recorded with other settings (e.g. encoding, preview or "
+                             f"strength): {len(changed)} page(s) starting with {changed[0]} would be generated "
+                             f"from other inputs or to other files; resume it with the same settings")
+
+        # Pages recorded as done whose file has since disappeared are generated again too
+        indices = {
+            page['page_index'] for page in pages
+            if page['status'] != 'done' or not os.path.exists(page['output_path'])
+        }
+        print(f"Resuming job {job_id} ({job['title']}): {len(indices)} page(s) left")
+        os.makedirs(job['book_dir'], exist_ok=True)
+        self._generate(job_id, job['spec'], job['book_dir'], job['vector_text'], indices)
+        return job['book_dir']
@@ -0,0 +1,108 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        """Share one execution among concurrent callers that use the same key"""
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, function, *args):
+        """Run function(*args), or wait for the identical call already in flight and share its result"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+
+        if leader:
+            try:
+                call.result = function(*args)
+            except Exception as e:
+                call.error = e
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call.event.set()
+        else:
+            call.event.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class CoalescingIllustrator:
+    def __init__(self, generate):
+        """Front of generate_illustration that generates each distinct prompt once
+
+        Identical requests in flight at the same time share one generation.
+        Pages announced with plan() keep their illustration until the last
+        page that needs it has been generated, then it is released.
+        """
+        self.generate = generate
+        self.single_flight = SingleFlight()
+        self.lock = threading.Lock()
+        self.planned = {}
+        self.results = {}
+        self.requests = 0
+        self.generated = 0
+
+    @property
+    def reused(self):
+        """Requests served without a generation of their own"""
+        return self.requests - self.generated
+
+    def plan(self, keys):
+        """Announce the illustrations about to be requested, as keys or a mapping of key to requests"""
+        counts = keys.items() if hasattr(keys, 'items') else ((key, 1) for key in keys)
+        with self.lock:
+            for key, count in counts:
+                self.planned[key] = self.planned.get(key, 0) + count
+
+    def clear(self):
+        """Drop the illustrations kept for pages still to come, they are generated again when needed"""
+        with self.lock:
+            self.results.clear()
+
+    def _use(self, key):
+        remaining = self.planned.get(key, 1) - 1
+        if remaining > 0:
+            self.planned[key] = remaining
+        else:
+            self.planned.pop(key, None)
+            self.results.pop(key, None)
+        return remaining
+
+    def __call__(self, key, *args):
+        with self.lock:
+            self.requests += 1
+            if key in self.results:
+                image = self.results[key]
+                self._use(key)
+                return image
+
+        def generate_once():
+            image = self.generate(*args)
+            with self.lock:
+                self.generated += 1
+            return image
+
+        try:
+            image = self.single_flight.do(key, generate_once)
+        except Exception:
+            with self.lock:
+                self._use(key)
+            raise
+
+        with self.lock:
+            if self._use(key) > 0:
+                self.results[key] = image
+        return image
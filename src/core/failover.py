@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from src.utils.metrics import METRICS
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=3, latency_threshold=None, reset_timeout=60.0):
+        """Track the health of one backend
+
+        The circuit opens after failure_threshold consecutive failed calls, where
+        calls slower than latency_threshold seconds count as failures too. An open
+        circuit lets no calls through for reset_timeout seconds, then lets a single
+        trial call through: the circuit closes again if it succeeds in time.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Return whether a call may go to the backend now"""
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Only the caller that sees the timeout expire makes the trial call
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self, latency):
+        if self.latency_threshold is not None and latency > self.latency_threshold:
+            self.record_failure(f"slow response ({latency:.1f}s)")
+            return
+        with self.lock:
+            if self.state != "closed":
+                print(f"Backend {self.name} recovered, circuit closed")
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self, reason=""):
+        with self.lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                METRICS.inc("pagepainter_circuit_opens_total", backend=self.name)
+                print(f"Circuit for backend {self.name} opened after {self.failures} failure(s) "
+                      f"({reason}), retrying in {self.reset_timeout:g}s")
+
+
+class BackendChain:
+    def __init__(self, page_makers, failure_threshold=3, latency_threshold=None, reset_timeout=60.0):
+        """Page maker that tries the backends of (name, page_maker) pairs in order
+
+        Each backend has its own CircuitBreaker, so while a provider is failing
+        or slow its pages go straight to the next healthy backend. The name of
+        the backend that produced an illustration is stored in image.info['backend'].
+        """
+        self.page_makers = page_makers
+        self.breakers = {
+            name: CircuitBreaker(name, failure_threshold, latency_threshold, reset_timeout)
+            for name, _ in page_makers
+        }
+        for _, page_maker in page_makers:
+            # Backends that would hide a failure behind a placeholder image must raise instead
+            if hasattr(page_maker, 'raise_errors'):
+                page_maker.raise_errors = True
+        self.produced = Counter()
+
+    def _accept(self, name, images, start):
+        if not images or any(image is None for image in images):
+            raise ValueError("Failed to generate illustration")
+        self.breakers[name].record_success(time.monotonic() - start)
+        for image in images:
+            image.info['backend'] = name
+        self.produced[name] += 1
+        return images
+
+    def _reject(self, name, error, errors):
+        print(f"Backend {name} failed: {str(error)}")
+        self.breakers[name].record_failure(str(error))
+        METRICS.inc("pagepainter_backend_failures_total", backend=name)
+        errors.append(f"{name}: {str(error)}")
+
+    def _first_healthy(self, generate):
+        """Return the images generate(page_maker) returns for the first healthy backend that succeeds"""
+        errors = []
+        for name, page_maker in self.page_makers:
+            if not self.breakers[name].allow():
+                errors.append(f"{name}: circuit open")
+                continue
+            start = time.monotonic()
+            try:
+                return self._accept(name, generate(page_maker), start)
+            except Exception as e:
+                self._reject(name, e, errors)
+        raise ValueError(f"All backends failed: {'; '.join(errors)}")
+
+    def generate_illustration(self, description, art_style=None, image_size=None, **options):
+        """Generate an illustration with the first healthy backend that succeeds
+
+        options, e.g. seed or preview, are passed on to the backends.
+        """
+        return self._first_healthy(
+            lambda page_maker: [page_maker.generate_illustration(description, art_style, image_size, **options)]
+        )[0]
+
+    def generate_candidates(self, description, art_style=None, image_size=None, samples=4, **options):
+        """Generate candidate illustrations with the first healthy backend, one for backends without batches"""
+        def generate(page_maker):
+            if hasattr(page_maker, 'generate_candidates'):
+                return page_maker.generate_candidates(description, art_style, image_size, samples, **options)
+            return [page_maker.generate_illustration(description, art_style, image_size, **options)]
+        return self._first_healthy(generate)
+
+    async def agenerate_illustration(self, description, art_style=None, image_size=None, **options):
+        """Generate an illustration with the first healthy backend, without blocking the event loop"""
+        errors = []
+        for name, page_maker in self.page_makers:
+            if not self.breakers[name].allow():
+                errors.append(f"{name}: circuit open")
+                continue
+            start = time.monotonic()
+            try:
+                if hasattr(page_maker, 'agenerate_illustration'):
+                    image = await page_maker.agenerate_illustration(description, art_style, image_size, **options)
+                else:
+                    image = await asyncio.to_thread(
+                        lambda: page_maker.generate_illustration(description, art_style, image_size, **options)
+                    )
+                return self._accept(name, [image], start)[0]
+            except Exception as e:
+                self._reject(name, e, errors)
+        raise ValueError(f"All backends failed: {'; '.join(errors)}")
+
+    async def aclose(self):
+        """Close the async clients of the backends before their event loop ends"""
+        for _, page_maker in self.page_makers:
+            if hasattr(page_maker, 'aclose'):
+                await page_maker.aclose()
+
+    def create_page(self, text, image, output_path, render_text=True):
+        """Create the page with the layout of the backend that produced the illustration"""
+        page_makers = dict(self.page_makers)
+        page_maker = page_makers.get(image.info.get('backend'), self.page_makers[0][1])
+        return page_maker.create_page(text, image, output_path, render_text)
+
+    def create_book_page(self, text, description, output_path, art_style=None, image_size=None, render_text=True):
+        """Create a complete book page with illustration and text"""
+        image = self.generate_illustration(description, art_style, image_size)
+        self.create_page(text, image, output_path, render_text)
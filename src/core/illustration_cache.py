@@ -0,0 +1,51 @@
+import os
+from PIL import Image
+from src.utils.encoded_images import encoded_bytes
+
+DEFAULT_CACHE_DIR = "output/cache"
+
+
+class IllustrationCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        """Illustrations on disk by illustration key, so they are not paid for twice
+
+        The chosen illustration of a key is stored as <key>_0.png and the other
+        candidates of the same request as <key>_1.png, <key>_2.png, ... so an
+        editor can swap a page for one of them without a new request.
+        """
+        self.directory = directory
+
+    def path(self, key, index=0):
+        return os.path.join(self.directory, key[:2], f"{key}_{index}.png")
+
+    def get(self, key):
+        """Return the chosen illustration of a key, or None if it is not cached"""
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        image = Image.open(path)
+        image.load()
+        return image
+
+    def put(self, key, images):
+        """Store the chosen illustration of a key followed by the other candidates"""
+        os.makedirs(os.path.dirname(self.path(key)), exist_ok=True)
+        for index, image in enumerate(images):
+            path = self.path(key, index)
+            # Write under a temporary name so readers never see half written files
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            data = encoded_bytes(image, "PNG")
+            if data is not None:
+                # PNGs as the backend sent them are written without decoding or encoding
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+            else:
+                image.save(temp_path, format="PNG")
+            os.replace(temp_path, path)
+
+    def candidates(self, key):
+        """Paths of all stored candidates of a key, the chosen one first"""
+        paths = []
+        while os.path.exists(self.path(key, len(paths))):
+            paths.append(self.path(key, len(paths)))
+        return paths
@@ -0,0 +1,265 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter
+
+# Starting estimates per backend until pages have been observed: seconds per
+# illustration, price in dollars per illustration and pages that can run at
+# the same time. Stable Diffusion takes every CPU core for one page.
+BACKEND_PROFILES = {
+    "dalle": {"seconds": 15.0, "price": 0.04, "slots": 4},
+    "dreamstudio": {"seconds": 8.0, "price": 0.01, "slots": 4},
+    "opensource": {"seconds": 420.0, "price": 0.0, "slots": 1},
+    "fake": {"seconds": 0.0, "price": 0.0, "slots": 1},
+}
+DEFAULT_PROFILE = {"seconds": 60.0, "price": 0.0, "slots": 1}
+# Observed latencies are kept across runs in this file
+LATENCY_FILE = "output/backend_latency.json"
+# Weight of the newest observation in the moving average
+EWMA_ALPHA = 0.3
+
+
+def plan_pages(pages, profiles, time_left=None, budget=None, backlog=None):
+    """Assign pages to backends and return {name: pages}
+
+    Backends are filled cheapest first with as many pages as they finish
+    within time_left seconds and the budget allows. Pages that fit nowhere go
+    to the backend that finishes them earliest among those still affordable
+    (the cheapest one when none is), so the deadline is missed as little as
+    possible. backlog holds the seconds of work each backend already has.
+    """
+    backlog = backlog or {}
+    counts = {name: 0 for name in profiles}
+    finish = {name: backlog.get(name, 0.0) for name in profiles}
+    spent = 0.0
+
+    def affordable(name, count=1):
+        return budget is None or spent + profiles[name]['price'] * count <= budget + 1e-9
+
+    def page_seconds(name):
+        return profiles[name]['seconds'] / profiles[name]['slots']
+
+    remaining = pages
+    for name in sorted(profiles, key=lambda name: (profiles[name]['price'], page_seconds(name))):
+        capacity = remaining
+        if time_left is not None and page_seconds(name) > 0:
+            capacity = min(capacity, max(0, math.floor((time_left - finish[name]) / page_seconds(name))))
+        if budget is not None and profiles[name]['price'] > 0:
+            capacity = min(capacity, math.floor((budget - spent) / profiles[name]['price'] + 1e-9))
+        counts[name] += capacity
+        finish[name] += capacity * page_seconds(name)
+        spent += capacity * profiles[name]['price']
+        remaining -= capacity
+
+    for _ in range(remaining):
+        candidates = [name for name in profiles if affordable(name)]
+        if candidates:
+            name = min(candidates, key=lambda name: (finish[name] + page_seconds(name), profiles[name]['price']))
+        else:
+            name = min(profiles, key=lambda name: profiles[name]['price'])
+        counts[name] += 1
+        finish[name] += page_seconds(name)
+        spent += profiles[name]['price']
+    return counts
+
+
+class Scheduler:
+    def __init__(self, page_makers, deadline=None, budget=None, profiles=None, latency_file=LATENCY_FILE):
+        """Page maker that spreads pages over the backends of (name, page_maker) pairs
+
+        Given a deadline in seconds from the first scheduled book and a budget
+        in dollars, pages go to the cheapest backends that finish in time, and
+        to the paid ones only as far as the deadline needs them. Latencies are
+        a moving average of the observed ones (kept in latency_file), and the
+        remaining pages are planned again for every page, so pages move to
+        other backends when one falls behind.
+
+        The budget is never overspent: batches of candidates are cut to the
+        images the rest of it pays for, and once no backend can pay for one
+        more illustration the pages fail.
+        """
+        self.page_makers = dict(page_makers)
+        self.profiles = {
+            name: dict((profiles or {}).get(name) or BACKEND_PROFILES.get(name, DEFAULT_PROFILE))
+            for name, _ in page_makers
+        }
+        self.deadline = deadline
+        self.budget = budget
+        self.latency_file = latency_file
+        if latency_file and os.path.exists(latency_file):
+            with open(latency_file, 'r', encoding='utf-8') as f:
+                for name, seconds in json.load(f).items():
+                    if name in self.profiles:
+                        self.profiles[name]['seconds'] = seconds
+        self.slots = {name: threading.BoundedSemaphore(profile['slots']) for name, profile in self.profiles.items()}
+        self.lock = threading.Lock()
+        self.deadline_at = None
+        self.pending = 0
+        # Candidates generated per page by the backends that batch them
+        self.samples = 1
+        self.running = Counter()
+        self.produced = Counter()
+        self.spent = 0.0
+        # Dollars of the requests in progress, charged to the budget before they are made
+        self.reserved = 0.0
+
+    def time_left(self):
+        if self.deadline_at is None:
+            return None
+        return self.deadline_at - time.monotonic()
+
+    def page_profiles(self):
+        """Profiles with the price of a page, which pays for every candidate of backends that batch them"""
+        return {
+            name: dict(profile, price=profile['price'] * self.images_per_page(name))
+            for name, profile in self.profiles.items()
+        }
+
+    def images_per_page(self, name):
+        return self.samples if hasattr(self.page_makers[name], 'generate_candidates') else 1
+
+    def _plan(self, pages):
+        budget = None if self.budget is None else self.budget - self.spent - self.reserved
+        # Pages in progress keep their backend busy for about one more illustration
+        backlog = {
+            name: self.running[name] * profile['seconds'] / profile['slots']
+            for name, profile in self.profiles.items()
+        }
+        return plan_pages(pages, self.page_profiles(), self.time_left(), budget, backlog)
+
+    def schedule(self, pages, samples=1):
+        """Announce pages about to be generated with samples candidates each, print their plan and return it"""
+        with self.lock:
+            if self.deadline_at is None and self.deadline is not None:
+                self.deadline_at = time.monotonic() + self.deadline
+            self.samples = samples
+            self.pending += pages
+            plan = self._plan(self.pending)
+        self.print_plan(plan)
+        return plan
+
+    def skip(self, pages=1):
+        """Take pages that were served without a backend (cached or shared illustrations) off the plan"""
+        with self.lock:
+            self.pending = max(self.pending - pages, 0)
+
+    def estimate(self, plan):
+        """Return (seconds, dollars) a plan is expected to take"""
+        seconds = max(
+            (math.ceil(count / self.profiles[name]['slots']) * self.profiles[name]['seconds']
+             for name, count in plan.items() if count),
+            default=0.0,
+        )
+        profiles = self.page_profiles()
+        dollars = sum(count * profiles[name]['price'] for name, count in plan.items())
+        return seconds, dollars
+
+    def print_plan(self, plan):
+        seconds, dollars = self.estimate(plan)
+        print("\nBackend plan:")
+        profiles = self.page_profiles()
+        for name, count in plan.items():
+            profile = profiles[name]
+            print(f"  {name:12} {count:5d} page(s)  {profile['seconds']:7.1f}s each  "
+                  f"${count * profile['price']:.2f}")
+        line = f"  estimated {seconds / 60:.1f} min, ${dollars:.2f}"
+        time_left = self.time_left()
+        if time_left is not None:
+            line += f" (deadline in {time_left / 60:.1f} min)"
+            if seconds > time_left:
+                line += ", the deadline cannot be met within the budget"
+        print(line)
+
+    def _pick(self, images=1):
+        """Choose the backend of the next page from a new plan of the remaining pages
+
+        Returns the backend and how many of the requested images the rest of
+        the budget pays for there, which are reserved until _run charges them.
+        """
+        with self.lock:
+            plan = self._plan(max(self.pending, 1))
+            self.pending = max(self.pending - 1, 0)
+            planned = [name for name in self.page_makers if plan[name] > 0]
+            # A planned backend with a free slot, else the cheapest planned one, waiting for a slot
+            for name in sorted(planned, key=lambda name: self.profiles[name]['price']):
+                if self.running[name] < self.profiles[name]['slots']:
+                    break
+            else:
+                name = min(planned, key=lambda name: self.profiles[name]['price'])
+            if not hasattr(self.page_makers[name], 'generate_candidates'):
+                images = 1
+            price = self.profiles[name]['price']
+            if self.budget is not None and price > 0:
+                images = min(images, math.floor((self.budget - self.spent - self.reserved) / price + 1e-9))
+                if images < 1:
+                    raise ValueError(f"The budget of ${self.budget:.2f} is spent, {name} cannot generate "
+                                     f"another illustration")
+            self.reserved += price * images
+            self.running[name] += 1
+            return name, images
+
+    def observe(self, name, seconds):
+        """Fold an observed latency into the moving average of a backend"""
+        with self.lock:
+            profile = self.profiles[name]
+            profile['seconds'] = EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * profile['seconds']
+            latencies = {name: profile['seconds'] for name, profile in self.profiles.items()}
+        if self.latency_file:
+            os.makedirs(os.path.dirname(self.latency_file) or ".", exist_ok=True)
+            temp_path = f"{self.latency_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(latencies, f, indent=4)
+            os.replace(temp_path, self.latency_file)
+
+    def _run(self, generate, samples=1):
+        """Call generate(page_maker, images) on the planned backend, billing every image it returns"""
+        name, count = self._pick(samples)
+        if count < samples:
+            print(f"The rest of the budget pays for {count} of {samples} candidates on {name}")
+        price = self.profiles[name]['price']
+        try:
+            with self.slots[name]:
+                start = time.monotonic()
+                images = generate(self.page_makers[name], count)
+                if not images or any(image is None for image in images):
+                    raise ValueError(f"Backend {name} failed to generate illustration")
+                self.observe(name, time.monotonic() - start)
+        finally:
+            with self.lock:
+                self.running[name] -= 1
+                self.reserved -= price * count
+        with self.lock:
+            # Batches of candidates are billed per image
+            self.spent += price * len(images)
+            self.produced[name] += 1
+        for image in images:
+            image.info['backend'] = name
+            # The first page using the illustration was planned for this call, see BookGenerator.plan_pages
+            image.info['scheduled'] = True
+        return images
+
+    def generate_illustration(self, description, art_style=None, image_size=None, **options):
+        """Generate an illustration with the backend the plan gives the next page"""
+        return self._run(
+            lambda page_maker, _: [page_maker.generate_illustration(description, art_style, image_size, **options)]
+        )[0]
+
+    def generate_candidates(self, description, art_style=None, image_size=None, samples=4, **options):
+        """Generate candidate illustrations with the planned backend, one for backends without batches"""
+        def generate(page_maker, count):
+            if hasattr(page_maker, 'generate_candidates'):
+                return page_maker.generate_candidates(description, art_style, image_size, count, **options)
+            return [page_maker.generate_illustration(description, art_style, image_size, **options)]
+        return self._run(generate, samples)
+
+    def create_page(self, text, image, output_path, render_text=True):
+        """Create the page with the layout of the backend that produced the illustration"""
+        page_maker = self.page_makers.get(image.info.get('backend'), next(iter(self.page_makers.values())))
+        return page_maker.create_page(text, image, output_path, render_text)
+
+    def create_book_page(self, text, description, output_path, art_style=None, image_size=None, render_text=True):
+        """Create a complete book page with illustration and text"""
+        image = self.generate_illustration(description, art_style, image_size)
+        self.create_page(text, image, output_path, render_text)
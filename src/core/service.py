@@ -0,0 +1,254 @@
+import json
+import mimetypes
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+from src.core.book_generator import BookGenerator
+from src.utils.book_spec import BookSpec
+from src.utils.create_pdf import create_pdf
+from src.utils.metrics import METRICS
+from src.utils.page_layout import cover_filename, find_image, page_filename
+
+# Seconds finished jobs stay listed, and the most finished jobs kept
+JOB_TTL = 24 * 3600
+MAX_FINISHED_JOBS = 1000
+
+
+class Job:
+    def __init__(self, book_data, book_dir, total, vector_text=False):
+        """State of one book submitted to the service"""
+        self.id = uuid.uuid4().hex[:12]
+        self.book_data = book_data
+        self.book_dir = book_dir
+        self.vector_text = vector_text
+        self.status = "queued"
+        self.total = total
+        self.done = 0
+        self.errors = []
+        self.pdf_path = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "title": self.book_data['cover']['title'],
+            "status": self.status,
+            "progress": {"done": self.done, "failed": len(self.errors), "total": self.total},
+            "errors": self.errors,
+            "book_dir": self.book_dir,
+            "pdf": self.pdf_path is not None,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class GenerationService:
+    def __init__(self, generator=None, backend="opensource", workers=1, job_ttl=JOB_TTL,
+                 max_finished=MAX_FINISHED_JOBS):
+        """Keep a book generator and its models loaded and run submitted books on a worker pool
+
+        Cover and pages of every job are queued on the same pool, so a new book
+        starts as soon as a worker is free instead of paying for model loading.
+        Finished jobs are forgotten job_ttl seconds after they finish, or
+        oldest first beyond max_finished; their files stay on disk.
+        """
+        self.generator = generator or BookGenerator(backend=backend)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.jobs = {}
+        self.job_ttl = job_ttl
+        self.max_finished = max_finished
+        self.lock = threading.Lock()
+
+    def submit(self, book_data, vector_text=False):
+        """Queue a book and return its job"""
+        book_dir = self.generator.create_book_directory(book_data['cover']['title'])
+        # Keep the specification next to the images, create_pdf reads it from there
+        with open(os.path.join(book_dir, "book.json"), 'w', encoding='utf-8') as f:
+            json.dump(book_data, f, ensure_ascii=False, indent=4)
+
+        tasks = self.generator.page_tasks(book_data, book_dir, vector_text)
+        self.generator.plan_pages(tasks)
+        job = Job(book_data, book_dir, len(tasks) + 1, vector_text)
+        with self.lock:
+            self._evict()
+            self.jobs[job.id] = job
+
+        self.pool.submit(self._run, job, "cover", self.generator.generate_cover, book_data, book_dir)
+        for i, task in enumerate(tasks, 1):
+            self.pool.submit(self._run, job, f"page {i}", self.generator.generate_page, task)
+        return job
+
+    def _run(self, job, label, function, *args):
+        with self.lock:
+            if job.started is None:
+                job.started = time.time()
+                job.status = "running"
+        try:
+            function(*args)
+            error = None
+        except Exception as e:
+            error = f"{label}: {str(e)}"
+
+        with self.lock:
+            if error:
+                job.errors.append(error)
+            else:
+                job.done += 1
+            complete = job.done + len(job.errors) == job.total
+        if complete:
+            self._finish(job)
+
+    def _finish(self, job):
+        if not job.errors:
+            try:
+                job.pdf_path = create_pdf(
+                    os.path.join(job.book_dir, "book.json"), job.book_dir, job.book_dir, job.vector_text
+                )
+            except Exception as e:
+                job.errors.append(f"pdf: {str(e)}")
+        self.generator.record_book(job.book_dir, bool(job.errors))
+        with self.lock:
+            job.status = "failed" if job.errors else "done"
+            job.finished = time.time()
+
+    def _evict(self):
+        """Forget expired finished jobs and the oldest beyond max_finished, called under the lock"""
+        now = time.time()
+        finished = sorted((job for job in self.jobs.values() if job.finished is not None),
+                          key=lambda job: job.finished)
+        excess = len(finished) - self.max_finished
+        for i, job in enumerate(finished):
+            if i < excess or now - job.finished > self.job_ttl:
+                del self.jobs[job.id]
+
+    def get(self, job_id):
+        with self.lock:
+            self._evict()
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            self._evict()
+            return [job.to_dict() for job in self.jobs.values()]
+
+    def page_path(self, job, index):
+        """Path of the cover (index 0) or a page image of a job"""
+        if index == 0:
+            return find_image(job.book_dir, cover_filename())
+        return find_image(job.book_dir, page_filename(index, job.vector_text))
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """HTTP API of the generation service
+
+    POST /jobs                 submit a book specification (JSON body), ?vector_text=1 for vector PDFs
+    GET  /jobs                 list jobs
+    GET  /jobs/<id>            job status and progress
+    GET  /jobs/<id>/pages/<n>  image of the cover (n=0) or page n
+    GET  /jobs/<id>/pdf        PDF once the job is done
+    GET  /metrics              counters and histograms in the Prometheus text format
+    """
+    service = None
+
+    def log_message(self, format, *args):
+        # Keep the console for generation progress
+        pass
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_text(self, status, text, content_type):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_file(self, path, content_type):
+        if not os.path.exists(path):
+            self.send_json(404, {"error": "not ready"})
+            return
+        with open(path, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        path, _, query = self.path.partition('?')
+        if path != "/jobs":
+            self.send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            book_data = json.loads(self.rfile.read(length))
+            BookSpec.from_dict(book_data)
+        except ValueError as e:
+            self.send_json(400, {"error": f"invalid book specification: {str(e)}"})
+            return
+        vector_text = parse_qs(query).get("vector_text", ["0"])[-1].lower() in ("1", "true", "yes")
+        job = self.service.submit(book_data, vector_text=vector_text)
+        self.send_json(202, job.to_dict())
+
+    def do_GET(self):
+        path = self.path.partition('?')[0]
+        if path == "/jobs":
+            self.send_json(200, self.service.list())
+            return
+        if path == "/metrics":
+            self.send_text(200, METRICS.render(), "text/plain; version=0.0.4; charset=utf-8")
+            return
+
+        match = re.fullmatch(r"/jobs/(\w+)(?:/pages/(\d+)|/(pdf))?", path)
+        job = self.service.get(match.group(1)) if match else None
+        if job is None:
+            self.send_json(404, {"error": "not found"})
+        elif match.group(2) is not None:
+            image_path = self.service.page_path(job, int(match.group(2)))
+            self.send_file(image_path, mimetypes.guess_type(image_path)[0] or "image/png")
+        elif match.group(3):
+            if job.pdf_path is None:
+                self.send_json(404, {"error": "not ready"})
+            else:
+                self.send_file(job.pdf_path, "application/pdf")
+        else:
+            self.send_json(200, job.to_dict())
+
+
+def make_server(service, host="127.0.0.1", port=8080):
+    """Create the HTTP server of a service, port 0 picks a free port"""
+    handler = type("BoundServiceHandler", (ServiceHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(backend="opensource", host="127.0.0.1", port=8080, workers=1):
+    """Load the backend once and serve book jobs until interrupted"""
+    service = GenerationService(backend=backend, workers=workers)
+    server = make_server(service, host, port)
+    print(f"PagePainter service listening on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        server.server_close()
+        service.shutdown()
@@ -0,0 +1,173 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from src.utils.book_io import BookPages, file_digest, inputs_hash
+
+DEFAULT_STATE_PATH = "output/pagepainter.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    spec TEXT NOT NULL,
+    book_dir TEXT NOT NULL,
+    vector_text INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created REAL NOT NULL,
+    finished REAL,
+    settings TEXT
+);
+CREATE TABLE IF NOT EXISTS pages (
+    job_id TEXT NOT NULL REFERENCES jobs(id),
+    page_index INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    inputs_hash TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    started REAL,
+    finished REAL,
+    error TEXT,
+    backend TEXT,
+    PRIMARY KEY (job_id, page_index)
+);
+"""
+
+
+def spec_json(book_data):
+    """The specification of a job as stored, JSONL books by reference so their pages are never all read
+
+    A JSONL book is stored as its header with the path and SHA-256 of its
+    file in 'pages_source'; job() reads its pages from that file again.
+    """
+    pages = book_data.get('pages')
+    if isinstance(pages, BookPages):
+        header = {key: value for key, value in book_data.items() if key != 'pages'}
+        header['pages_source'] = {"path": os.path.abspath(pages.path), "sha256": file_digest(pages.path)}
+        return json.dumps(header, ensure_ascii=False)
+    return json.dumps(book_data, ensure_ascii=False, default=list)
+
+
+class StateStore:
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        """Persistent record of book jobs and their pages, for resuming after a crash
+
+        Every status change is its own transaction, so a killed process loses at
+        most the pages that were being generated. The database is in WAL mode so
+        readers (e.g. a status command) do not block the generator.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            # Databases written before pages recorded their backend
+            columns = [row['name'] for row in self.conn.execute("PRAGMA table_info(pages)")]
+            if 'backend' not in columns:
+                self.conn.execute("ALTER TABLE pages ADD COLUMN backend TEXT")
+            # Databases written before jobs recorded the generator settings
+            columns = [row['name'] for row in self.conn.execute("PRAGMA table_info(jobs)")]
+            if 'settings' not in columns:
+                self.conn.execute("ALTER TABLE jobs ADD COLUMN settings TEXT")
+
+    def close(self):
+        self.conn.close()
+
+    def create_job(self, book_data, backend, book_dir, pages, vector_text=False, settings=None):
+        """Record a new job and its pages, given as (index, inputs, output_path), and return its id
+
+        settings are the generator options (see BookGenerator.settings) the
+        job is resumed with.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO jobs (id, title, backend, spec, book_dir, vector_text, status, created, settings)"
+                " VALUES (?, ?, ?, ?, ?, ?, 'running', ?, ?)",
+                (job_id, book_data['cover']['title'], backend, spec_json(book_data), book_dir, int(vector_text),
+                 time.time(), json.dumps(settings or {}))
+            )
+            self.conn.executemany(
+                "INSERT INTO pages (job_id, page_index, status, inputs_hash, output_path)"
+                " VALUES (?, ?, 'pending', ?, ?)",
+                ((job_id, index, inputs_hash(inputs), output_path) for index, inputs, output_path in pages)
+            )
+        return job_id
+
+    def start_page(self, job_id, index):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE pages SET status = 'running', started = ?, error = NULL WHERE job_id = ? AND page_index = ?",
+                (time.time(), job_id, index)
+            )
+
+    def finish_page(self, job_id, index, backend=None):
+        """Mark a page done, recording the backend that produced it"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE pages SET status = 'done', finished = ?, backend = ? WHERE job_id = ? AND page_index = ?",
+                (time.time(), backend, job_id, index)
+            )
+
+    def fail_page(self, job_id, index, error):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE pages SET status = 'failed', finished = ?, error = ? WHERE job_id = ? AND page_index = ?",
+                (time.time(), error, job_id, index)
+            )
+
+    def finish_job(self, job_id):
+        """Mark the job done, or failed if any page did not complete"""
+        with self.lock, self.conn:
+            remaining = self.conn.execute(
+                "SELECT COUNT(*) FROM pages WHERE job_id = ? AND status != 'done'", (job_id,)
+            ).fetchone()[0]
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, finished = ? WHERE id = ?",
+                ('failed' if remaining else 'done', time.time(), job_id)
+            )
+
+    def job(self, job_id):
+        """Return the job row as a dict with its spec decoded, or None
+
+        The pages of JSONL books are read lazily from their file again, whose
+        recorded path and SHA-256 are in job['pages_source'].
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['spec'] = json.loads(job['spec'])
+        job['pages_source'] = job['spec'].pop('pages_source', None)
+        if job['pages_source'] is not None:
+            job['spec']['pages'] = BookPages(job['pages_source']['path'])
+        job['vector_text'] = bool(job['vector_text'])
+        job['settings'] = json.loads(job['settings']) if job['settings'] else {}
+        return job
+
+    def jobs(self, status=None):
+        """Return id, title and status of all jobs, optionally filtered by status"""
+        query = "SELECT id, title, backend, status, created, finished FROM jobs"
+        params = ()
+        if status is not None:
+            query += " WHERE status = ?"
+            params = (status,)
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(query + " ORDER BY created", params)]
+
+    def pages(self, job_id):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM pages WHERE job_id = ? ORDER BY page_index", (job_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def unfinished_pages(self, job_id):
+        """Indices of the pages that are not done (0 is the cover)"""
+        return [page['page_index'] for page in self.pages(job_id) if page['status'] != 'done']
@@ -0,0 +1,254 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from src.core.batch import BookProgress
+from src.utils.metrics import METRICS
+
+DEFAULT_QUEUE_DIR = "output/queue"
+STATES = ("pending", "leased", "done", "failed")
+
+
+class WorkQueue:
+    def __init__(self, directory=DEFAULT_QUEUE_DIR, lease_seconds=300, max_attempts=3):
+        """Page tasks shared by processes on any host through a directory, e.g. on NFS
+
+        Every task is one JSON file that moves between the pending, leased,
+        done and failed subdirectories. A worker claims a task by renaming it
+        from pending to leased, which only one of the workers racing for it can
+        do, and renews the lease by touching the file while it works. Leases
+        not renewed within lease_seconds belong to dead workers and go back to
+        pending. A task that raised is retried up to max_attempts times.
+        """
+        self.directory = directory
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        for state in STATES:
+            os.makedirs(os.path.join(directory, state), exist_ok=True)
+
+    def path(self, state, task_id):
+        return os.path.join(self.directory, state, f"{task_id}.json")
+
+    def _write(self, path, task):
+        # Write under a temporary name so other processes never read half written tasks
+        temp_path = f"{path}.{socket.gethostname()}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(task, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def _read(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def publish(self, task):
+        """Add a task, a dict with a unique 'id' that is safe as a file name"""
+        self._write(self.path("pending", task['id']), task)
+
+    def claim(self):
+        """Lease the next pending task and return it, or None if there is none"""
+        for name in sorted(os.listdir(os.path.join(self.directory, "pending"))):
+            if not name.endswith(".json"):
+                continue
+            pending_path = os.path.join(self.directory, "pending", name)
+            leased_path = os.path.join(self.directory, "leased", name)
+            try:
+                # The lease starts now, the rename keeps the time the task was published
+                os.utime(pending_path)
+                os.rename(pending_path, leased_path)
+                return self._read(leased_path)
+            except FileNotFoundError:
+                # Another worker claimed it first
+                continue
+        return None
+
+    def renew(self, task):
+        """Extend the lease of a claimed task, False if it expired and went back to pending"""
+        try:
+            os.utime(self.path("leased", task['id']))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _finish(self, task, state):
+        # Updated in place and then moved, so no reader sees a half written task. A worker whose lease
+        # expired can still finish a task that was requeued meanwhile, it may then be rendered twice
+        # (to the same files) and result() reports whichever finish came first
+        leased_path = self.path("leased", task['id'])
+        self._write(leased_path, task)
+        os.replace(leased_path, self.path(state, task['id']))
+
+    def complete(self, task):
+        self._finish(task, "done")
+
+    def fail(self, task, error):
+        """Record a failed attempt, the task is retried until it has failed max_attempts times"""
+        task['attempts'] = task.get('attempts', 0) + 1
+        task['error'] = error
+        if task['attempts'] < self.max_attempts:
+            METRICS.inc("pagepainter_task_retries_total")
+            self._finish(task, "pending")
+        else:
+            METRICS.inc("pagepainter_tasks_failed_total")
+            self._finish(task, "failed")
+
+    def requeue_expired(self):
+        """Return the tasks of workers that stopped renewing their lease to pending, and count them"""
+        now = time.time()
+        count = 0
+        leased_dir = os.path.join(self.directory, "leased")
+        for name in os.listdir(leased_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(leased_dir, name)
+            try:
+                if now - os.stat(path).st_mtime > self.lease_seconds:
+                    os.rename(path, os.path.join(self.directory, "pending", name))
+                    count += 1
+            except FileNotFoundError:
+                # Completed or requeued by someone else meanwhile
+                continue
+        return count
+
+    def result(self, task_id):
+        """('done', task) or ('failed', task) once a task is finished, else None"""
+        for state in ("done", "failed"):
+            path = self.path(state, task_id)
+            if os.path.exists(path):
+                return state, self._read(path)
+        return None
+
+    def counts(self):
+        return {
+            state: sum(1 for name in os.listdir(os.path.join(self.directory, state)) if name.endswith(".json"))
+            for state in STATES
+        }
+
+
+class Coordinator:
+    def __init__(self, generator, queue, poll_interval=0.5):
+        """Split books into page tasks for Workers on other processes or hosts
+
+        The book directories must be on a filesystem the workers share, like
+        the queue. Pages are rendered independently, so they are not continued
+        from the previous page even with a strength. Every task carries the
+        encoding of the generator, which the workers write its image in.
+        """
+        self.generator = generator
+        self.queue = queue
+        self.poll_interval = poll_interval
+
+    def publish_book(self, book_data, vector_text=False, name=None):
+        """Publish the cover and page tasks of a book and return (progress, task ids)"""
+        book_dir = os.path.abspath(self.generator.create_book_directory(book_data['cover']['title']))
+        book_id = uuid.uuid4().hex[:12]
+        cover = {key: book_data[key] for key in ('cover', 'book_settings') if key in book_data}
+        # The file names end in the extension of this encoding, the workers must not pick their own
+        encoding = str(self.generator.encoder.encoding) if self.generator.encoder is not None else None
+        task_ids = [f"{book_id}_00000"]
+        self.queue.publish({"id": task_ids[0], "book_id": book_id, "index": 0, "kind": "cover",
+                            "book": cover, "book_dir": book_dir, "encoding": encoding})
+        # Published as they are read, so workers start on the first pages of long books right away
+        for i, task in enumerate(self.generator.iter_page_tasks(book_data, book_dir, vector_text), 1):
+            task_ids.append(f"{book_id}_{i:05d}")
+            self.queue.publish({"id": task_ids[-1], "book_id": book_id, "index": i, "kind": "page",
+                                "task": dict(task, continue_from=None), "encoding": encoding})
+
+        print(f"Published {len(task_ids)} tasks of book {book_id} to {self.queue.directory}")
+        progress = BookProgress(name or book_data['cover']['title'], book_dir, len(task_ids))
+        return progress, task_ids
+
+    def wait(self, progress, task_ids, timeout=None):
+        """Wait until every task of a book is done or failed, requeueing expired leases meanwhile"""
+        deadline = None if timeout is None else time.time() + timeout
+        waiting = set(task_ids)
+        while waiting:
+            requeued = self.queue.requeue_expired()
+            if requeued:
+                print(f"Requeued {requeued} task(s) of workers whose lease expired")
+            for task_id in sorted(waiting):
+                result = self.queue.result(task_id)
+                if result is None:
+                    continue
+                state, task = result
+                waiting.discard(task_id)
+                label = "cover" if task['index'] == 0 else f"page {task['index']}"
+                if state == "done":
+                    progress.done += 1
+                    print(f"{label} of {progress.name} done by {task.get('worker')}")
+                else:
+                    print(f"Error generating {label} of {progress.name}: {task['error']}")
+                    progress.errors.append(f"{label}: {task['error']}")
+            if waiting:
+                if deadline is not None and time.time() > deadline:
+                    raise TimeoutError(f"{len(waiting)} task(s) of {progress.name} not finished")
+                time.sleep(self.poll_interval)
+        return progress
+
+    def build_book(self, book_data, vector_text=False, timeout=None):
+        """Generate a book on the workers and return its progress"""
+        progress, task_ids = self.publish_book(book_data, vector_text)
+        self.wait(progress, task_ids, timeout)
+        print(f"\nBook generation complete! {progress.done}/{progress.total} done, "
+              f"{progress.failed} failed, files in {progress.book_dir}")
+        return progress
+
+
+class Worker:
+    def __init__(self, generator, queue, name=None):
+        """Claim tasks from a WorkQueue and render them with a BookGenerator"""
+        self.generator = generator
+        self.queue = queue
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.completed = 0
+
+    def _renew(self, task, stop):
+        # A third of the lease leaves room for a slow filesystem
+        while not stop.wait(self.queue.lease_seconds / 3):
+            self.queue.renew(task)
+
+    def execute(self, task):
+        self.generator.use_encoding(task.get('encoding'))
+        if task['kind'] == "cover":
+            return self.generator.generate_cover(task['book'], task['book_dir'])
+        return self.generator.generate_page(task['task'])
+
+    def run_one(self):
+        """Claim and render one task, return False if there was none"""
+        task = self.queue.claim()
+        if task is None:
+            return False
+        stop = threading.Event()
+        renewer = threading.Thread(target=self._renew, args=(task, stop), daemon=True)
+        renewer.start()
+        try:
+            task['worker'] = self.name
+            task['output_path'] = self.execute(task)
+        except Exception as e:
+            print(f"Error in task {task['id']}: {str(e)}")
+            self.queue.fail(task, str(e))
+        else:
+            self.queue.complete(task)
+            self.completed += 1
+        finally:
+            stop.set()
+            renewer.join()
+        return True
+
+    def run(self, idle_timeout=None, poll_interval=0.5):
+        """Render tasks until the queue has been empty for idle_timeout seconds (forever by default)"""
+        print(f"Worker {self.name} waiting for tasks in {self.queue.directory}")
+        idle_since = time.time()
+        while True:
+            if self.run_one():
+                idle_since = time.time()
+                continue
+            self.queue.requeue_expired()
+            if idle_timeout is not None and time.time() - idle_since > idle_timeout:
+                break
+            time.sleep(poll_interval)
+        print(f"Worker {self.name} finished {self.completed} task(s)")
+        if self.generator.profiler is not None:
+            self.generator.profiler.report()
+        return self.completed
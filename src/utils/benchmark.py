@@ -0,0 +1,173 @@
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from PIL import Image, ImageDraw
+from src.backends.page_painter_fake import PagePainter, synthetic_image
+from src.core.batch import BatchGenerator
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import BookGenerator, make_cover_variants
+from src.utils.create_pdf import create_pdf
+from src.utils.image_encoding import parse_encoding
+from src.utils.page_layout import CANVAS_WIDTH, TEXT_MARGIN, load_font, page_filename, wrap_text
+
+DEFAULT_SIZES = (10, 100, 1000)
+# Page image encodings compared by the benchmark
+ENCODINGS = ("png", "png:1", "png-palette", "webp", "webp:80", "jpeg:90")
+
+SAMPLE_TEXT = ("Era uma vez, uma família de corujas que morava no tronco de uma árvore: "
+               "Papai, Mamãe, Pepeu e o bebê Teteu")
+
+
+def make_book(pages, title="Benchmark Book"):
+    """Synthetic book specification with one distinct scene per page"""
+    return {
+        "book_settings": {"art_style": "watercolor", "image_size": {"width": 384, "height": 512}},
+        "cover": {"title": title, "author": "Bench", "illustrator": "PagePainter AI"},
+        "pages": [
+            {"text": f"{SAMPLE_TEXT} ({i})", "description": f"scene {i}", "style_override": None}
+            for i in range(1, pages + 1)
+        ],
+    }
+
+
+def timed(function, repeat=1):
+    """Run function repeat times and return timing statistics in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {
+        "runs": repeat,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "max": max(times),
+    }
+
+
+def bench_wrap_text(repeat):
+    draw = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+    font = load_font()
+    measure = lambda line: draw.textlength(line, font=font)
+    return timed(lambda: wrap_text(SAMPLE_TEXT * 3, measure, CANVAS_WIDTH - 2 * TEXT_MARGIN), repeat)
+
+
+def bench_create_page(work_dir, repeat):
+    painter = PagePainter()
+    image = synthetic_image("benchmark page")
+    output_path = os.path.join(work_dir, "page.png")
+    return timed(lambda: painter.create_page(SAMPLE_TEXT, image, output_path), repeat)
+
+
+def bench_cover(work_dir, repeat):
+    cover_maker = BookCover()
+    output_path = os.path.join(work_dir, "cover.png")
+    other_info = ["Written by Bench", "Illustrated by PagePainter AI"]
+    return timed(lambda: cover_maker.create_cover("Benchmark Book", other_info, output_path, "watercolor"), repeat)
+
+
+def bench_cover_variants(work_dir, variants, latency, repeat):
+    """Time rendering cover variants of one book, whose illustrations take latency seconds each"""
+    cover_maker = BookCover(latency)
+    book = make_book(0)
+    output_paths = [os.path.join(work_dir, f"cover_{i}.png") for i in range(1, variants + 1)]
+    return timed(lambda: make_cover_variants(cover_maker, book, output_paths), repeat)
+
+
+def bench_encoding(work_dir, spec, repeat):
+    """Time encoding one composed page and record the size of the file"""
+    encoding = parse_encoding(spec)
+    page = PagePainter().create_page(SAMPLE_TEXT, synthetic_image("benchmark page"), None)
+    output_path = os.path.join(work_dir, f"encoded{encoding.extension}")
+    result = timed(lambda: encoding.save(page, output_path), repeat)
+    result["bytes"] = os.path.getsize(output_path)
+    return result
+
+
+def bench_create_pdf(work_dir, pages, repeat, vector_text=False):
+    # Render the images once, only create_pdf is timed
+    images_dir = os.path.join(work_dir, f"pdf_{pages}_{int(vector_text)}")
+    painter = PagePainter()
+    book = make_book(pages)
+    BookCover().create_cover(book['cover']['title'], [], os.path.join(images_dir, "00_cover.png"))
+    image = synthetic_image("benchmark page")
+    for i, page in enumerate(book['pages'], 1):
+        painter.create_page(page['text'], image, os.path.join(images_dir, page_filename(i, vector_text)),
+                            render_text=not vector_text)
+    book_json = os.path.join(images_dir, "book.json")
+    with open(book_json, 'w', encoding='utf-8') as f:
+        json.dump(book, f)
+    return timed(lambda: create_pdf(book_json, images_dir, images_dir, vector_text), repeat)
+
+
+def bench_book(work_dir, pages, latency=0.0, failure_rate=0.0, workers=1):
+    """Generate a whole book with the fake backends through the batch runner"""
+    generator = BookGenerator(
+        backend="fake",
+        page_maker=PagePainter(latency, failure_rate),
+        cover_maker=BookCover(latency, failure_rate),
+        output_dir=os.path.join(work_dir, "books"),
+    )
+    manifest = os.path.join(work_dir, f"book_{pages}.jsonl")
+    with open(manifest, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(make_book(pages)) + "\n")
+
+    progress = []
+    result = timed(lambda: progress.extend(BatchGenerator(generator, workers=workers).run(manifest)))
+    result["pages_per_second"] = (pages + 1) / result["mean"]
+    result["failed"] = sum(book.failed for book in progress)
+    return result
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=5, latency=0.0, failure_rate=0.0, workers=1, output_path=None):
+    """Run the benchmark suite with the fake backends and save the results as JSON"""
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        results["wrap_text"] = bench_wrap_text(repeat * 10)
+        results["create_page"] = bench_create_page(work_dir, repeat)
+        results["cover"] = bench_cover(work_dir, repeat)
+        results["cover_variants[4]"] = bench_cover_variants(work_dir, 4, latency, repeat)
+        for spec in ENCODINGS:
+            results[f"encode[{spec}]"] = bench_encoding(work_dir, spec, repeat)
+        for pages in sizes:
+            print(f"Benchmarking {pages} page books...")
+            results[f"create_pdf[{pages}]"] = bench_create_pdf(work_dir, pages, 1)
+            results[f"create_pdf_vector[{pages}]"] = bench_create_pdf(work_dir, pages, 1, vector_text=True)
+            results[f"book[{pages}]"] = bench_book(work_dir, pages, latency, failure_rate, workers)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {"sizes": list(sizes), "repeat": repeat, "latency": latency,
+                     "failure_rate": failure_rate, "workers": workers},
+        "results": results,
+    }
+
+    if output_path is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_path = f"output/bench/bench_{timestamp}.json"
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nBenchmark results saved to: {output_path}")
+    return report
+
+
+def print_report(report, baseline=None):
+    """Print median times, with the change against a baseline report if given"""
+    for name, result in report["results"].items():
+        line = f"{name:28} {result['median'] * 1000:10.2f} ms"
+        if baseline and name in baseline["results"]:
+            before = baseline["results"][name]["median"]
+            line += f"   {result['median'] / before:6.2f}x vs baseline"
+        if "bytes" in result:
+            line += f"   {result['bytes'] / 1024:8.1f} kB"
+        print(line)
@@ -0,0 +1,68 @@
+import hashlib
+import json
+
+
+def inputs_hash(inputs):
+    """Stable hash of the inputs a page or cover is generated from"""
+    encoded = json.dumps(inputs, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def file_digest(path):
+    """SHA-256 of a file's content, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BookPages:
+    def __init__(self, path):
+        """Pages of a JSONL book, read from the file every time they are iterated
+
+        A JSONL book has the book settings and cover as an object on its first
+        line and one page object per following line, so a book of any length
+        is never held in memory as a whole.
+        """
+        self.path = path
+
+    def __iter__(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            next(f, None)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def __len__(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            next(f, None)
+            return sum(1 for line in f if line.strip())
+
+
+def is_jsonl_book(path):
+    return path.endswith(".jsonl")
+
+
+def write_book(book_data, path):
+    """Write a book specification as JSON, or as JSONL if path ends with .jsonl, one page at a time"""
+    with open(path, 'w', encoding='utf-8') as f:
+        if not is_jsonl_book(path):
+            # default=list writes the lazily read pages of JSONL books
+            json.dump(book_data, f, ensure_ascii=False, indent=4, default=list)
+            return path
+        header = {key: value for key, value in book_data.items() if key != 'pages'}
+        f.write(json.dumps(header, ensure_ascii=False) + "\n")
+        for page in book_data['pages']:
+            f.write(json.dumps(page, ensure_ascii=False) + "\n")
+    return path
+
+
+def load_book(path):
+    """Load a book specification from a JSON file, or a JSONL book with its pages read lazily"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if not is_jsonl_book(path):
+            return json.load(f)
+        book_data = json.loads(f.readline())
+    book_data['pages'] = BookPages(path)
+    return book_data
@@ -0,0 +1,169 @@
+from dataclasses import dataclass
+from src.utils.book_io import inputs_hash
+
+DEFAULT_STYLE = "watercolor painting, soft colors, children's book style"
+DEFAULT_IMAGE_SIZE = {"width": 384, "height": 512}
+
+
+class BookSpecError(ValueError):
+    """A book specification that cannot be generated, with the location of the problem"""
+
+    def __init__(self, where, message):
+        super().__init__(f"{where}: {message}")
+        self.where = where
+        self.message = message
+
+
+def _string(data, key, where, required=True):
+    value = data.get(key)
+    if value is None and not required:
+        return None
+    if not isinstance(value, str) or not value.strip():
+        raise BookSpecError(f"{where}.{key}", "must be a non-empty string")
+    return value
+
+
+def _object(value, where):
+    if not isinstance(value, dict):
+        raise BookSpecError(where, "must be an object")
+    return value
+
+
+def _image_size(value, where):
+    _object(value, where)
+    for key in ("width", "height"):
+        if not isinstance(value.get(key), int) or isinstance(value.get(key), bool) or value[key] <= 0:
+            raise BookSpecError(f"{where}.{key}", "must be a positive integer")
+    return {"width": value["width"], "height": value["height"]}
+
+
+@dataclass(slots=True)
+class CoverSpec:
+    title: str
+    author: str
+    illustrator: str
+    additional_info: list
+    art_style: str
+    image_size: dict
+
+    @property
+    def other_info(self):
+        """Lines under the title"""
+        return [f"Written by {self.author}", f"Illustrated by {self.illustrator}"] + self.additional_info
+
+
+@dataclass(slots=True)
+class PageSpec:
+    index: int
+    text: str
+    description: str
+    art_style: str
+    image_size: dict
+    seed: int | None
+    prompt: str
+    key: str
+
+
+@dataclass(slots=True)
+class BookSpec:
+    art_style: str
+    image_size: dict
+    cover: CoverSpec
+    pages: object
+
+    @classmethod
+    def from_dict(cls, book_data, validate=True):
+        """Validate a book specification and resolve the style, size, prompt and key of every page
+
+        A style_override that is missing or null falls back to the book's
+        art_style. The pages of JSONL books are validated in one pass and
+        compiled again whenever they are iterated, so they are never all in
+        memory. validate=False skips that pass for books validated at load,
+        their pages are still checked as they are compiled. Raises
+        BookSpecError naming the first invalid field.
+        """
+        art_style, image_size = book_settings(book_data)
+        cover = compile_cover(_object(book_data.get('cover'), "cover"), art_style, image_size)
+
+        pages = book_data.get('pages')
+        if isinstance(pages, list):
+            pages = [compile_page(page, i, art_style, image_size) for i, page in enumerate(pages, 1)]
+        elif hasattr(pages, '__iter__') and not isinstance(pages, (str, dict)):
+            pages = CompiledPages(pages, art_style, image_size)
+            if validate:
+                for _ in pages:
+                    pass
+        else:
+            raise BookSpecError("pages", "must be a list")
+        return cls(art_style, image_size, cover, pages)
+
+    def __len__(self):
+        return len(self.pages)
+
+
+class CompiledPages:
+    def __init__(self, pages, art_style, image_size):
+        """PageSpecs of lazily read pages, compiled while they are iterated"""
+        self.source = pages
+        self.art_style = art_style
+        self.image_size = image_size
+
+    def __iter__(self):
+        for i, page in enumerate(self.source, 1):
+            yield compile_page(page, i, self.art_style, self.image_size)
+
+    def __len__(self):
+        return len(self.source)
+
+
+def book_settings(book_data):
+    """(art_style, image_size) of a book specification, the defaults where it has none"""
+    _object(book_data, "book")
+    settings = _object(book_data.get('book_settings', {}), "book_settings")
+    art_style = _string(settings, 'art_style', "book_settings", required=False) or DEFAULT_STYLE
+    image_size = _image_size(settings.get('image_size', DEFAULT_IMAGE_SIZE), "book_settings.image_size")
+    return art_style, image_size
+
+
+def cover_spec(book_data):
+    """CoverSpec of a book specification, which needs no pages"""
+    art_style, image_size = book_settings(book_data)
+    return compile_cover(_object(book_data.get('cover'), "cover"), art_style, image_size)
+
+
+def compile_cover(cover, art_style, image_size):
+    additional_info = cover.get('additional_info', [])
+    if not isinstance(additional_info, list) or not all(isinstance(line, str) for line in additional_info):
+        raise BookSpecError("cover.additional_info", "must be a list of strings")
+    return CoverSpec(
+        title=_string(cover, 'title', "cover"),
+        author=_string(cover, 'author', "cover"),
+        illustrator=_string(cover, 'illustrator', "cover"),
+        additional_info=list(additional_info),
+        art_style=_string(cover, 'style_override', "cover", required=False) or art_style,
+        image_size=image_size,
+    )
+
+
+def compile_page(page, index, art_style, image_size):
+    """PageSpec of page number index (from 1) of a book with that style and size"""
+    where = f"pages[{index - 1}]"
+    _object(page, where)
+    description = _string(page, 'description', where)
+    page_style = _string(page, 'style_override', where, required=False) or art_style
+    if not isinstance(page.get('text'), str):
+        raise BookSpecError(f"{where}.text", "must be a string")
+    seed = page.get('seed')
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool) or seed < 0):
+        raise BookSpecError(f"{where}.seed", "must be a non-negative integer")
+    prompt = f"{page_style}, {description}"
+    return PageSpec(
+        index=index,
+        text=page['text'],
+        description=description,
+        art_style=page_style,
+        image_size=image_size,
+        seed=seed,
+        prompt=prompt,
+        key=inputs_hash([prompt, image_size, seed]),
+    )
@@ -0,0 +1,41 @@
+import math
+import os
+from PIL import Image, ImageDraw
+from src.utils.page_layout import CANVAS_HEIGHT, CANVAS_WIDTH, load_font
+
+LABEL_HEIGHT = 28
+GAP = 16
+
+
+def create_contact_sheet(image_paths, output_path, columns=4, thumb_width=240, labels=None):
+    """Lay out thumbnails of the book images in a grid on one image, for reviewing a whole book
+
+    labels are drawn under the thumbnails, the file names by default.
+    """
+    if labels is None:
+        labels = [os.path.basename(path) for path in image_paths]
+    thumb_height = int(thumb_width * CANVAS_HEIGHT / CANVAS_WIDTH)
+    rows = max(1, math.ceil(len(image_paths) / columns))
+    sheet = Image.new('RGB', (
+        GAP + columns * (thumb_width + GAP),
+        GAP + rows * (thumb_height + LABEL_HEIGHT + GAP),
+    ), 'white')
+    draw = ImageDraw.Draw(sheet)
+    font = load_font(LABEL_HEIGHT - 8)
+
+    for i, (path, label) in enumerate(zip(image_paths, labels)):
+        x = GAP + (i % columns) * (thumb_width + GAP)
+        y = GAP + (i // columns) * (thumb_height + LABEL_HEIGHT + GAP)
+        if os.path.exists(path):
+            with Image.open(path) as image:
+                # draft lets the decoder skip detail the thumbnail does not need
+                image.draft('RGB', (thumb_width, thumb_height))
+                image.thumbnail((thumb_width, thumb_height))
+                sheet.paste(image.convert('RGB'), (x + (thumb_width - image.width) // 2, y))
+        else:
+            draw.rectangle((x, y, x + thumb_width, y + thumb_height), outline='red')
+        draw.text((x, y + thumb_height + 4), label, font=font, fill='black')
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    sheet.save(output_path)
+    return output_path
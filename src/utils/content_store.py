@@ -0,0 +1,75 @@
+import hashlib
+import os
+import shutil
+import threading
+
+DEFAULT_STORE_DIR = "output/store"
+
+
+class ContentStore:
+    def __init__(self, directory=DEFAULT_STORE_DIR):
+        """Files stored once by content hash, with book directories holding hard links to them
+
+        A blob whose link count is back to 1 is no longer in any book directory
+        and is removed by gc(). On filesystems without hard links the book
+        directories get copies instead, which gc() does not count as references.
+        """
+        self.directory = directory
+
+    def blob_path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _link(self, source, target):
+        """Make target a hard link to source (a copy where that fails), replacing target"""
+        temp_path = f"{target}.{os.getpid()}.tmp"
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            shutil.copyfile(source, temp_path)
+        os.replace(temp_path, target)
+
+    def _write_blob(self, data, blob):
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        # Books generated in parallel may store the same bytes at the same time
+        temp_path = f"{blob}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, blob)
+
+    def put(self, data, path):
+        """Store encoded bytes and link path to them, return their digest
+
+        Bytes already stored, e.g. the unchanged pages of a repeated build,
+        are not written again, path only becomes a link to their blob.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self.blob_path(digest)
+        if not os.path.exists(blob):
+            self._write_blob(data, blob)
+        if not (os.path.exists(path) and os.path.samefile(blob, path)):
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Replaces the directory entry, a previous blob linked at path is left alone
+            self._link(blob, path)
+        return digest
+
+    def blobs(self):
+        """Paths of all stored blobs"""
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".tmp"):
+                    yield os.path.join(root, name)
+
+    def gc(self, dry_run=False):
+        """Remove the blobs no book directory links to and return (count, bytes) removed"""
+        count = 0
+        size = 0
+        for blob in self.blobs():
+            stat = os.stat(blob)
+            if stat.st_nlink > 1:
+                continue
+            count += 1
+            size += stat.st_size
+            if not dry_run:
+                os.remove(blob)
+        return count, size
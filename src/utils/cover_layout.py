@@ -0,0 +1,171 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageFont
+from src.utils.page_layout import LINE_SPACING, load_font, save_canvas, wrap_text
+
+
+@dataclass(frozen=True)
+class CoverTemplate:
+    """Canvas, illustration band and typography of a cover
+
+    The title is wrapped to the canvas width less two margins. It starts
+    title_y pixels below the top of the canvas (title_anchor="canvas") or
+    below the illustration (title_anchor="art"). The other lines (author,
+    illustrator, ...) start info_y pixels below the title (info_anchor="title")
+    or end info_y pixels above the bottom edge (info_anchor="bottom"). With a
+    year_size the current year is stamped year_y pixels above the bottom edge.
+    """
+    name: str
+    width: int = 1200
+    height: int = 1600
+    art_ratio: float = 0.8
+    margin: int = 60
+    title_size: int = 120
+    title_anchor: str = "art"
+    title_y: int = 50
+    title_shadow: int = 0
+    info_size: int = 48
+    info_anchor: str = "title"
+    info_y: int = 30
+    info_spacing: float = LINE_SPACING
+    year_size: int = 0
+    year_y: int = 30
+
+
+# The looks the cover makers of the backends have always had, now open to all of them
+TEMPLATES = {
+    template.name: template for template in (
+        # Title and lines under the illustration in the page font size, no year
+        CoverTemplate("classic", title_size=48, title_y=20, info_size=48, info_y=9),
+        # Tall cover, large shadowed title over the top of the illustration, lines and year at the bottom
+        CoverTemplate("poster", height=1800, title_anchor="canvas", title_shadow=4, info_anchor="bottom",
+                      info_y=86, year_size=48, year_y=32),
+        # Illustration over 70% of the cover, shadowed title, lines and year under it
+        CoverTemplate("storybook", art_ratio=0.7, title_shadow=3, info_size=60, info_spacing=1.5, year_size=60),
+        # Title over the top of the illustration, small lines and year at the bottom
+        CoverTemplate("framed", title_size=60, title_anchor="canvas", info_size=30, info_anchor="bottom",
+                      info_y=70, info_spacing=4 / 3, year_size=40, year_y=20),
+    )
+}
+
+
+def cover_year(template):
+    """Year stamped on covers of a template, None if it stamps none"""
+    return str(datetime.now().year) if template.year_size else None
+
+
+@lru_cache(maxsize=None)
+def cover_font(size):
+    """Cover font at a size, loaded once per size"""
+    font = load_font(size)
+    if getattr(font, 'size', None) != size:
+        # Without the page fonts PIL's default font is 10px unless asked for a size
+        font = ImageFont.load_default(size)
+    return font
+
+
+@lru_cache(maxsize=4096)
+def measure_lines(text, size, max_width):
+    """(line, width) of text wrapped to max_width in the cover font at size"""
+    font = cover_font(size)
+    return tuple((line, font.getlength(line)) for line in wrap_text(text, font.getlength, max_width))
+
+
+def _layout(template, title, other_info, year, title_size):
+    """(positions, fits) of the text lines with the title at title_size"""
+    max_width = template.width - 2 * template.margin
+    art_height = int(template.height * template.art_ratio)
+
+    def centered(lines, y, size, spacing, shadow=0):
+        return [
+            (line, (template.width - width) / 2, y + i * int(size * spacing), size, shadow)
+            for i, (line, width) in enumerate(lines)
+        ]
+
+    title_lines = measure_lines(title, title_size, max_width)
+    title_y = template.title_y + (art_height if template.title_anchor == "art" else 0)
+    title_bottom = title_y + (len(title_lines) - 1) * int(title_size * LINE_SPACING) + title_size
+    positions = centered(title_lines, title_y, title_size, LINE_SPACING, template.title_shadow)
+
+    info_lines = [line for info in other_info for line in measure_lines(info, template.info_size, max_width)]
+    info_step = int(template.info_size * template.info_spacing)
+    if template.info_anchor == "title":
+        info_y = title_bottom + template.info_y
+    else:
+        info_y = template.height - template.info_y - len(info_lines) * info_step
+    positions += centered(info_lines, info_y, template.info_size, template.info_spacing)
+    info_bottom = info_y + len(info_lines) * info_step
+
+    text_bottom = template.height
+    if year is not None and template.year_size:
+        year_y = template.height - template.year_y - template.year_size
+        positions += centered(measure_lines(year, template.year_size, max_width), year_y,
+                              template.year_size, LINE_SPACING)
+        text_bottom = year_y
+    if template.info_anchor == "title":
+        # The lines follow the title, together they must end above the year
+        fits = info_bottom <= text_bottom
+    else:
+        # Titles over the illustration keep to its upper half
+        fits = title_bottom <= (art_height // 2 if template.title_anchor == "canvas" else info_y)
+    return positions, fits
+
+
+@lru_cache(maxsize=1024)
+def layout_cover(template, title, other_info=(), year=None):
+    """(line, x, y, size, shadow) of every text line of a cover, other_info a tuple of lines
+
+    Titles too long for the template are set smaller, down to half its
+    title size. Measured once per template and texts, so covers regenerated
+    with new illustrations only draw.
+    """
+    title_size = template.title_size
+    positions, fits = _layout(template, title, other_info, year, title_size)
+    while not fits and title_size > template.title_size // 2:
+        title_size = max(int(title_size * 0.9), template.title_size // 2)
+        positions, fits = _layout(template, title, other_info, year, title_size)
+    return tuple(positions)
+
+
+def render_cover(illustration, title, other_info=(), template=TEMPLATES["classic"], output_path=None):
+    """Create a cover from its illustration and text and save it to output_path (None only returns it)"""
+    if isinstance(template, str):
+        template = TEMPLATES[template]
+    art_height = int(template.height * template.art_ratio)
+
+    canvas = Image.new('RGB', (template.width, template.height), 'white')
+    canvas.paste(illustration.resize((template.width, art_height)), (0, 0))
+    draw = ImageDraw.Draw(canvas)
+    for line, x, y, size, shadow in layout_cover(template, title, tuple(other_info), cover_year(template)):
+        font = cover_font(size)
+        if shadow:
+            draw.text((x + shadow, y + shadow), line, font=font, fill='grey')
+        draw.text((x, y), line, font=font, fill='black')
+
+    save_canvas(canvas, output_path)
+    return canvas
+
+
+def create_cover_variants(cover_maker, title, other_info, output_paths, art_style=None, image_size=None,
+                          workers=None):
+    """Render one cover per output path, each with its own illustration and the same typography
+
+    Variant i is illustrated by cover_maker.generate_cover_image(..., seed=i)
+    with the cover maker's template. The illustrations are requested and the
+    covers rendered on workers threads (one per variant by default). Returns
+    the canvases in the order of output_paths.
+    """
+    template = cover_maker.template
+    # Measured once up front, the variants only draw
+    layout_cover(template, title, tuple(other_info or ()), cover_year(template))
+
+    def render(seed, output_path):
+        illustration = cover_maker.generate_cover_image(title, art_style, image_size, seed=seed)
+        if illustration is None:
+            raise ValueError(f"Failed to generate the illustration of cover variant {seed}")
+        return render_cover(illustration, title, other_info or (), template, output_path)
+
+    with ThreadPoolExecutor(max_workers=workers or max(len(output_paths), 1)) as pool:
+        return list(pool.map(render, range(len(output_paths)), output_paths))
@@ -1,69 +1,155 @@
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter, A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.lib.utils import ImageReader
 from PIL import Image
 import os
+import time
 from datetime import datetime
-import json
-
-def create_pdf(book_data_file, images_dir, output_dir=None):
-    """Create a PDF from the book images"""
-    # Load book data
-    with open(book_data_file, 'r', encoding='utf-8') as f:
-        book_data = json.load(f)
-    
+from src.utils.book_io import load_book
+from src.utils.metrics import METRICS
+from src.utils.page_layout import (
+    CANVAS_HEIGHT, CANVAS_WIDTH, FONT_NAMES, FONT_SIZE, IMAGE_RATIO, SHADOW_OFFSET,
+    cover_filename, find_image, layout_text, page_filename,
+)
+
+# Name the page font is registered under in reportlab
+PDF_FONT_NAME = "PagePainterText"
+
+
+def register_pdf_font():
+    """Register the page font with reportlab and return its name
+
+    reportlab embeds only the subset of glyphs used by the document.
+    Falls back to the Vera font bundled with reportlab.
+    """
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    for font_file in FONT_NAMES + ["Vera.ttf"]:
+        try:
+            pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_file))
+            return PDF_FONT_NAME
+        except Exception:
+            continue
+    raise RuntimeError("No TrueType font available for vector text")
+
+
+def create_pdf(book_data_file, images_dir, output_dir=None, vector_text=False, max_dpi=None, profiler=None):
+    """Create a PDF from the book images
+
+    With vector_text=True the pages are read from the illustration-only images
+    and the page text is drawn as selectable text instead of pixels. With
+    max_dpi the images are scaled down to at most that resolution on the page,
+    for small review copies. With a Profiler the run is profiled as its
+    "pdf" stage.
+    """
+    if profiler is not None:
+        with profiler.stage("pdf"):
+            return create_pdf(book_data_file, images_dir, output_dir, vector_text, max_dpi)
+    start = time.perf_counter()
+
+    # Load book data, the pages of JSONL books are read as they are added
+    book_data = load_book(book_data_file)
+
     # Create output directory if not provided
     if output_dir is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_dir = f"output/pdf_{timestamp}"
     os.makedirs(output_dir, exist_ok=True)
-    
+
     # Set up the PDF
     pdf_path = os.path.join(output_dir, f"{book_data['cover']['title']}.pdf")
     c = canvas.Canvas(pdf_path, pagesize=A4)
     width, height = A4  # A4 size in points
-    
+
+    def fit_to_page(aspect):
+        # Calculate dimensions to fit page while maintaining aspect ratio
+        if aspect > (width / height):
+            return width, width / aspect
+        return height * aspect, height
+
+    def image_source(image_path, draw_width, draw_height):
+        # The file itself, or a scaled down copy when it is finer than max_dpi
+        if max_dpi is None:
+            return image_path
+        size = (int(draw_width / 72 * max_dpi), int(draw_height / 72 * max_dpi))
+        with Image.open(image_path) as img:
+            if img.width <= size[0] and img.height <= size[1]:
+                return image_path
+            return ImageReader(img.convert('RGB').resize(size, Image.BILINEAR))
+
     # Function to add an image as a page
     def add_image_page(image_path):
         if os.path.exists(image_path):
-            # Open and resize image to fit A4
-            img = Image.open(image_path)
-            aspect = img.width / img.height
-            
-            # Calculate dimensions to fit page while maintaining aspect ratio
-            if aspect > (width / height):
-                new_width = width
-                new_height = width / aspect
-            else:
-                new_height = height
-                new_width = height * aspect
-            
+            # Open and resize image to fit A4, only the header is read here
+            with Image.open(image_path) as img:
+                new_width, new_height = fit_to_page(img.width / img.height)
+
             # Center the image on the page
             x = (width - new_width) / 2
             y = (height - new_height) / 2
-            
+
             # Add the image
-            c.drawImage(image_path, x, y, new_width, new_height)
+            c.drawImage(image_source(image_path, new_width, new_height), x, y, new_width, new_height)
+            c.showPage()
+
+    # Function to add an illustration with the page text drawn as real text
+    def add_vector_page(image_path, text):
+        if os.path.exists(image_path):
+            # Lay the page out in canvas pixels, then scale the frame to fit A4
+            frame_width, frame_height = fit_to_page(CANVAS_WIDTH / CANVAS_HEIGHT)
+            scale = frame_width / CANVAS_WIDTH
+            left = (width - frame_width) / 2
+            top = (height + frame_height) / 2
+
+            # Add the illustration in the top portion
+            image_height = int(CANVAS_HEIGHT * IMAGE_RATIO) * scale
+            c.drawImage(image_source(image_path, frame_width, image_height),
+                        left, top - image_height, frame_width, image_height)
+
+            # Same wrap and centering rules as the rendered pages
+            measure = lambda line: pdfmetrics.stringWidth(line, font_name, FONT_SIZE)
+            ascent, _ = pdfmetrics.getAscentDescent(font_name, FONT_SIZE)
+            c.setFont(font_name, FONT_SIZE * scale)
+            for line, x, y in layout_text(text, measure):
+                # PIL positions text by its top, reportlab by its baseline
+                baseline = top - (y + ascent) * scale
+                shadow = SHADOW_OFFSET * scale
+                c.setFillColorRGB(0.5, 0.5, 0.5)
+                c.drawString(left + x * scale + shadow, baseline - shadow, line)
+                c.setFillColorRGB(0, 0, 0)
+                c.drawString(left + x * scale, baseline, line)
             c.showPage()
-    
+
+    if vector_text:
+        font_name = register_pdf_font()
+
     # Add cover
-    cover_path = os.path.join(images_dir, "00_cover.png")
+    # Images are found in whichever encoding the book was generated with
+    cover_path = find_image(images_dir, cover_filename())
     add_image_page(cover_path)
-    
+
     # Add all pages in order
-    for i in range(1, len(book_data['pages']) + 1):
-        page_path = os.path.join(images_dir, f"{i:02d}_page.png")
-        add_image_page(page_path)
-    
+    for i, page in enumerate(book_data['pages'], 1):
+        page_path = find_image(images_dir, page_filename(i, vector_text))
+        if vector_text:
+            add_vector_page(page_path, page['text'])
+        else:
+            add_image_page(page_path)
+
     # Save the PDF
     c.save()
+    METRICS.observe("pagepainter_pdf_seconds", time.perf_counter() - start)
     print(f"\nPDF created successfully: {pdf_path}")
     return pdf_path
 
 if __name__ == "__main__":
     import sys
-    
-    if len(sys.argv) != 3:
-        print("Usage: python create_pdf.py <book_data.json> <images_directory>")
+
+    args = [arg for arg in sys.argv[1:] if arg != "--vector-text"]
+    if len(args) != 2:
+        print("Usage: python create_pdf.py <book_data.json> <images_directory> [--vector-text]")
         sys.exit(1)
-    
-    create_pdf(sys.argv[1], sys.argv[2])
+
+    create_pdf(args[0], args[1], vector_text="--vector-text" in sys.argv)
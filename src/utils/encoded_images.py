@@ -0,0 +1,50 @@
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+# Pillow releases the GIL while decoding, so decoding several images scales with threads
+DECODE_WORKERS = min(8, os.cpu_count() or 1)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def open_encoded(data):
+    """Open encoded image bytes without decoding them
+
+    Only the header is read. The original bytes stay available as a memoryview
+    in image.info['encoded'], so they can be archived without re-encoding; the
+    pixels are decoded the first time they are needed.
+    """
+    image = Image.open(io.BytesIO(data))
+    image.info['encoded'] = memoryview(data)
+    return image
+
+
+def encoded_bytes(image, format="PNG"):
+    """The original bytes of an image opened with open_encoded if they are in format, else None"""
+    data = image.info.get('encoded')
+    if data is None or image.format != format:
+        return None
+    return data
+
+
+def decode_pool():
+    """Thread pool shared by all decoding"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix="decode")
+        return _pool
+
+
+def decode_all(images):
+    """Decode lazily opened images, in parallel when there are several"""
+    pending = [image for image in images if getattr(image, 'fp', None) is not None]
+    if len(pending) > 1:
+        list(decode_pool().map(lambda image: image.load(), pending))
+    elif pending:
+        pending[0].load()
+    return images
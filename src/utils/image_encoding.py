@@ -0,0 +1,168 @@
+import io
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from PIL import Image
+from src.utils.metrics import METRICS
+
+# File extension of each format
+EXTENSIONS = {"png": ".png", "png-palette": ".png", "webp": ".webp", "jpeg": ".jpg"}
+# Pillow's zlib level when none is given
+DEFAULT_COMPRESS_LEVEL = 6
+DEFAULT_JPEG_QUALITY = 90
+
+
+class ImageEncoding:
+    def __init__(self, format="png", level=None):
+        """How page and cover images are written
+
+        png          PNG, level is the zlib compression level (0-9, 1 is much faster than 6)
+        png-palette  PNG with an optimized 256 color palette, small for flat art
+        webp         lossless WebP, or lossy with a quality level (0-100)
+        jpeg         JPEG with a quality level (default 90)
+        """
+        if format not in EXTENSIONS:
+            raise ValueError(f"Unknown image format: {format} (use {', '.join(EXTENSIONS)})")
+        self.format = format
+        self.level = level
+
+    @property
+    def extension(self):
+        return EXTENSIONS[self.format]
+
+    def __str__(self):
+        return self.format if self.level is None else f"{self.format}:{self.level}"
+
+    def _write(self, image, target):
+        if self.format == "png":
+            level = DEFAULT_COMPRESS_LEVEL if self.level is None else self.level
+            image.save(target, format="PNG", compress_level=level)
+        elif self.format == "png-palette":
+            paletted = image.convert('RGB').quantize(colors=256, method=Image.Quantize.MEDIANCUT)
+            paletted.save(target, format="PNG", optimize=True)
+        elif self.format == "webp":
+            if self.level is None:
+                image.save(target, format="WEBP", lossless=True)
+            else:
+                image.save(target, format="WEBP", quality=self.level)
+        else:
+            quality = DEFAULT_JPEG_QUALITY if self.level is None else self.level
+            image.convert('RGB').save(target, format="JPEG", quality=quality)
+
+    def encode(self, image):
+        """Encoded bytes of image, e.g. to hash them before anything is written"""
+        buffer = io.BytesIO()
+        self._write(image, buffer)
+        return buffer.getvalue()
+
+    def save(self, image, output_path):
+        """Encode image to output_path through a temporary file, so readers never see half written images"""
+        if output_path is None:
+            return self.encode(image)
+        if os.path.dirname(output_path):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        temp_path = f"{output_path}.{os.getpid()}.tmp"
+        self._write(image, temp_path)
+        os.replace(temp_path, output_path)
+        return output_path
+
+
+def parse_encoding(spec):
+    """ImageEncoding of a spec like png, png:1, png-palette, webp, webp:80 or jpeg:85"""
+    format, _, level = spec.partition(":")
+    return ImageEncoding(format, int(level) if level else None)
+
+
+def _encode(encoding, image, output_path):
+    # Runs in the worker processes, the image arrives pickled
+    start = time.perf_counter()
+    result = encoding.save(image, output_path)
+    return result, time.perf_counter() - start
+
+
+def then(future, function):
+    """Future of function(result of future), called once future is done"""
+    chained = Future()
+
+    def done(finished):
+        try:
+            chained.set_result(function(finished.result()))
+        except Exception as e:
+            chained.set_exception(e)
+
+    future.add_done_callback(done)
+    return chained
+
+
+class EncoderPool:
+    def __init__(self, encoding, workers=None):
+        """Encode images in worker processes, so compression neither holds the GIL nor the generation thread
+
+        workers=0 encodes in the calling thread.
+        """
+        self.encoding = parse_encoding(encoding) if isinstance(encoding, str) else encoding
+        self.workers = os.cpu_count() if workers is None else workers
+        self.executor = None
+
+    @property
+    def extension(self):
+        return self.encoding.extension
+
+    def _observe(self, result):
+        value, seconds = result
+        METRICS.observe("pagepainter_encode_seconds", seconds, format=self.encoding.format)
+        return value
+
+    def submit(self, image, output_path=None):
+        """Start encoding image to output_path and return a Future of the path
+
+        Without an output_path the Future is of the encoded bytes. The image
+        must not change until the Future is done.
+        """
+        if self.workers == 0:
+            future = Future()
+            try:
+                future.set_result(_encode(self.encoding, image, output_path))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            future = self.executor.submit(_encode, self.encoding, image, output_path)
+        return then(future, self._observe)
+
+    def encode(self, image, output_path=None):
+        """Encode image to output_path (None returns the bytes) and wait for it"""
+        return self.submit(image, output_path).result()
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+def write_image(image, output_path, encoder=None, store=None):
+    """Start writing a finished cover or page with an EncoderPool, into a ContentStore, or both
+
+    Returns a Future of output_path, already done unless an EncoderPool
+    encodes the image. With a store the image is encoded in memory (as a
+    default PNG without an encoder) and only written if the store does not
+    hold those bytes yet.
+    """
+    if store is None:
+        return encoder.submit(image, output_path)
+
+    def put(data):
+        store.put(data, output_path)
+        return output_path
+
+    if encoder is not None:
+        return then(encoder.submit(image), put)
+    future = Future()
+    try:
+        with METRICS.time("pagepainter_encode_seconds", format="png"):
+            data = ImageEncoding().encode(image)
+        future.set_result(put(data))
+    except Exception as e:
+        future.set_exception(e)
+    return future
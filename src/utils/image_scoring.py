@@ -0,0 +1,44 @@
+from PIL import ImageFilter, ImageStat
+
+# Size the candidates are scaled down to before scoring, enough to tell them apart
+THUMBNAIL_SIZE = (64, 64)
+# Luminance standard deviation below which an image counts as blank or near uniform
+UNIFORM_STDDEV = 4.0
+
+
+def image_score(image):
+    """Cheap quality score of a candidate illustration, 0 for unusable ones
+
+    Images blocked by a safety filter (image.info['filtered']) and blank or
+    near uniform images, e.g. the black images of a safety checker, score 0.
+    Others score by contrast plus edge detail, which is low for the blurred
+    images safety filters return.
+    """
+    if image.info.get('filtered'):
+        return 0.0
+    thumbnail = image.convert('L').resize(THUMBNAIL_SIZE)
+    contrast = ImageStat.Stat(thumbnail).stddev[0]
+    if contrast < UNIFORM_STDDEV:
+        return 0.0
+    detail = ImageStat.Stat(thumbnail.filter(ImageFilter.FIND_EDGES)).mean[0]
+    return contrast + detail
+
+
+def pick_best(images, scorer=None):
+    """Return the best of the candidate images and the others, best first
+
+    scorer, a function of an image returning a number, replaces the built-in
+    score for candidates that are not rejected as blank or filtered.
+    """
+    if not images:
+        raise ValueError("No candidate illustrations to choose from")
+    ranked = []
+    for index, image in enumerate(images):
+        score = image_score(image)
+        usable = score > 0
+        if usable and scorer is not None:
+            score = scorer(image)
+        # Rejected candidates rank after all usable ones whatever the scorer says
+        ranked.append((usable, score, -index))
+    order = sorted(range(len(images)), key=lambda i: ranked[i], reverse=True)
+    return images[order[0]], [images[i] for i in order[1:]]
@@ -0,0 +1,226 @@
+import gc
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+try:
+    import resource
+except ImportError:
+    # Windows has neither procfs nor getrusage, peaks are reported as 0 there
+    resource = None
+
+
+def _status_kb(field):
+    """A memory field of /proc/self/status in kB, or None where there is no procfs"""
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss():
+    """Peak resident memory of the process in bytes (since the last reset_peak on Linux)"""
+    peak = _status_kb("VmHWM")
+    if peak is not None:
+        return peak * 1024
+    if resource is None:
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def current_rss():
+    """Resident memory of the process in bytes, the peak where the current value is unavailable"""
+    rss = _status_kb("VmRSS")
+    return rss * 1024 if rss is not None else peak_rss()
+
+
+def available_memory():
+    """Memory the system can give the process without swapping in bytes, None where unknown"""
+    try:
+        with open("/proc/meminfo", 'r') as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def reset_peak():
+    """Reset the peak resident memory to the current value, where the kernel supports it"""
+    try:
+        with open("/proc/self/clear_refs", 'w') as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class MemoryMonitor:
+    def __init__(self, budget_mb=None):
+        """Peak resident memory per stage of a generation, and an optional memory budget
+
+        Stage peaks are exact where the kernel can reset the peak (Linux) and
+        stages do not overlap, i.e. when pages are generated one at a time;
+        otherwise they are upper bounds. Above budget_mb, over_budget() tells
+        the generator to release what it keeps for later pages.
+        """
+        self.budget = budget_mb * 1024 * 1024 if budget_mb else None
+        self.peaks = {}
+        self.counts = {}
+        self.releases = 0
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """Measure the peak resident memory while the block runs"""
+        reset_peak()
+        try:
+            yield
+        finally:
+            peak = peak_rss()
+            with self.lock:
+                self.peaks[name] = max(self.peaks.get(name, 0), peak)
+                self.counts[name] = self.counts.get(name, 0) + 1
+
+    def over_budget(self):
+        return self.budget is not None and current_rss() > self.budget
+
+    def release(self, *callbacks):
+        """Run the release callbacks and collect garbage if over budget, return whether it was"""
+        if not self.over_budget():
+            return False
+        for callback in callbacks:
+            callback()
+        gc.collect()
+        self.releases += 1
+        return True
+
+    def report(self):
+        """Print the peak resident memory of every stage"""
+        print("\nPeak memory per stage:")
+        for name, peak in self.peaks.items():
+            print(f"  {name:14} {peak / 1024 / 1024:8.1f} MB  ({self.counts[name]} runs)")
+        if self.budget is not None:
+            print(f"  budget         {self.budget / 1024 / 1024:8.1f} MB  "
+                  f"(exceeded {self.releases} time(s), buffers released)")
+
+
+# Share of the available memory a render may plan to use, the rest is left to the system and the pages
+RENDER_HEADROOM = 0.75
+# Attention heads of the Stable Diffusion v1 UNet and channels of its VAE decoder at full resolution
+UNET_HEADS = 8
+VAE_CHANNELS = 128
+# Size of the tiles a tiled VAE decodes, in pixels
+VAE_TILE = 512
+# Bytes per float32 value
+FLOAT_BYTES = 4
+
+
+def attention_bytes(image_size, samples=1, slice_size=None):
+    """Estimated peak of the largest UNet self-attention, slice_size heads at a time (None for all)"""
+    tokens = (image_size["width"] // 8) * (image_size["height"] // 8)
+    # Classifier-free guidance runs every sample twice, scores and probabilities are both live
+    heads = slice_size or 2 * samples * UNET_HEADS
+    return heads * tokens * tokens * FLOAT_BYTES * 2
+
+
+def vae_decode_bytes(image_size, images=1):
+    """Estimated peak of decoding latents to images of image_size with the full VAE"""
+    width, height = image_size["width"], image_size["height"]
+    tokens = (width // 8) * (height // 8)
+    # A few activations of the last decoder block, plus the attention of its middle block
+    per_image = width * height * VAE_CHANNELS * FLOAT_BYTES * 4 + tokens * tokens * FLOAT_BYTES * 2
+    return images * per_image
+
+
+def tiled_decode_bytes(image_size):
+    """Estimated peak of a tiled VAE decode: one tile at a time and the blended image"""
+    width, height = image_size["width"], image_size["height"]
+    return vae_decode_bytes({"width": VAE_TILE, "height": VAE_TILE}) + width * height * 3 * FLOAT_BYTES * 2
+
+
+@dataclass(frozen=True)
+class MemoryPolicy:
+    """Memory savings of a diffusion render and its estimated peak in bytes
+
+    attention_slicing is None, "auto" (half of the heads at a time) or
+    "max" (one head at a time). Every saving slows the render down, so a
+    policy only enables those the available memory calls for.
+    """
+    attention_slicing: str = None
+    vae_slicing: bool = False
+    vae_tiling: bool = False
+    estimate: int = 0
+
+    def __str__(self):
+        savings = []
+        if self.attention_slicing:
+            savings.append(f"attention slicing ({self.attention_slicing})")
+        if self.vae_slicing:
+            savings.append("VAE slicing")
+        if self.vae_tiling:
+            savings.append("VAE tiling")
+        return ", ".join(savings) or "no slicing"
+
+
+def choose_memory_policy(image_size, samples=1, available=None):
+    """Fastest MemoryPolicy whose estimated peak fits in the available memory
+
+    available is in bytes and defaults to the memory the system has
+    available now. The UNet and the VAE run one after the other, so the
+    attention and the decoding savings are picked apart: attention slicing
+    first halves, then splits per head the attention; VAE slicing decodes
+    one sample at a time, tiling decodes 512 pixel tiles, which keeps
+    print-resolution renders (1024x1024 and up) off the swap. Where the
+    available memory is unknown every saving is enabled.
+    """
+    if available is None:
+        available = available_memory()
+    if available is None:
+        return MemoryPolicy("max", samples > 1, True,
+                            max(attention_bytes(image_size, samples, 1), tiled_decode_bytes(image_size)))
+    budget = available * RENDER_HEADROOM
+
+    attention = [(None, attention_bytes(image_size, samples)),
+                 ("auto", attention_bytes(image_size, samples, UNET_HEADS // 2)),
+                 ("max", attention_bytes(image_size, samples, 1))]
+    attention_slicing, attention_peak = next(((option, peak) for option, peak in attention if peak <= budget),
+                                             attention[-1])
+
+    decoding = [((False, False), vae_decode_bytes(image_size, samples))]
+    if samples > 1:
+        decoding.append(((True, False), vae_decode_bytes(image_size)))
+    if max(image_size["width"], image_size["height"]) > VAE_TILE:
+        # Smaller images fit in one tile, tiling would not save anything
+        decoding.append(((samples > 1, True), tiled_decode_bytes(image_size)))
+    (vae_slicing, vae_tiling), decode_peak = next(((option, peak) for option, peak in decoding if peak <= budget),
+                                                  decoding[-1])
+    return MemoryPolicy(attention_slicing, vae_slicing, vae_tiling, max(attention_peak, decode_peak))
+
+
+def apply_memory_policy(pipe, policy):
+    """Enable the savings of a MemoryPolicy on a diffusers pipeline and disable the others"""
+    if policy.attention_slicing:
+        pipe.enable_attention_slicing(policy.attention_slicing)
+    else:
+        pipe.disable_attention_slicing()
+    if policy.vae_slicing:
+        pipe.enable_vae_slicing()
+    else:
+        pipe.disable_vae_slicing()
+    if policy.vae_tiling:
+        pipe.enable_vae_tiling()
+    else:
+        pipe.disable_vae_tiling()
@@ -0,0 +1,158 @@
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds of the histogram buckets, in seconds or dollars
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+DOLLARS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25)
+
+
+def _labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    return "+Inf" if value == math.inf else repr(float(value))
+
+
+class Metrics:
+    def __init__(self):
+        """Counters and histograms of a process, rendered in the Prometheus text format
+
+        Every metric is declared once with counter() or histogram() and then
+        updated with labels, e.g. inc("pagepainter_illustrations_total",
+        backend="dalle"). Updates are thread safe.
+        """
+        self.kinds = {}
+        self.help = {}
+        self.buckets = {}
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def counter(self, name, help):
+        self.kinds[name] = "counter"
+        self.help[name] = help
+
+    def histogram(self, name, help, buckets=SECONDS_BUCKETS):
+        self.kinds[name] = "histogram"
+        self.help[name] = help
+        self.buckets[name] = tuple(buckets) + (math.inf,)
+
+    def inc(self, name, amount=1, **labels):
+        """Add amount to a counter"""
+        key = (name, _labels(labels))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """Add a value, e.g. seconds, to a histogram"""
+        key = (name, _labels(labels))
+        with self.lock:
+            histogram = self.values.get(key)
+            if histogram is None:
+                histogram = self.values[key] = {"buckets": [0] * len(self.buckets[name]), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets[name]):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @contextmanager
+    def time(self, name, **labels):
+        """Observe the seconds the block takes in a histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def outcome(self, name, **labels):
+        """Count the block in a counter with status="done", or status="failed" if it raises"""
+        try:
+            yield
+        except Exception:
+            self.inc(name, status="failed", **labels)
+            raise
+        self.inc(name, status="done", **labels)
+
+    def value(self, name, **labels):
+        """Value of a counter or number of observations of a histogram, 0 if never updated"""
+        with self.lock:
+            value = self.values.get((name, _labels(labels)), 0)
+        return value["count"] if isinstance(value, dict) else value
+
+    def total(self, name):
+        """Sum of a counter over all its labels, or of the observed values of a histogram"""
+        with self.lock:
+            values = [value for (metric, _), value in self.values.items() if metric == name]
+        return sum(value["sum"] if isinstance(value, dict) else value for value in values)
+
+    def reset(self):
+        with self.lock:
+            self.values.clear()
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self.lock:
+            values = sorted(self.values.items(), key=lambda item: item[0])
+            values = [(key, dict(value, buckets=list(value["buckets"])) if isinstance(value, dict) else value)
+                      for key, value in values]
+        lines = []
+        for name in sorted(self.kinds):
+            lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} {self.kinds[name]}")
+            for (metric, labels), value in values:
+                if metric != name:
+                    continue
+                if self.kinds[name] == "counter":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                for bound, count in zip(self.buckets[name], value["buckets"]):
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', _format_value(bound))])} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the metrics to a file through a temporary file, e.g. for node_exporter's textfile collector"""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(temp_path, path)
+        print(f"Metrics written to: {path}")
+        return path
+
+
+# Metrics of this process, updated by the backends, the generators and the PDF builder
+METRICS = Metrics()
+METRICS.counter("pagepainter_illustrations_total", "Illustrations generated, by backend")
+METRICS.histogram("pagepainter_illustration_seconds", "Latency of generating one illustration, by backend")
+METRICS.counter("pagepainter_illustrations_reused_total", "Illustrations taken from the cache")
+METRICS.counter("pagepainter_backend_failures_total", "Failed calls of a backend that fell back to the next one")
+METRICS.counter("pagepainter_circuit_opens_total", "Times the circuit of a backend opened")
+METRICS.counter("pagepainter_placeholders_total", "Placeholder images saved for failed generations, by backend")
+METRICS.counter("pagepainter_task_retries_total", "Work queue tasks that failed and were queued again")
+METRICS.counter("pagepainter_tasks_failed_total", "Work queue tasks that failed for the last time")
+METRICS.histogram("pagepainter_diffusion_step_seconds", "Seconds per diffusion step of the opensource backend")
+METRICS.histogram("pagepainter_render_seconds", "Seconds of a diffusion render, by memory policy")
+METRICS.histogram("pagepainter_stage_seconds", "Seconds of the cover, illustration and page stages")
+METRICS.histogram("pagepainter_compose_seconds", "Seconds compositing the illustration and text of a page")
+METRICS.histogram("pagepainter_encode_seconds", "Seconds encoding a page or cover image, by format")
+METRICS.histogram("pagepainter_pdf_seconds", "Seconds building the PDF of a book")
+METRICS.counter("pagepainter_pages_total", "Pages and covers written, by status")
+METRICS.counter("pagepainter_books_total", "Books finished, by status")
+METRICS.counter("pagepainter_spend_dollars_total", "Estimated spend on paid backends, by backend")
+METRICS.histogram("pagepainter_book_cost_dollars", "Estimated spend per book", DOLLARS_BUCKETS)
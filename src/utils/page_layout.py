@@ -0,0 +1,139 @@
+import os
+import time
+from PIL import Image, ImageDraw, ImageFont
+from src.utils.metrics import METRICS
+
+# Page geometry shared by the rendered pages and the vector text PDF
+CANVAS_WIDTH = 1200
+CANVAS_HEIGHT = 1600
+IMAGE_RATIO = 0.7  # 70% for image
+FONT_SIZE = 72
+TEXT_MARGIN = 80
+LINE_SPACING = 1.2  # 120% of font size
+SHADOW_OFFSET = 2
+
+# Extensions of the image encodings a book can be saved in, see src/utils/image_encoding.py
+IMAGE_EXTENSIONS = (".png", ".webp", ".jpg")
+
+# Comic Sans MS first, then Arial; both PIL and reportlab look these up in the system font dirs
+FONT_NAMES = ["comic.ttf", "arial.ttf"]
+
+
+def page_filename(index, vector_text=False, extension=".png"):
+    """File name of a page image inside a book directory"""
+    if vector_text:
+        # Illustration only, the text is drawn by the PDF builder
+        return f"{index:02d}_illustration{extension}"
+    return f"{index:02d}_page{extension}"
+
+
+def cover_filename(extension=".png"):
+    """File name of the cover image inside a book directory"""
+    return f"00_cover{extension}"
+
+
+def find_image(images_dir, filename):
+    """Path of a book image in whichever encoding it was saved, the given name if there is none"""
+    base = os.path.splitext(filename)[0]
+    for extension in IMAGE_EXTENSIONS:
+        path = os.path.join(images_dir, base + extension)
+        if os.path.exists(path):
+            return path
+    return os.path.join(images_dir, filename)
+
+
+def save_canvas(canvas, output_path):
+    """Save a finished page or cover, unless output_path is None and the caller encodes it"""
+    if output_path is None:
+        return
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with METRICS.time("pagepainter_encode_seconds", format=os.path.splitext(output_path)[1].lstrip(".")):
+        canvas.save(output_path)
+
+
+def load_font(size=FONT_SIZE):
+    """Load the page font, falling back to PIL's default font"""
+    for font_name in FONT_NAMES:
+        try:
+            return ImageFont.truetype(font_name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def wrap_text(text, measure, max_width):
+    """Word wrap text so that no line is wider than max_width according to measure"""
+    words = text.split()
+    lines = []
+    current_line = []
+
+    for word in words:
+        current_line.append(word)
+        if measure(' '.join(current_line)) > max_width:
+            if len(current_line) == 1:
+                # A single word that is too long keeps its own line
+                lines.append(current_line[0])
+                current_line = []
+            else:
+                current_line.pop()
+                lines.append(' '.join(current_line))
+                current_line = [word]
+
+    if current_line:
+        lines.append(' '.join(current_line))
+
+    return lines
+
+
+def layout_text(text, measure, font_size=FONT_SIZE, canvas_width=CANVAS_WIDTH, canvas_height=CANVAS_HEIGHT):
+    """Return (line, x, y) for each text line, centered in the text area below the illustration"""
+    image_height = int(canvas_height * IMAGE_RATIO)
+    text_area_height = canvas_height - image_height
+
+    lines = wrap_text(text, measure, canvas_width - 2 * TEXT_MARGIN)
+
+    # Center the block of lines vertically in the text area
+    total_text_height = len(lines) * font_size * LINE_SPACING
+    start_y = image_height + (text_area_height - total_text_height) / 2
+
+    positions = []
+    for i, line in enumerate(lines):
+        # Center each line horizontally
+        x = (canvas_width - measure(line)) / 2
+        y = start_y + i * font_size * LINE_SPACING
+        positions.append((line, x, y))
+    return positions
+
+
+def compose_page(text, image, output_path, render_text=True):
+    """Create a page combining the illustration and text and save it to output_path
+
+    With render_text=False only the illustration band is saved, so the text can be
+    drawn as real text by the PDF builder (see create_pdf(..., vector_text=True)).
+    With output_path=None the page is only returned.
+    """
+    start = time.perf_counter()
+    image_height = int(CANVAS_HEIGHT * IMAGE_RATIO)
+    resized_image = image.resize((CANVAS_WIDTH, image_height))
+
+    if render_text:
+        # Create a new white canvas and paste the illustration in the top portion
+        canvas = Image.new('RGB', (CANVAS_WIDTH, CANVAS_HEIGHT), 'white')
+        canvas.paste(resized_image, (0, 0))
+
+        draw = ImageDraw.Draw(canvas)
+        font = load_font()
+        measure = lambda s: draw.textlength(s, font=font)
+
+        for line, x, y in layout_text(text, measure, font.size):
+            # Draw text with a slight shadow effect for better readability
+            draw.text((x + SHADOW_OFFSET, y + SHADOW_OFFSET), line, font=font, fill='grey')
+            draw.text((x, y), line, font=font, fill='black')
+    else:
+        canvas = resized_image.convert('RGB')
+    METRICS.observe("pagepainter_compose_seconds", time.perf_counter() - start)
+
+    # Save the final page
+    save_canvas(canvas, output_path)
+    return canvas
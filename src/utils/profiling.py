@@ -0,0 +1,166 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Seconds between two samples of the stacks of the threads inside a stage
+SAMPLE_INTERVAL = 0.005
+# Functions listed per stage in the summary
+TOP_FUNCTIONS = 8
+
+
+def frame_label(code):
+    """Name of a function in collapsed stacks: file:function"""
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class Profiler:
+    def __init__(self, output_dir, interval=SAMPLE_INTERVAL, torch_ops=False):
+        """cProfile statistics and sampled stacks per stage of a generation (cover, illustration, page, pdf)
+
+        Every stage runs under its own cProfile, merged per stage name, so the
+        summary tells the time spent in e.g. the UNet, PIL resizing, text
+        measuring or PNG compression apart by stage. A sampling thread records
+        the stacks of the threads inside a stage every interval seconds, which
+        report() writes as collapsed stacks (stage;outer;...;inner count, the
+        input of flamegraph.pl and speedscope). With torch_ops the PyTorch
+        profiler records the operators of the diffusion pipeline as well.
+        Encoder processes of an EncoderPool are not profiled.
+        """
+        self.output_dir = output_dir
+        self.interval = interval
+        self.torch_ops = torch_ops
+        self.stats = {}
+        self.seconds = Counter()
+        self.counts = Counter()
+        self.samples = Counter()
+        # Stage each thread is in, by thread id
+        self.active = {}
+        self.lock = threading.Lock()
+        self.sampler = None
+        self.torch_profile = None
+
+    def _start(self):
+        if self.sampler is None:
+            self.sampler = threading.Thread(target=self._sample, name="profiler", daemon=True)
+            self.sampler.start()
+        if self.torch_ops and self.torch_profile is None:
+            try:
+                import torch.profiler
+            except ImportError:
+                print("Warning: torch is not installed, operators are not profiled")
+                self.torch_ops = False
+                return
+            self.torch_profile = torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU])
+            self.torch_profile.__enter__()
+
+    def _sample(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self.lock:
+                active = dict(self.active)
+            for thread_id, stage in active.items():
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                with self.lock:
+                    self.samples[";".join([stage] + stack[::-1])] += 1
+
+    @contextmanager
+    def stage(self, name):
+        """Profile the block as part of the named stage, nested stages count for the outer one"""
+        thread_id = threading.get_ident()
+        with self.lock:
+            self._start()
+            nested = thread_id in self.active
+            if not nested:
+                self.active[thread_id] = name
+        if nested:
+            yield
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one cProfile at a time, this run is only sampled
+            profile = None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            with self.lock:
+                del self.active[thread_id]
+                self.seconds[name] += elapsed
+                self.counts[name] += 1
+                if profile is not None:
+                    if name in self.stats:
+                        self.stats[name].add(profile)
+                    else:
+                        self.stats[name] = pstats.Stats(profile)
+
+    def summary(self, top=TOP_FUNCTIONS):
+        """Text with the time of every stage and its functions with the most own time"""
+        lines = []
+        with self.lock:
+            for name, seconds in self.seconds.items():
+                lines.append(f"{name}: {seconds:.2f}s in {self.counts[name]} run(s)")
+                stats = self.stats.get(name)
+                if stats is None:
+                    continue
+                ranked = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+                for (file_name, line, function), (_, calls, own, cumulative, _) in ranked[:top]:
+                    # Built-in functions have no file
+                    location = f" ({os.path.basename(file_name)}:{line})" if line else ""
+                    lines.append(f"  {own:8.3f}s own {cumulative:8.3f}s total {calls:8d} calls  "
+                                 f"{function}{location}")
+        return "\n".join(lines)
+
+    def report(self):
+        """Write profile.pstats, profile.collapsed and summary.txt to the output directory and print the summary
+
+        The files cover every stage profiled so far, so the report can be
+        written after every book. The torch operator table (torch_ops.txt)
+        and trace (torch_trace.json) cover the stages since the last report.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        with self.lock:
+            merged = pstats.Stats(stream=io.StringIO())
+            for stats in self.stats.values():
+                merged.add(stats)
+            samples = sorted(self.samples.items())
+        merged.dump_stats(os.path.join(self.output_dir, "profile.pstats"))
+        with open(os.path.join(self.output_dir, "profile.collapsed"), 'w', encoding='utf-8') as f:
+            for stack, count in samples:
+                f.write(f"{stack} {count}\n")
+
+        summary = self.summary()
+        with open(os.path.join(self.output_dir, "summary.txt"), 'w', encoding='utf-8') as f:
+            f.write(summary + "\n")
+        print("\nProfile per stage:")
+        print(summary)
+
+        if self.torch_profile is not None:
+            self.torch_profile.__exit__(None, None, None)
+            table = self.torch_profile.key_averages().table(sort_by="self_cpu_time_total", row_limit=20)
+            with open(os.path.join(self.output_dir, "torch_ops.txt"), 'w', encoding='utf-8') as f:
+                f.write(table + "\n")
+            self.torch_profile.export_chrome_trace(os.path.join(self.output_dir, "torch_trace.json"))
+            # Started again by the next stage
+            self.torch_profile = None
+        print(f"Profile written to: {self.output_dir}")
+        return self.output_dir
@@ -0,0 +1,208 @@
+"""Local stand-ins for the OpenAI images API and the Stability gRPC API
+
+They let the real network clients of the DALL-E and DreamStudio backends run
+over real sockets without paid services or network access:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=standin
+    STABILITY_HOST=127.0.0.1:50051 STABILITY_KEY=standin
+
+Both servers can add latency and inject rate limit (429 / RESOURCE_EXHAUSTED)
+and server errors (5xx / UNAVAILABLE) to exercise retries and concurrency.
+"""
+import io
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.backends.page_painter_fake import synthetic_image
+
+
+class FaultInjector:
+    def __init__(self, latency=0.0, jitter=0.0, rate_limit_rate=0.0, error_rate=0.0, seed=0):
+        """Latency and failures shared by the stand-in servers, reproducible for a given seed"""
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.errors = 0
+
+    def next_fault(self):
+        """Wait the simulated latency, then return None, "rate_limit" or "error" for this request"""
+        with self.lock:
+            self.requests += 1
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            roll = self.random.random()
+            if roll < self.rate_limit_rate:
+                fault = "rate_limit"
+                self.rate_limited += 1
+            elif roll < self.rate_limit_rate + self.error_rate:
+                fault = "error"
+                self.errors += 1
+            else:
+                fault = None
+        if delay:
+            time.sleep(delay)
+        return fault
+
+
+@lru_cache(maxsize=64)
+def encoded_image(prompt, width, height):
+    """PNG bytes of the synthetic image for a prompt"""
+    buffer = io.BytesIO()
+    synthetic_image(prompt, {"width": width, "height": height}).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class OpenAIImagesHandler(BaseHTTPRequestHandler):
+    """POST /v1/images/generations like the OpenAI API, and GET /images/<id>.png for the returned URLs"""
+    # Keep-alive connections like the real API, so clients reuse them across requests
+    protocol_version = "HTTP/1.1"
+    faults = None
+    artifact_size = None
+    images = None
+    lock = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message, error_type, headers=None):
+        body = json.dumps({"error": {"message": message, "type": error_type, "code": None}}).encode('utf-8')
+        self.send_body(status, body, "application/json", headers)
+
+    def do_POST(self):
+        if self.path.rstrip('/') not in ("/v1/images/generations", "/images/generations"):
+            self.send_error_json(404, "Not found", "invalid_request_error")
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        fault = self.faults.next_fault()
+        if fault == "rate_limit":
+            self.send_error_json(429, "Rate limit reached", "requests", {"Retry-After": "1"})
+            return
+        if fault == "error":
+            self.send_error_json(500, "The server had an error", "server_error")
+            return
+
+        if self.artifact_size:
+            width, height = self.artifact_size
+        else:
+            width, height = (int(v) for v in request.get("size", "1024x1024").split("x"))
+        prompt = request.get("prompt", "")
+
+        data = []
+        for _ in range(request.get("n", 1)):
+            image_id = uuid.uuid4().hex
+            with self.lock:
+                self.images[image_id] = (prompt, width, height)
+            host, port = self.server.server_address[:2]
+            data.append({"url": f"http://{host}:{port}/images/{image_id}.png", "revised_prompt": prompt})
+        body = json.dumps({"created": int(time.time()), "data": data}).encode('utf-8')
+        self.send_body(200, body, "application/json")
+
+    def do_GET(self):
+        match = re.fullmatch(r"/images/(\w+)\.png", self.path)
+        with self.lock:
+            image = self.images.get(match.group(1)) if match else None
+        if image is None:
+            self.send_error_json(404, "Not found", "invalid_request_error")
+            return
+        self.send_body(200, encoded_image(*image), "image/png")
+
+
+def make_openai_server(faults=None, host="127.0.0.1", port=8765, artifact_size=None):
+    """Create the OpenAI images stand-in; artifact_size=(width, height) overrides the requested size"""
+    handler = type("BoundOpenAIImagesHandler", (OpenAIImagesHandler,), {
+        "faults": faults or FaultInjector(),
+        "artifact_size": artifact_size,
+        "images": {},
+        "lock": threading.Lock(),
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def make_stability_server(faults=None, host="127.0.0.1", port=50051, artifact_size=None, max_workers=16):
+    """Create the Stability generation service stand-in (needs grpcio and stability-sdk)"""
+    from concurrent.futures import ThreadPoolExecutor
+    import grpc
+    import stability_sdk.interfaces.gooseai.generation.generation_pb2 as generation
+    import stability_sdk.interfaces.gooseai.generation.generation_pb2_grpc as generation_grpc
+
+    faults = faults or FaultInjector()
+
+    class GenerationService(generation_grpc.GenerationServiceServicer):
+        def Generate(self, request, context):
+            fault = faults.next_fault()
+            if fault == "rate_limit":
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Rate limit reached")
+            if fault == "error":
+                context.abort(grpc.StatusCode.UNAVAILABLE, "The server had an error")
+
+            width, height = artifact_size or (request.image.width or 512, request.image.height or 512)
+            prompt = " ".join(p.text for p in request.prompt if p.text)
+            seed = request.image.seed[0] if request.image.seed else 0
+            artifacts = [
+                generation.Artifact(
+                    id=index,
+                    type=generation.ARTIFACT_IMAGE,
+                    mime="image/png",
+                    binary=encoded_image(f"{prompt} #{seed + index}", width, height),
+                    seed=seed + index,
+                    finish_reason=generation.NULL,
+                )
+                for index in range(max(request.image.samples, 1))
+            ]
+            yield generation.Answer(
+                answer_id=uuid.uuid4().hex, request_id=request.request_id,
+                created=int(time.time()), artifacts=artifacts,
+            )
+
+    server = grpc.server(ThreadPoolExecutor(max_workers=max_workers))
+    generation_grpc.add_GenerationServiceServicer_to_server(GenerationService(), server)
+    # Port 0 picks a free port, the one bound is kept as server.port
+    server.port = server.add_insecure_port(f"{host}:{port}")
+    return server
+
+
+def run_standins(openai_port=8765, stability_port=50051, host="127.0.0.1", faults=None, artifact_size=None):
+    """Run both stand-ins until interrupted"""
+    faults = faults or FaultInjector()
+    openai_server = make_openai_server(faults, host, openai_port, artifact_size)
+    threading.Thread(target=openai_server.serve_forever, daemon=True).start()
+    print(f"OpenAI images stand-in: OPENAI_BASE_URL=http://{host}:{openai_port}/v1")
+
+    stability_server = None
+    try:
+        stability_server = make_stability_server(faults, host, stability_port, artifact_size)
+        stability_server.start()
+        print(f"Stability stand-in: STABILITY_HOST={host}:{stability_port}")
+    except ImportError:
+        print("Stability stand-in disabled: grpcio and stability-sdk are required")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\nServed {faults.requests} requests "
+              f"({faults.rate_limited} rate limited, {faults.errors} errors)")
+    finally:
+        openai_server.shutdown()
+        if stability_server is not None:
+            stability_server.stop(grace=None)
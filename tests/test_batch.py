@@ -0,0 +1,67 @@
+import unittest
+import os
+import json
+import tempfile
+from PIL import Image
+from src.core.book_generator import BookGenerator
+from src.core.batch import BatchGenerator, load_manifest
+from src.utils.page_layout import compose_page
+
+class StubPagePainter:
+    def generate_illustration(self, description, art_style=None, image_size=None):
+        if description == "broken":
+            raise RuntimeError("generation failed")
+        return Image.new('RGB', (64, 64), 'red')
+
+    def create_page(self, text, image, output_path, render_text=True):
+        return compose_page(text, image, output_path, render_text)
+
+class StubBookCover:
+    def create_cover(self, title, other_info=None, output_path="output/cover.png", art_style=None, image_size=None):
+        Image.new('RGB', (120, 160), 'white').save(output_path)
+
+def make_book(title, descriptions):
+    return {
+        "book_settings": {"art_style": "watercolor"},
+        "cover": {"title": title, "author": "A", "illustrator": "B"},
+        "pages": [{"text": f"Page {d}", "description": d} for d in descriptions],
+    }
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        self.generator = BookGenerator(page_maker=StubPagePainter(), cover_maker=StubBookCover())
+
+    def test_load_manifest(self):
+        os.makedirs("books")
+        with open("books/one.json", 'w', encoding='utf-8') as f:
+            json.dump(make_book("One", ["a"]), f)
+        with open("manifest.jsonl", 'w', encoding='utf-8') as f:
+            f.write('"books/one.json"\n\n')
+            f.write(json.dumps({"path": "books/one.json"}) + "\n")
+            f.write(json.dumps(make_book("Inline", ["b"])) + "\n")
+
+        self.assertEqual([name for name, _ in load_manifest("books")], ["one.json"])
+        books = load_manifest("manifest.jsonl")
+        self.assertEqual([book['cover']['title'] for _, book in books], ["One", "One", "Inline"])
+
+    def test_batch_tracks_each_book(self):
+        with open("manifest.jsonl", 'w', encoding='utf-8') as f:
+            f.write(json.dumps(make_book("Same", ["a", "b", "c"])) + "\n")
+            f.write(json.dumps(make_book("Same", ["d", "broken"])) + "\n")
+
+        progress = BatchGenerator(self.generator, workers=4).run("manifest.jsonl")
+
+        first, second = progress
+        self.assertNotEqual(first.book_dir, second.book_dir)
+        self.assertEqual((first.done, first.failed, first.total), (4, 0, 4))
+        self.assertEqual((second.done, second.failed, second.total), (2, 1, 3))
+        self.assertTrue(os.path.exists(os.path.join(first.book_dir, "03_page.png")))
+        self.assertTrue(os.path.exists(os.path.join(second.book_dir, "00_cover.png")))
+
+if __name__ == '__main__':
+    unittest.main()
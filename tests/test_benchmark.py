@@ -0,0 +1,37 @@
+import unittest
+import json
+import os
+import tempfile
+from src.backends.page_painter_fake import PagePainter
+from src.utils.benchmark import run_benchmarks
+
+class TestBenchmark(unittest.TestCase):
+    def test_fake_backend_is_deterministic(self):
+        first = PagePainter().generate_illustration("a rabbit", "watercolor")
+        second = PagePainter().generate_illustration("a rabbit", "watercolor")
+        self.assertEqual(first.tobytes(), second.tobytes())
+
+        failing = [d for d in map(str, range(200)) if self._fails(PagePainter(failure_rate=0.25), d)]
+        self.assertEqual(failing, [d for d in map(str, range(200)) if self._fails(PagePainter(failure_rate=0.25), d)])
+        self.assertTrue(20 < len(failing) < 80)
+
+    def _fails(self, painter, description):
+        try:
+            painter.generate_illustration(description)
+            return False
+        except RuntimeError:
+            return True
+
+    def test_results_are_saved_as_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output_path = os.path.join(tmp, "bench.json")
+            report = run_benchmarks(sizes=(2,), repeat=1, output_path=output_path)
+            with open(output_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        self.assertEqual(saved, report)
+        for name in ["wrap_text", "create_page", "cover", "create_pdf[2]", "create_pdf_vector[2]", "book[2]"]:
+            self.assertIn("median", saved["results"][name])
+        self.assertEqual(saved["results"]["book[2]"]["failed"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
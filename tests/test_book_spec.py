@@ -0,0 +1,85 @@
+import unittest
+import itertools
+import json
+import os
+import tempfile
+from src.backends.page_painter_fake import PagePainter
+from src.core.batch import load_manifest
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import BookGenerator
+from src.utils.book_io import load_book
+from src.utils.book_spec import DEFAULT_STYLE, BookSpec, BookSpecError, cover_spec
+
+BOOK = {
+    "book_settings": {"art_style": "watercolor", "image_size": {"width": 256, "height": 256}},
+    "cover": {"title": "Spec", "author": "A", "illustrator": "B", "style_override": None},
+    "pages": [
+        {"text": "One", "description": "a fox", "style_override": None},
+        {"text": "Two", "description": "a fox", "style_override": "pencil sketch", "seed": 7},
+        {"text": "Three", "description": "a fox"},
+    ],
+}
+
+class TestBookSpec(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def test_resolves_styles_prompts_and_keys(self):
+        spec = BookSpec.from_dict(BOOK)
+        first, second, third = spec.pages
+        # A null style_override falls back to the book style
+        self.assertEqual(first.art_style, "watercolor")
+        self.assertEqual(spec.cover.art_style, "watercolor")
+        self.assertEqual(second.prompt, "pencil sketch, a fox")
+        self.assertEqual((second.seed, second.index), (7, 2))
+        self.assertEqual(first.key, third.key)
+        self.assertNotEqual(first.key, second.key)
+        self.assertEqual(BookSpec.from_dict({"cover": BOOK["cover"], "pages": []}).art_style, DEFAULT_STYLE)
+
+    def test_precise_errors(self):
+        invalid = [
+            ({**BOOK, "pages": [{"text": "One"}]}, "pages[0].description"),
+            ({**BOOK, "pages": [BOOK["pages"][0], {"text": "x", "description": "y", "seed": -1}]}, "pages[1].seed"),
+            ({**BOOK, "cover": {"title": "T", "author": "A"}}, "cover.illustrator"),
+            ({**BOOK, "book_settings": {"image_size": {"width": 0, "height": 8}}}, "book_settings.image_size.width"),
+            ({**BOOK, "pages": {"text": "x"}}, "pages"),
+        ]
+        for book_data, where in invalid:
+            with self.assertRaises(BookSpecError) as raised:
+                BookSpec.from_dict(book_data)
+            self.assertEqual(raised.exception.where, where)
+        # Covers of work queue tasks have no pages
+        self.assertEqual(cover_spec({"cover": BOOK["cover"]}).title, "Spec")
+
+    def test_jsonl_pages_are_compiled_lazily(self):
+        path = os.path.join(self.tmp, "book.jsonl")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({key: value for key, value in BOOK.items() if key != 'pages'}) + "\n")
+            for page in BOOK["pages"] + [{"text": "Four"}]:
+                f.write(json.dumps(page) + "\n")
+        with self.assertRaises(BookSpecError) as raised:
+            BookSpec.from_dict(load_book(path))
+        self.assertEqual(raised.exception.where, "pages[3].description")
+        spec = BookSpec.from_dict(load_book(path), validate=False)
+        self.assertEqual(len(spec), 4)
+        # Pages are checked as they are reached
+        self.assertEqual([page.text for page in itertools.islice(spec.pages, 3)], ["One", "Two", "Three"])
+
+    def test_invalid_books_fail_before_generation(self):
+        generator = BookGenerator(backend="fake", page_maker=PagePainter(), cover_maker=BookCover(),
+                                  output_dir=self.tmp)
+        with self.assertRaises(BookSpecError):
+            generator.build_book({**BOOK, "pages": [{"description": "no text"}]})
+        self.assertEqual(os.listdir(self.tmp), [])
+
+        manifest = os.path.join(self.tmp, "batch.jsonl")
+        with open(manifest, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(BOOK) + "\n" + json.dumps({**BOOK, "cover": {}}) + "\n")
+        with self.assertRaises(BookSpecError) as raised:
+            load_manifest(manifest)
+        self.assertEqual(raised.exception.where, f"{manifest}:2: cover.title")
+
+if __name__ == '__main__':
+    unittest.main()
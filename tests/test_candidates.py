@@ -0,0 +1,69 @@
+import unittest
+import os
+import tempfile
+from PIL import Image
+from src.backends.page_painter_fake import PagePainter, synthetic_image
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import BookGenerator
+from src.core.illustration_cache import IllustrationCache
+from src.utils.image_scoring import image_score, pick_best
+
+BOOK = {
+    "book_settings": {"art_style": "watercolor"},
+    "cover": {"title": "Candidates", "author": "A", "illustrator": "B"},
+    "pages": [{"text": f"Page {i}", "description": f"scene {i}"} for i in range(1, 4)],
+}
+
+class BlankFirstPagePainter(PagePainter):
+    def generate_candidates(self, description, art_style=None, image_size=None, samples=4):
+        candidates = super().generate_candidates(description, art_style, image_size, samples)
+        return [Image.new('RGB', candidates[0].size, 'black')] + candidates[1:]
+
+class TestCandidates(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def test_blank_and_filtered_images_score_zero(self):
+        self.assertEqual(image_score(Image.new('RGB', (64, 64), 'white')), 0)
+        filtered = synthetic_image("scene")
+        filtered.info['filtered'] = True
+        self.assertEqual(image_score(filtered), 0)
+        self.assertGreater(image_score(synthetic_image("scene")), 0)
+
+    def test_pick_best_with_scorer(self):
+        blank = Image.new('RGB', (64, 64), 'white')
+        images = [blank, synthetic_image("a"), synthetic_image("b")]
+        # The scorer decides among usable candidates, blank ones stay last
+        best, others = pick_best(images, scorer=lambda image: -image_score(image))
+        self.assertIs(others[-1], blank)
+        self.assertLessEqual(image_score(best), image_score(others[0]))
+
+    def test_book_keeps_best_candidate_and_caches_the_rest(self):
+        painter = BlankFirstPagePainter()
+        cache = IllustrationCache(os.path.join(self.tmp, "cache"))
+        generator = BookGenerator(
+            backend="fake", page_maker=painter, cover_maker=BookCover(), output_dir=self.tmp,
+            samples=3, cache=cache
+        )
+        generator.build_book(BOOK)
+
+        # One request per page
+        self.assertEqual(painter.calls, 3)
+        key_files = [name for _, _, names in os.walk(cache.directory) for name in names]
+        self.assertEqual(len(key_files), 9)
+        for _, _, names in os.walk(cache.directory):
+            for name in names:
+                if name.endswith("_0.png"):
+                    self.assertGreater(image_score(Image.open(os.path.join(cache.directory, name[:2], name))), 0)
+
+        # A second book with the same pages comes from the cache
+        again = BlankFirstPagePainter()
+        BookGenerator(
+            backend="fake", page_maker=again, cover_maker=BookCover(), output_dir=self.tmp, samples=3, cache=cache
+        ).build_book(BOOK)
+        self.assertEqual(again.calls, 0)
+
+if __name__ == '__main__':
+    unittest.main()
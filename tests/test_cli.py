@@ -0,0 +1,58 @@
+import unittest
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from src.backends.page_painter_fake import PagePainter
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import BookGenerator
+from src.cli import build_parser, main
+
+BOOK = {
+    "book_settings": {"art_style": "watercolor"},
+    "cover": {"title": "Command Line", "author": "A", "illustrator": "B"},
+    "pages": [{"text": f"Page {i}", "description": f"scene {i}"} for i in range(1, 3)],
+}
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.book_json = os.path.join(self.tmp, "book.json")
+        with open(self.book_json, 'w', encoding='utf-8') as f:
+            json.dump(BOOK, f)
+
+    def test_cover_and_pdf(self):
+        cover_dir = os.path.join(self.tmp, "cover")
+        self.assertEqual(main(["cover", self.book_json, "--backend", "fake", "--output-dir", cover_dir]), 0)
+        self.assertTrue(os.path.exists(os.path.join(cover_dir, "cover.png")))
+
+        book_dir = BookGenerator(
+            backend="fake", page_maker=PagePainter(), cover_maker=BookCover(), output_dir=self.tmp
+        ).build_book(BOOK)
+        self.assertEqual(main(["pdf", self.book_json, book_dir, "--output-dir", book_dir]), 0)
+        self.assertTrue(os.path.exists(os.path.join(book_dir, "Command Line.pdf")))
+
+    def test_missing_book(self):
+        self.assertEqual(main(["pdf", os.path.join(self.tmp, "missing.json"), self.tmp]), 1)
+
+    def test_subcommands(self):
+        parser = build_parser()
+        args = parser.parse_args(["generate", "book.json", "--backend", "dalle,opensource", "--samples", "4"])
+        self.assertEqual((args.command, args.backend, args.samples), ("generate", "dalle,opensource", 4))
+        self.assertEqual(parser.parse_args(["preview", "dir", "--promote"]).promote, True)
+        self.assertEqual(parser.parse_args(["bench", "--sizes", "10"]).sizes, [10])
+        args = parser.parse_args(["serve", "--backend", "fake", "--port", "0", "--workers", "2"])
+        self.assertEqual((args.backend, args.host, args.port, args.workers), ("fake", "127.0.0.1", 0, 2))
+
+    def test_imports_are_lazy(self):
+        code = ("import sys; from src.cli import build_parser; build_parser(); "
+                "print(sorted(name for name in ('PIL', 'openai', 'torch', 'reportlab') if name in sys.modules))")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+if __name__ == '__main__':
+    unittest.main()
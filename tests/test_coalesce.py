@@ -0,0 +1,76 @@
+import unittest
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.backends.page_painter_fake import PagePainter
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import BookGenerator
+from src.core.coalesce import CoalescingIllustrator, SingleFlight
+
+class TestCoalesce(unittest.TestCase):
+    def test_single_flight_shares_concurrent_calls(self):
+        calls = []
+        release = threading.Event()
+
+        def slow(value):
+            calls.append(value)
+            release.wait(5)
+            return value * 2
+
+        flight = SingleFlight()
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(flight.do, "key", slow, 21) for _ in range(4)]
+            time.sleep(0.1)
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(results, [42] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.calls, {})
+
+    def test_single_flight_shares_errors(self):
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            SingleFlight().do("key", fail)
+
+    def test_planned_illustrations_are_generated_once_and_released(self):
+        generated = []
+        illustrator = CoalescingIllustrator(lambda prompt: generated.append(prompt) or prompt.upper())
+        illustrator.plan(["a", "b", "a", "a"])
+
+        results = [illustrator(key, key) for key in ["a", "b", "a", "a"]]
+
+        self.assertEqual(results, ["A", "B", "A", "A"])
+        self.assertEqual(generated, ["a", "b"])
+        self.assertEqual(illustrator.reused, 2)
+        # Nothing is kept once the last planned page is done
+        self.assertEqual(illustrator.results, {})
+        self.assertEqual(illustrator.planned, {})
+
+    def test_book_with_repeated_scenes(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        painter = PagePainter()
+        generator = BookGenerator(page_maker=painter, cover_maker=BookCover(), output_dir=tmp.name)
+        book = {
+            "book_settings": {"art_style": "watercolor"},
+            "cover": {"title": "Repeats", "author": "A", "illustrator": "B"},
+            "pages": [
+                {"text": "One", "description": "the nest"},
+                {"text": "Two", "description": "the sky"},
+                {"text": "Three", "description": "the nest"},
+                {"text": "Four", "description": "the nest", "style_override": "pastel"},
+            ],
+        }
+
+        book_dir = generator.build_book(book)
+
+        self.assertEqual(painter.calls, 3)
+        self.assertEqual(len(os.listdir(book_dir)), 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+from src.backends.page_painter_fake import PagePainter
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import BookGenerator
+from src.utils.content_store import ContentStore
+
+BOOK = {
+    "book_settings": {"art_style": "watercolor"},
+    "cover": {"title": "Stored", "author": "A", "illustrator": "B"},
+    "pages": [{"text": f"Page {i}", "description": f"scene {i}"} for i in range(1, 4)],
+}
+
+class TestContentStore(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.store = ContentStore(os.path.join(self.tmp, "store"))
+
+    def build(self, **options):
+        generator = BookGenerator(
+            backend="fake", page_maker=PagePainter(), cover_maker=BookCover(),
+            output_dir=os.path.join(self.tmp, "books"), store=self.store, **options
+        )
+        return generator.build_book(BOOK)
+
+    def test_repeated_builds_share_files(self):
+        with mock.patch.object(self.store, '_write_blob', wraps=self.store._write_blob) as write_blob:
+            first = self.build()
+            self.assertEqual(write_blob.call_count, 4)
+            # Unchanged images of a repeated build are hashed in memory and only linked
+            second = self.build()
+            self.assertEqual(write_blob.call_count, 4)
+
+        self.assertEqual(len(list(self.store.blobs())), 4)
+        for name in ("00_cover.png", "01_page.png", "03_page.png"):
+            self.assertTrue(os.path.samefile(os.path.join(first, name), os.path.join(second, name)))
+
+    def test_encoded_pages_are_stored(self):
+        first = self.build(encoding="webp:80", encoders=0)
+        second = self.build(encoding="webp:80", encoders=0)
+        self.assertEqual(len(list(self.store.blobs())), 4)
+        self.assertTrue(os.path.samefile(os.path.join(first, "02_page.webp"), os.path.join(second, "02_page.webp")))
+
+    def test_regenerated_page_leaves_stored_blob_alone(self):
+        first = self.build()
+        second = self.build()
+        blob_sizes = {blob: os.path.getsize(blob) for blob in self.store.blobs()}
+
+        generator = BookGenerator(
+            backend="fake", page_maker=PagePainter(), cover_maker=BookCover(), output_dir=self.tmp, store=self.store
+        )
+        task = generator.page_tasks(BOOK, second)[0]
+        task['description'] = "another scene"
+        generator.generate_page(task)
+
+        self.assertFalse(os.path.samefile(os.path.join(first, "01_page.png"), os.path.join(second, "01_page.png")))
+        for blob, size in blob_sizes.items():
+            self.assertEqual(os.path.getsize(blob), size)
+
+    def test_gc_removes_unreferenced_blobs(self):
+        first = self.build()
+        second = self.build()
+
+        shutil.rmtree(first)
+        self.assertEqual(self.store.gc()[0], 0)
+        shutil.rmtree(second)
+        count, size = self.store.gc(dry_run=True)
+        self.assertEqual(count, 4)
+        self.assertGreater(size, 0)
+        self.assertEqual(len(list(self.store.blobs())), 4)
+        self.store.gc()
+        self.assertEqual(list(self.store.blobs()), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from src.backends.page_painter_fake import PagePainter
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import BookGenerator
+
+BOOK = {
+    "book_settings": {"art_style": "watercolor"},
+    "cover": {"title": "Continued", "author": "A", "illustrator": "B"},
+    "pages": [{"text": f"Page {i}", "description": f"scene {i}"} for i in range(1, 6)],
+}
+
+class RecordingPagePainter(PagePainter):
+    def __init__(self):
+        super().__init__()
+        self.continued = []
+
+    def continue_illustration(self, image, description, art_style=None, image_size=None, strength=0.5, seed=None):
+        self.continued.append((description, strength))
+        return super().continue_illustration(image, description, art_style, image_size, strength, seed)
+
+class TestContinuation(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def generator(self, painter, strength):
+        return BookGenerator(
+            backend="fake", page_maker=painter, cover_maker=BookCover(), output_dir=self.tmp, strength=strength
+        )
+
+    def test_pages_continue_from_previous_page(self):
+        painter = RecordingPagePainter()
+        self.generator(painter, 0.4).build_book(BOOK)
+
+        self.assertEqual(painter.continued, [(f"scene {i}", 0.4) for i in range(2, 6)])
+        self.assertEqual(painter.calls, 5)
+
+    def test_continuation_on_worker_pool(self):
+        painter = RecordingPagePainter()
+        generator = self.generator(painter, 0.5)
+        book_dir = generator.create_book_directory("Continued")
+        tasks = generator.page_tasks(BOOK, book_dir)
+        generator.plan_pages(tasks)
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            paths = list(pool.map(generator.generate_page, tasks))
+
+        self.assertEqual(len(paths), 5)
+        self.assertEqual(len(painter.continued), 4)
+        self.assertEqual(generator.continuations, {})
+
+    def test_failed_page_restarts_from_noise(self):
+        painter = RecordingPagePainter()
+        generator = self.generator(painter, 0.5)
+        book_dir = generator.create_book_directory("Continued")
+        tasks = generator.page_tasks(BOOK, book_dir)
+        generator.plan_pages(tasks)
+        painter.failure_rate = 1.0
+        with self.assertRaises(RuntimeError):
+            generator.generate_page(tasks[0])
+        painter.failure_rate = 0.0
+        generator.generate_page(tasks[1])
+
+        self.assertEqual(painter.continued, [])
+
+if __name__ == '__main__':
+    unittest.main()
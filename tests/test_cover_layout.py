@@ -0,0 +1,61 @@
+import unittest
+import os
+import tempfile
+import time
+from PIL import Image, ImageChops
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import make_cover_variants
+from src.utils.cover_layout import TEMPLATES, layout_cover, render_cover
+from src.backends.page_painter_fake import synthetic_image
+
+BOOK = {
+    "book_settings": {"art_style": "watercolor"},
+    "cover": {"title": "The Very Long Adventures of the Little Owl Family in the Old Oak Tree",
+              "author": "A", "illustrator": "B"},
+    "pages": [],
+}
+
+class TestCoverLayout(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def test_long_titles_fit_every_template(self):
+        title = BOOK["cover"]["title"]
+        for template in TEMPLATES.values():
+            positions = sorted(layout_cover(template, title, ("Written by A", "Illustrated by B"), "2026"),
+                               key=lambda position: position[2])
+            self.assertGreater(len([p for p in positions if p[0] in title]), 1, template.name)
+            for (line, x, y, size, _), following in zip(positions, positions[1:] + [None]):
+                self.assertGreaterEqual(x, template.margin - 1, template.name)
+                # Lines are wrapped or set smaller rather than drawn over each other
+                if following is not None:
+                    self.assertLessEqual(y + size, following[2], f"{template.name}: {line}")
+
+    def test_layout_is_measured_once(self):
+        image = synthetic_image("art")
+        render_cover(image, "Cached Title", ["Written by A"], "storybook")
+        hits = layout_cover.cache_info().hits
+        canvas = render_cover(synthetic_image("other art"), "Cached Title", ["Written by A"], "storybook")
+        self.assertEqual(layout_cover.cache_info().hits, hits + 1)
+        self.assertEqual(canvas.size, (1200, 1600))
+
+    def test_variants_share_typography_in_parallel(self):
+        cover_maker = BookCover(latency=0.3)
+        paths = [os.path.join(self.tmp, f"cover_{i}.png") for i in range(1, 5)]
+        start = time.perf_counter()
+        make_cover_variants(cover_maker, BOOK, paths)
+        # Four illustrations of 0.3s each
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(cover_maker.calls, 4)
+
+        covers = [Image.open(path).convert('RGB') for path in paths]
+        art_height = int(1600 * TEMPLATES["classic"].art_ratio)
+        art = [cover.crop((0, 0, 1200, art_height)) for cover in covers]
+        text = [cover.crop((0, art_height, 1200, 1600)) for cover in covers]
+        self.assertIsNotNone(ImageChops.difference(art[0], art[1]).getbbox())
+        self.assertIsNone(ImageChops.difference(text[0], text[3]).getbbox())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import importlib.util
+import io
+import os
+import tempfile
+from unittest import mock
+from src.backends.page_painter_fake import PagePainter, synthetic_image
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import BookGenerator
+from src.core.illustration_cache import IllustrationCache
+from src.utils.encoded_images import decode_all, encoded_bytes, open_encoded
+from src.utils.standin_servers import FaultInjector, make_stability_server
+
+def png_bytes(prompt):
+    buffer = io.BytesIO()
+    synthetic_image(prompt, {"width": 96, "height": 128}).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+class TestEncodedImages(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def test_open_is_lazy(self):
+        data = png_bytes("a fox")
+        image = open_encoded(data)
+        self.assertEqual(image.size, (96, 128))
+        self.assertIsNotNone(image.fp)
+        self.assertEqual(bytes(encoded_bytes(image)), data)
+        self.assertIsNone(encoded_bytes(image, "JPEG"))
+
+    def test_cache_writes_the_original_bytes(self):
+        data = png_bytes("a fox")
+        cache = IllustrationCache(self.tmp)
+        cache.put("abcd", [open_encoded(data)])
+        with open(cache.path("abcd"), 'rb') as f:
+            self.assertEqual(f.read(), data)
+        # Decoded images without encoded bytes are still saved as PNG
+        cache.put("abce", [synthetic_image("a fox")])
+        self.assertEqual(cache.get("abce").size, synthetic_image("a fox").size)
+
+    def test_cache_is_written_before_decoding(self):
+        class EncodedPagePainter(PagePainter):
+            def generate_illustration(self, description, art_style=None, image_size=None):
+                return open_encoded(png_bytes(description))
+
+        cache = IllustrationCache(self.tmp)
+        decoded_at_put = []
+        put = cache.put
+
+        def checked_put(key, images):
+            decoded_at_put.append(images[0].fp is None)
+            put(key, images)
+
+        generator = BookGenerator(page_maker=EncodedPagePainter(), cover_maker=BookCover(), output_dir=self.tmp,
+                                  cache=cache)
+        with mock.patch.object(cache, 'put', side_effect=checked_put):
+            image = generator._generate_illustration("a fox", "watercolor", {"width": 96, "height": 128})
+        # The pixels and the encoded bytes are not held at the same time
+        self.assertEqual(decoded_at_put, [False])
+        self.assertIsNone(image.fp)
+        self.assertNotIn('encoded', image.info)
+
+    def test_decode_all(self):
+        images = [open_encoded(png_bytes(f"scene {i}")) for i in range(4)]
+        self.assertIs(decode_all(images), images)
+        for image in images:
+            self.assertIsNone(image.fp)
+            self.assertEqual(image.getpixel((0, 0)), image.getpixel((0, 0)))
+
+@unittest.skipUnless(importlib.util.find_spec("stability_sdk"), "stability-sdk is not installed")
+class TestStabilityPassthrough(unittest.TestCase):
+    def test_artifact_bytes_reach_the_cache(self):
+        server = make_stability_server(FaultInjector(), port=0)
+        server.start()
+        self.addCleanup(server.stop, None)
+
+        from src.backends.page_painter_dreamstudio import PagePainter
+        with mock.patch.dict(os.environ, {"STABILITY_HOST": f"127.0.0.1:{server.port}", "STABILITY_KEY": "standin"}):
+            painter = PagePainter()
+        image = painter.generate_illustration("a rabbit", "watercolor", {"width": 96, "height": 128})
+        self.assertIsNotNone(image.fp)
+        data = bytes(encoded_bytes(image))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = IllustrationCache(tmp)
+            cache.put("abcd", [image])
+            with open(cache.path("abcd"), 'rb') as f:
+                self.assertEqual(f.read(), data)
+
+        from src.core.book_cover_dreamstudio import BookCover as DreamStudioBookCover
+        with mock.patch.dict(os.environ, {"STABILITY_HOST": f"127.0.0.1:{server.port}", "STABILITY_KEY": "standin"}):
+            cover_maker = DreamStudioBookCover()
+        # Covers are opened lazily with their bytes like pages
+        cover = cover_maker.generate_cover_image("A Rabbit", "watercolor", {"width": 96, "height": 128})
+        self.assertIsNotNone(cover.fp)
+        self.assertIsNotNone(encoded_bytes(cover))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import os
+import tempfile
+import time
+from src.backends.page_painter_fake import PagePainter
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import BookGenerator, load_backend
+from src.core.failover import BackendChain, CircuitBreaker
+from src.core.state import StateStore
+
+BOOK = {
+    "book_settings": {"art_style": "watercolor"},
+    "cover": {"title": "Failover", "author": "A", "illustrator": "B"},
+    "pages": [{"text": f"Page {i}", "description": f"scene {i}"} for i in range(1, 7)],
+}
+
+class SlowPagePainter(PagePainter):
+    def generate_illustration(self, description, art_style=None, image_size=None):
+        image = super().generate_illustration(description, art_style, image_size)
+        time.sleep(0.05)
+        return image
+
+class TestFailover(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def test_breaker_opens_and_recovers(self):
+        breaker = CircuitBreaker("dalle", failure_threshold=2, reset_timeout=0.1)
+        breaker.record_failure("boom")
+        self.assertTrue(breaker.allow())
+        breaker.record_failure("boom")
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.15)
+        # A single trial call after the timeout
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success(0.01)
+        self.assertEqual(breaker.state, "closed")
+
+    def test_chain_routes_around_failing_backend(self):
+        failing = PagePainter(failure_rate=1.0)
+        healthy = PagePainter()
+        chain = BackendChain([("dalle", failing), ("fake", healthy)], failure_threshold=2)
+        state = StateStore(os.path.join(self.tmp, "state.db"))
+        self.addCleanup(state.close)
+        generator = BookGenerator(
+            backend="dalle,fake", page_maker=chain, cover_maker=BookCover(), output_dir=self.tmp, state=state
+        )
+        generator.build_book(BOOK)
+
+        # After two failures the open circuit keeps the remaining pages away from the failing backend
+        self.assertEqual(failing.calls, 2)
+        self.assertEqual(healthy.calls, 6)
+        self.assertEqual(chain.produced["fake"], 6)
+        job = state.jobs()[0]
+        self.assertEqual(job['status'], 'done')
+        backends = [page['backend'] for page in state.pages(job['id'])]
+        self.assertEqual(backends, ["dalle"] + ["fake"] * 6)
+
+    def test_slow_backend_trips_breaker(self):
+        slow = SlowPagePainter()
+        fallback = PagePainter()
+        chain = BackendChain([("slow", slow), ("fake", fallback)], failure_threshold=1, latency_threshold=0.01)
+        first = chain.generate_illustration("scene 1", "watercolor")
+        second = chain.generate_illustration("scene 2", "watercolor")
+
+        self.assertEqual(first.info['backend'], "slow")
+        self.assertEqual(second.info['backend'], "fake")
+        self.assertEqual(slow.calls, 1)
+
+    def test_all_backends_failing(self):
+        chain = BackendChain([("a", PagePainter(failure_rate=1.0)), ("b", PagePainter(failure_rate=1.0))])
+        with self.assertRaises(ValueError):
+            chain.generate_illustration("scene 1")
+
+    def test_load_backend_chain(self):
+        page_maker, cover_maker = load_backend("fake,fake")
+        self.assertIsInstance(page_maker, BackendChain)
+        self.assertIsInstance(cover_maker, BookCover)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+import json
+import os
+import tempfile
+import time
+from PIL import Image
+from src.backends.page_painter_fake import PagePainter, synthetic_image
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import BookGenerator
+from src.utils.create_pdf import create_pdf
+from src.utils.image_encoding import EncoderPool, ImageEncoding, parse_encoding
+from src.core.state import StateStore
+
+BOOK = {
+    "book_settings": {"art_style": "watercolor"},
+    "cover": {"title": "Encodings", "author": "A", "illustrator": "B"},
+    "pages": [{"text": f"Page {i}", "description": f"scene {i}"} for i in range(1, 4)],
+}
+
+class SlowEncoding(ImageEncoding):
+    def save(self, image, output_path):
+        time.sleep(0.5)
+        return super().save(image, output_path)
+
+class ProgressPagePainter(PagePainter):
+    """Waits at one scene until the pages before it are recorded as done"""
+    def __init__(self, state, wait_on):
+        super().__init__()
+        self.state = state
+        self.wait_on = wait_on
+        self.done_before = None
+
+    def generate_illustration(self, description, art_style=None, image_size=None, seed=None, preview=False):
+        if description == self.wait_on:
+            job_id = self.state.jobs()[0]['id']
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline:
+                pages = self.state.pages(job_id)
+                self.done_before = [page['page_index'] for page in pages if page['status'] == 'done']
+                if len(self.done_before) == int(self.wait_on.split()[1]):
+                    break
+                time.sleep(0.05)
+        return super().generate_illustration(description, art_style, image_size, seed, preview)
+
+class TestImageEncoding(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def test_parse_encoding(self):
+        encoding = parse_encoding("webp:80")
+        self.assertEqual((encoding.format, encoding.level, encoding.extension), ("webp", 80, ".webp"))
+        self.assertEqual(str(parse_encoding("png-palette")), "png-palette")
+        with self.assertRaises(ValueError):
+            parse_encoding("gif")
+
+    def test_formats(self):
+        page = PagePainter().create_page("Once upon a time", synthetic_image("a fox"), None)
+        expected = {"png:1": ("PNG", "RGB"), "png-palette": ("PNG", "P"), "webp": ("WEBP", "RGB"),
+                    "webp:80": ("WEBP", "RGB"), "jpeg:85": ("JPEG", "RGB")}
+        for spec, (format, mode) in expected.items():
+            encoding = parse_encoding(spec)
+            path = encoding.save(page, os.path.join(self.tmp, spec.replace(":", "_") + encoding.extension))
+            with Image.open(path) as image:
+                self.assertEqual((image.format, image.mode, image.size), (format, mode, page.size))
+
+    def test_pool_encodes_in_processes(self):
+        pool = EncoderPool("png:1", workers=2)
+        self.addCleanup(pool.shutdown)
+        futures = [pool.submit(synthetic_image(f"scene {i}"), os.path.join(self.tmp, f"{i}.png")) for i in range(4)]
+        for i, future in enumerate(futures):
+            self.assertEqual(future.result(), os.path.join(self.tmp, f"{i}.png"))
+            self.assertTrue(os.path.exists(future.result()))
+
+    def test_book_in_webp(self):
+        generator = BookGenerator(backend="fake", page_maker=PagePainter(), cover_maker=BookCover(),
+                                  output_dir=self.tmp, encoding="webp:80", encoders=2)
+        self.addCleanup(generator.encoder.shutdown)
+        book_dir = generator.build_book(BOOK)
+        self.assertEqual(sorted(os.listdir(book_dir)),
+                         ["00_cover.webp", "01_page.webp", "02_page.webp", "03_page.webp"])
+
+        # The PDF builder finds the images in their encoding
+        book_json = os.path.join(self.tmp, "book.json")
+        with open(book_json, 'w', encoding='utf-8') as f:
+            json.dump(BOOK, f)
+        self.assertTrue(os.path.exists(create_pdf(book_json, book_dir, self.tmp)))
+
+    def test_pages_are_encoded_while_the_next_ones_are_generated(self):
+        state = StateStore(os.path.join(self.tmp, "state.db"))
+        self.addCleanup(state.close)
+        generator = BookGenerator(backend="fake", page_maker=PagePainter(), cover_maker=BookCover(),
+                                  output_dir=self.tmp, encoding=SlowEncoding("png", 1), encoders=2, state=state)
+        self.addCleanup(generator.encoder.shutdown)
+
+        task = generator.page_tasks(BOOK, self.tmp)[0]
+        self.assertEqual(generator.generate_page(task, wait=False), task['output_path'])
+        # Returned before the encoder process is done with the page
+        self.assertFalse(generator.writes[task['output_path']].done())
+        self.assertEqual(generator.wait_writes(), {})
+        self.assertTrue(os.path.exists(task['output_path']))
+        self.assertEqual(generator.writes, {})
+
+        book_dir = generator.build_book(BOOK)
+        self.assertEqual(len(os.listdir(book_dir)), 4)
+        # Pages are recorded as done once they are written
+        job_id = state.jobs()[0]['id']
+        self.assertEqual(state.job(job_id)['status'], 'done')
+        self.assertEqual(state.unfinished_pages(job_id), [])
+
+    def test_pages_are_recorded_while_the_book_is_generated(self):
+        state = StateStore(os.path.join(self.tmp, "state.db"))
+        self.addCleanup(state.close)
+        painter = ProgressPagePainter(state, "scene 6")
+        generator = BookGenerator(backend="fake", page_maker=painter, cover_maker=BookCover(),
+                                  output_dir=self.tmp, encoding="png:1", encoders=1, state=state)
+        self.addCleanup(generator.encoder.shutdown)
+        book = dict(BOOK, pages=[{"text": f"Page {i}", "description": f"scene {i}"} for i in range(1, 13)])
+
+        generator.build_book(book)
+        # The cover and pages 1 to 5 were done before page 6 was generated, not only at the end of the book
+        self.assertEqual(painter.done_before, [0, 1, 2, 3, 4, 5])
+        self.assertEqual(state.unfinished_pages(state.jobs()[0]['id']), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import json
+import os
+import tempfile
+from src.backends.page_painter_fake import PagePainter
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import BookGenerator
+from src.utils.book_io import BookPages, load_book
+from src.utils.create_pdf import create_pdf
+from src.utils.memory import (MemoryMonitor, MemoryPolicy, apply_memory_policy, available_memory,
+                              choose_memory_policy, current_rss, peak_rss)
+
+class TestMemory(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.book_jsonl = os.path.join(self.tmp, "book.jsonl")
+        with open(self.book_jsonl, 'w', encoding='utf-8') as f:
+            header = {"book_settings": {"art_style": "watercolor"},
+                      "cover": {"title": "Activity Book", "author": "A", "illustrator": "B"}}
+            f.write(json.dumps(header) + "\n")
+            for i in range(1, 13):
+                # Every other page repeats a scene, so illustrations are kept for later pages
+                f.write(json.dumps({"text": f"Page {i}", "description": f"scene {i % 2}"}) + "\n")
+
+    def test_rss(self):
+        self.assertGreater(current_rss(), 0)
+        self.assertGreaterEqual(peak_rss(), current_rss() // 2)
+
+    def test_jsonl_pages_are_read_lazily(self):
+        book_data = load_book(self.book_jsonl)
+        self.assertIsInstance(book_data['pages'], BookPages)
+        self.assertEqual(len(book_data['pages']), 12)
+        self.assertEqual(next(iter(book_data['pages']))['text'], "Page 1")
+
+    def test_memory_budget(self):
+        generator = BookGenerator(
+            backend="fake", page_maker=PagePainter(), cover_maker=BookCover(), output_dir=self.tmp,
+            memory_budget=1
+        )
+        book_dir = generator.generate_book(self.book_jsonl)
+
+        self.assertEqual(set(generator.memory.peaks), {"cover", "illustration", "page"})
+        self.assertEqual(generator.memory.counts["page"], 12)
+        # Always over a 1 MB budget, so nothing is kept between pages
+        self.assertEqual(generator.memory.releases, 12)
+        self.assertEqual(generator.illustrator.results, {})
+
+        pdf_path = create_pdf(self.book_jsonl, book_dir, book_dir)
+        self.assertTrue(os.path.exists(pdf_path))
+
+    def test_monitor_without_budget(self):
+        monitor = MemoryMonitor()
+        with monitor.stage("work"):
+            data = bytearray(8 * 1024 * 1024)
+        self.assertGreater(monitor.peaks["work"], len(data))
+        self.assertFalse(monitor.release())
+
+    def test_memory_policy(self):
+        gb = 1024 ** 3
+        small = {"width": 384, "height": 512}
+        large = {"width": 1024, "height": 1024}
+        # Small renders run without the slower savings
+        policy = choose_memory_policy(small, available=8 * gb)
+        self.assertEqual((policy.attention_slicing, policy.vae_slicing, policy.vae_tiling), (None, False, False))
+        self.assertEqual(str(policy), "no slicing")
+        # Print sizes on a small machine slice the attention per head and decode in tiles
+        policy = choose_memory_policy(large, available=4 * gb)
+        self.assertEqual((policy.attention_slicing, policy.vae_tiling), ("max", True))
+        self.assertLessEqual(policy.estimate, 3 * gb)
+        # Several samples are decoded one at a time before resorting to tiles
+        policy = choose_memory_policy({"width": 512, "height": 512}, samples=4, available=3 * gb)
+        self.assertEqual((policy.vae_slicing, policy.vae_tiling), (True, False))
+        self.assertIsNotNone(available_memory())
+        self.assertIsInstance(choose_memory_policy(large), MemoryPolicy)
+
+    def test_apply_memory_policy(self):
+        calls = []
+
+        class Pipeline:
+            def __getattr__(self, name):
+                return lambda *args: calls.append((name,) + args)
+
+        apply_memory_policy(Pipeline(), MemoryPolicy("auto", vae_tiling=True))
+        self.assertEqual(calls, [("enable_attention_slicing", "auto"), ("disable_vae_slicing",),
+                                 ("enable_vae_tiling",)])
+
+if __name__ == '__main__':
+    unittest.main()
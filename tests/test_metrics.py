@@ -0,0 +1,71 @@
+import unittest
+import os
+import tempfile
+from src.backends.page_painter_fake import PagePainter
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import BookGenerator
+from src.core.failover import BackendChain
+from src.utils.book_io import write_book
+from src.utils.create_pdf import create_pdf
+from src.utils.metrics import METRICS, Metrics
+
+BOOK = {
+    "book_settings": {"art_style": "watercolor"},
+    "cover": {"title": "Measured", "author": "A", "illustrator": "B"},
+    "pages": [{"text": f"Page {i}", "description": f"scene {i % 3}"} for i in range(1, 5)],
+}
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        METRICS.reset()
+
+    def test_prometheus_text_format(self):
+        metrics = Metrics()
+        metrics.counter("jobs_total", "Jobs")
+        metrics.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+        metrics.inc("jobs_total", backend='say "hi"')
+        for seconds in (0.05, 0.5, 5):
+            metrics.observe("latency_seconds", seconds)
+
+        lines = metrics.render().splitlines()
+        self.assertIn("# TYPE jobs_total counter", lines)
+        self.assertIn('jobs_total{backend="say \\"hi\\""} 1.0', lines)
+        # Buckets are cumulative
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 2', lines)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 3', lines)
+        self.assertIn("latency_seconds_count 3", lines)
+
+    def test_book_through_failing_backend(self):
+        chain = BackendChain([("dalle", PagePainter(failure_rate=1.0)), ("dreamstudio", PagePainter())],
+                             failure_threshold=2)
+        generator = BookGenerator(backend="dalle,dreamstudio", page_maker=chain, cover_maker=BookCover(),
+                                  output_dir=self.tmp)
+        book_dir = generator.build_book(BOOK)
+        create_pdf(write_book(BOOK, os.path.join(self.tmp, "book.json")), book_dir, book_dir)
+
+        # Three distinct scenes, the fourth page shares the first one's illustration
+        self.assertEqual(METRICS.value("pagepainter_illustrations_total", backend="dreamstudio"), 3)
+        self.assertEqual(METRICS.value("pagepainter_illustration_seconds", backend="dreamstudio"), 3)
+        self.assertEqual(METRICS.value("pagepainter_backend_failures_total", backend="dalle"), 2)
+        self.assertEqual(METRICS.value("pagepainter_circuit_opens_total", backend="dalle"), 1)
+        self.assertEqual(METRICS.value("pagepainter_pages_total", kind="page", status="done"), 4)
+        self.assertEqual(METRICS.value("pagepainter_pages_total", kind="cover", status="done"), 1)
+        self.assertEqual(METRICS.value("pagepainter_stage_seconds", stage="page"), 4)
+        self.assertEqual(METRICS.value("pagepainter_compose_seconds"), 4)
+        self.assertEqual(METRICS.value("pagepainter_encode_seconds", format="png"), 5)
+        self.assertEqual(METRICS.value("pagepainter_pdf_seconds"), 1)
+        self.assertEqual(METRICS.value("pagepainter_books_total", status="done"), 1)
+        # DreamStudio illustrations are estimated at $0.01
+        self.assertAlmostEqual(METRICS.total("pagepainter_book_cost_dollars"), 0.03)
+        self.assertAlmostEqual(METRICS.total("pagepainter_spend_dollars_total"), 0.03)
+
+        path = METRICS.write(os.path.join(self.tmp, "metrics.prom"))
+        with open(path, 'r', encoding='utf-8') as f:
+            self.assertIn('pagepainter_illustrations_total{backend="dreamstudio"} 3.0', f.read())
+
+if __name__ == '__main__':
+    unittest.main()
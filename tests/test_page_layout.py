@@ -0,0 +1,57 @@
+import unittest
+import os
+import json
+import tempfile
+from PIL import Image
+from src.utils.page_layout import (
+    CANVAS_WIDTH, CANVAS_HEIGHT, IMAGE_RATIO, TEXT_MARGIN,
+    compose_page, layout_text, page_filename, wrap_text,
+)
+from src.utils.create_pdf import create_pdf
+
+class TestPageLayout(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_wrap_text(self):
+        # One unit per character
+        lines = wrap_text("aaa bbb ccc dddddddddd e", len, 8)
+        self.assertEqual(lines, ["aaa bbb", "ccc", "dddddddddd", "e"])
+
+    def test_layout_text_is_centered(self):
+        positions = layout_text("one two", lambda s: 10 * len(s), font_size=10)
+        self.assertEqual(len(positions), 1)
+        line, x, y = positions[0]
+        self.assertEqual(line, "one two")
+        self.assertEqual(x, (CANVAS_WIDTH - 70) / 2)
+        image_height = int(CANVAS_HEIGHT * IMAGE_RATIO)
+        self.assertEqual(y, image_height + (CANVAS_HEIGHT - image_height - 12) / 2)
+
+    def test_layout_text_wraps_to_margins(self):
+        positions = layout_text("word " * 100, lambda s: 10 * len(s))
+        for line, x, y in positions:
+            self.assertLessEqual(10 * len(line), CANVAS_WIDTH - 2 * TEXT_MARGIN)
+
+    def test_compose_page_without_text_keeps_illustration_band(self):
+        image = Image.new('RGB', (384, 512), 'blue')
+        output_path = os.path.join(self.tmp.name, page_filename(1, vector_text=True))
+        page = compose_page("Some text", image, output_path, render_text=False)
+        self.assertEqual(page.size, (CANVAS_WIDTH, int(CANVAS_HEIGHT * IMAGE_RATIO)))
+        self.assertTrue(os.path.exists(output_path))
+
+    def test_vector_text_pdf(self):
+        book_json = os.path.join(self.tmp.name, "book.json")
+        with open(book_json, 'w', encoding='utf-8') as f:
+            json.dump({"cover": {"title": "Vector"}, "pages": [{"text": "Era uma vez, uma família"}]}, f)
+        image = Image.new('RGB', (384, 512), 'green')
+        compose_page("", image, os.path.join(self.tmp.name, page_filename(1, True)), render_text=False)
+
+        pdf_path = create_pdf(book_json, self.tmp.name, self.tmp.name, vector_text=True)
+        with open(pdf_path, 'rb') as f:
+            data = f.read()
+        # The font subset is embedded in the document
+        self.assertIn(b"/FontFile2", data)
+
+if __name__ == '__main__':
+    unittest.main()
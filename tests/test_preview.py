@@ -0,0 +1,69 @@
+import unittest
+import json
+import os
+import tempfile
+from PIL import Image
+from src.backends.page_painter_fake import PagePainter
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import SEEDS_FILE, BookGenerator
+from src.utils.create_pdf import create_pdf
+
+BOOK = {
+    "book_settings": {"art_style": "watercolor", "image_size": {"width": 384, "height": 512}},
+    "cover": {"title": "Preview", "author": "A", "illustrator": "B"},
+    "pages": [{"text": f"Page {i}", "description": f"scene {i}"} for i in range(1, 6)],
+}
+
+class SeedRecordingPagePainter(PagePainter):
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def generate_illustration(self, description, art_style=None, image_size=None, seed=None, preview=False):
+        self.requests.append((description, seed, preview))
+        return super().generate_illustration(description, art_style, image_size, seed, preview)
+
+class TestPreview(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def test_preview_and_promote_share_seeds(self):
+        painter = SeedRecordingPagePainter()
+        preview = BookGenerator(
+            backend="fake", page_maker=painter, cover_maker=BookCover(), output_dir=self.tmp, preview=True
+        )
+        preview_dir = preview.build_book(BOOK)
+
+        self.assertTrue(os.path.exists(os.path.join(preview_dir, "contact_sheet.png")))
+        self.assertTrue(os.path.exists(os.path.join(preview_dir, "Preview.pdf")))
+        with open(os.path.join(preview_dir, SEEDS_FILE), 'r', encoding='utf-8') as f:
+            seeds = json.load(f)['pages']
+        self.assertEqual(len(set(seeds)), 5)
+        self.assertTrue(all(request[2] for request in painter.requests))
+
+        full_painter = SeedRecordingPagePainter()
+        full = BookGenerator(backend="fake", page_maker=full_painter, cover_maker=BookCover(), output_dir=self.tmp)
+        book_dir = full.promote(preview_dir)
+
+        self.assertEqual([request[1] for request in full_painter.requests], seeds)
+        self.assertFalse(any(request[2] for request in full_painter.requests))
+        self.assertTrue(os.path.exists(os.path.join(book_dir, "05_page.png")))
+
+    def test_preview_pdf_is_smaller(self):
+        preview = BookGenerator(
+            backend="fake", page_maker=PagePainter(), cover_maker=BookCover(), output_dir=self.tmp, preview=True
+        )
+        preview_dir = preview.build_book(BOOK)
+        full_dir = BookGenerator(
+            backend="fake", page_maker=PagePainter(), cover_maker=BookCover(), output_dir=self.tmp
+        ).build_book(BOOK)
+
+        full_pdf = create_pdf(os.path.join(preview_dir, "book.json"), full_dir, full_dir)
+        self.assertLess(os.path.getsize(os.path.join(preview_dir, "Preview.pdf")), os.path.getsize(full_pdf))
+        with Image.open(os.path.join(preview_dir, "contact_sheet.png")) as sheet:
+            self.assertGreater(sheet.width, sheet.height / 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import os
+import pstats
+import tempfile
+from src.backends.page_painter_fake import PagePainter
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import BookGenerator
+from src.utils.benchmark import make_book
+from src.utils.book_io import write_book
+from src.utils.create_pdf import create_pdf
+from src.utils.profiling import Profiler
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def test_stages_of_a_book_and_its_pdf(self):
+        profile_dir = os.path.join(self.tmp, "profile")
+        generator = BookGenerator(backend="fake", page_maker=PagePainter(latency=0.02), cover_maker=BookCover(),
+                                  output_dir=self.tmp, profile=profile_dir)
+        book_json = write_book(make_book(4), os.path.join(self.tmp, "book.json"))
+        book_dir = generator.generate_book(book_json)
+        create_pdf(book_json, book_dir, book_dir, profiler=generator.profiler)
+        generator.profiler.report()
+
+        profiler = generator.profiler
+        self.assertEqual(dict(profiler.counts), {"cover": 1, "illustration": 4, "page": 4, "pdf": 1})
+        functions = {function for _, _, function in pstats.Stats(os.path.join(profile_dir, "profile.pstats")).stats}
+        self.assertIn("create_page", functions)
+        self.assertIn("textlength", functions)
+
+        with open(os.path.join(profile_dir, "profile.collapsed"), 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        # The fake backend sleeps through its latency, so illustrations are sampled
+        self.assertTrue(any(line.startswith("illustration;") for line in lines))
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+        with open(os.path.join(profile_dir, "summary.txt"), 'r', encoding='utf-8') as f:
+            summary = f.read()
+        self.assertIn("page: ", summary)
+        self.assertIn("pdf: ", summary)
+
+    def test_nested_stages_count_once(self):
+        profiler = Profiler(os.path.join(self.tmp, "profile"))
+        with profiler.stage("page"):
+            with profiler.stage("encode"):
+                sum(range(1000))
+        self.assertEqual(dict(profiler.counts), {"page": 1})
+        self.assertEqual(profiler.active, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import json
+import os
+import tempfile
+from src.backends.page_painter_fake import PagePainter
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import BookGenerator
+from src.core.illustration_cache import IllustrationCache
+from src.core.scheduler import Scheduler, plan_pages
+
+PROFILES = {
+    "cpu": {"seconds": 420.0, "price": 0.0, "slots": 1},
+    "cheap": {"seconds": 8.0, "price": 0.01, "slots": 4},
+    "fast": {"seconds": 4.0, "price": 0.04, "slots": 4},
+}
+
+BOOK = {
+    "book_settings": {"art_style": "watercolor"},
+    "cover": {"title": "Scheduled", "author": "A", "illustrator": "B"},
+    "pages": [{"text": f"Page {i}", "description": f"scene {i}"} for i in range(1, 7)],
+}
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def test_plan_uses_free_backends_first(self):
+        self.assertEqual(plan_pages(10, PROFILES), {"cpu": 10, "cheap": 0, "fast": 0})
+        # An hour fits 8 pages on the CPU, the cheapest API makes the rest
+        self.assertEqual(plan_pages(10, PROFILES, time_left=3600), {"cpu": 8, "cheap": 2, "fast": 0})
+        # Pages the budget does not cover stay on the CPU even if they are late
+        self.assertEqual(plan_pages(10, PROFILES, time_left=3600, budget=0.01), {"cpu": 9, "cheap": 1, "fast": 0})
+        # Busy backends take fewer pages
+        self.assertEqual(plan_pages(10, PROFILES, time_left=3600, backlog={"cpu": 1800}),
+                         {"cpu": 4, "cheap": 6, "fast": 0})
+
+    def test_pages_move_when_a_backend_falls_behind(self):
+        latency_file = os.path.join(self.tmp, "latency.json")
+        # The free backend claims to be quick but takes 0.3s a page
+        scheduler = Scheduler(
+            [("slow", PagePainter(latency=0.3)), ("paid", PagePainter())], deadline=1.0,
+            profiles={"slow": {"seconds": 0.05, "price": 0.0, "slots": 1},
+                      "paid": {"seconds": 0.01, "price": 0.01, "slots": 1}},
+            latency_file=latency_file,
+        )
+        generator = BookGenerator(backend="slow,paid", page_maker=scheduler, cover_maker=BookCover(),
+                                  output_dir=self.tmp)
+        generator.build_book(BOOK)
+
+        self.assertGreaterEqual(scheduler.produced["slow"], 1)
+        self.assertGreaterEqual(scheduler.produced["paid"], 1)
+        self.assertEqual(sum(scheduler.produced.values()), 6)
+        self.assertAlmostEqual(scheduler.spent, scheduler.produced["paid"] * 0.01)
+        with open(latency_file, 'r', encoding='utf-8') as f:
+            self.assertGreater(json.load(f)["slow"], 0.05)
+
+    def test_candidates_are_billed_per_image(self):
+        profiles = {"free": {"seconds": 60.0, "price": 0.0, "slots": 1},
+                    "paid": {"seconds": 1.0, "price": 0.01, "slots": 4}}
+        scheduler = Scheduler([("free", PagePainter()), ("paid", PagePainter())], deadline=60, budget=0.08,
+                              profiles=profiles, latency_file=None)
+        # Four candidates a page make a paid page cost $0.04, the budget covers two of them
+        self.assertEqual(scheduler.schedule(10, samples=4), {"free": 8, "paid": 2})
+
+        paid = Scheduler([("dalle", PagePainter())], budget=0.08,
+                         profiles={"dalle": {"seconds": 1.0, "price": 0.04, "slots": 1}}, latency_file=None)
+        # The budget pays for two of the four candidates, then for nothing more
+        self.assertEqual(len(paid.generate_candidates("a fox", samples=4)), 2)
+        self.assertAlmostEqual(paid.spent, 0.08)
+        with self.assertRaises(ValueError):
+            paid.generate_candidates("a hare", samples=4)
+        self.assertAlmostEqual(paid.spent, 0.08)
+        self.assertEqual(paid.reserved, 0)
+
+    def test_cached_pages_leave_the_plan(self):
+        scheduler = Scheduler([("free", PagePainter())], latency_file=None,
+                              profiles={"free": {"seconds": 0.0, "price": 0.0, "slots": 1}})
+        generator = BookGenerator(backend="free", page_maker=scheduler, cover_maker=BookCover(), output_dir=self.tmp,
+                                  cache=IllustrationCache(os.path.join(self.tmp, "cache")))
+        generator.build_book(BOOK)
+        self.assertEqual(scheduler.pending, 0)
+        # Every page of the second build comes from the cache, none of them stays pending for a backend
+        generator.build_book(BOOK)
+        self.assertEqual((scheduler.pending, sum(scheduler.produced.values())), (0, 6))
+        self.assertEqual(generator.scheduled, {})
+
+if __name__ == '__main__':
+    unittest.main()
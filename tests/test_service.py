@@ -0,0 +1,81 @@
+import unittest
+import json
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from src.core.book_generator import BookGenerator
+from src.core.service import GenerationService, make_server
+
+BOOK = {
+    "book_settings": {"art_style": "watercolor"},
+    "cover": {"title": "Served Book", "author": "A", "illustrator": "B"},
+    "pages": [
+        {"text": "First page", "description": "a rabbit"},
+        {"text": "Second page", "description": "a garden"},
+    ],
+}
+
+class TestService(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        generator = BookGenerator(backend="fake", output_dir=tmp.name)
+        self.service = GenerationService(generator, workers=2)
+        self.server = make_server(self.service, port=0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.service.shutdown)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def request(self, path, data=None):
+        body = json.dumps(data).encode('utf-8') if data is not None else None
+        with urllib.request.urlopen(urllib.request.Request(self.url + path, data=body)) as response:
+            return response.status, response.headers["Content-Type"], response.read()
+
+    def test_job_lifecycle(self):
+        status, _, body = self.request("/jobs", BOOK)
+        self.assertEqual(status, 202)
+        job_id = json.loads(body)["id"]
+
+        deadline = time.time() + 30
+        while True:
+            job = json.loads(self.request(f"/jobs/{job_id}")[2])
+            if job["status"] in ("done", "failed") or time.time() > deadline:
+                break
+            time.sleep(0.05)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["progress"], {"done": 3, "failed": 0, "total": 3})
+
+        _, content_type, image = self.request(f"/jobs/{job_id}/pages/2")
+        self.assertEqual(content_type, "image/png")
+        self.assertTrue(image.startswith(b"\x89PNG"))
+        _, content_type, pdf = self.request(f"/jobs/{job_id}/pdf")
+        self.assertTrue(pdf.startswith(b"%PDF"))
+
+        _, content_type, metrics = self.request("/metrics")
+        self.assertTrue(content_type.startswith("text/plain; version=0.0.4"))
+        self.assertIn('pagepainter_pages_total{kind="page",status="done"}', metrics.decode('utf-8'))
+        self.assertIn("pagepainter_pdf_seconds_count", metrics.decode('utf-8'))
+
+    def test_finished_jobs_are_evicted(self):
+        self.service.max_finished = 1
+        jobs = [self.service.submit(BOOK) for _ in range(3)]
+        deadline = time.time() + 30
+        while any(job.finished is None for job in jobs) and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual([job["id"] for job in self.service.list()], [max(jobs, key=lambda job: job.finished).id])
+
+        self.service.job_ttl = 0
+        time.sleep(0.01)
+        self.assertEqual(self.service.list(), [])
+
+    def test_invalid_book_is_rejected(self):
+        with self.assertRaises(urllib.error.HTTPError) as error:
+            self.request("/jobs", {"pages": []})
+        self.assertEqual(error.exception.code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
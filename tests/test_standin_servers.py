@@ -0,0 +1,74 @@
+import unittest
+import asyncio
+import importlib.util
+import io
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from PIL import Image
+from unittest import mock
+from src.utils.standin_servers import FaultInjector, make_openai_server, make_stability_server
+
+class TestOpenAIStandIn(unittest.TestCase):
+    def start(self, faults, artifact_size=None):
+        server = make_openai_server(faults, port=0, artifact_size=artifact_size)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    def generate(self, base_url, size="1024x1024"):
+        body = json.dumps({"model": "dall-e-3", "prompt": "a rabbit", "size": size, "n": 1}).encode('utf-8')
+        request = urllib.request.Request(f"{base_url}/images/generations", data=body,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def test_generate_and_download(self):
+        base_url = self.start(FaultInjector(), artifact_size=(64, 32))
+        url = self.generate(base_url)["data"][0]["url"]
+        with urllib.request.urlopen(url) as response:
+            image = Image.open(io.BytesIO(response.read()))
+        self.assertEqual(image.size, (64, 32))
+
+    def test_fault_injection(self):
+        faults = FaultInjector(rate_limit_rate=0.5, error_rate=0.5, seed=1)
+        base_url = self.start(faults)
+        codes = set()
+        for _ in range(10):
+            with self.assertRaises(urllib.error.HTTPError) as error:
+                self.generate(base_url, "16x16")
+            codes.add(error.exception.code)
+        self.assertEqual(codes, {429, 500})
+        self.assertEqual(faults.requests, 10)
+        self.assertEqual(faults.rate_limited + faults.errors, 10)
+
+@unittest.skipUnless(importlib.util.find_spec("stability_sdk"), "stability-sdk is not installed")
+class TestStabilityStandIn(unittest.TestCase):
+    def test_dreamstudio_backend_over_grpc(self):
+        server = make_stability_server(FaultInjector(), port=0)
+        server.start()
+        self.addCleanup(server.stop, None)
+
+        from src.backends.page_painter_dreamstudio import PagePainter
+        with mock.patch.dict(os.environ, {"STABILITY_HOST": f"127.0.0.1:{server.port}", "STABILITY_KEY": "standin"}):
+            painter = PagePainter()
+        image = painter.generate_illustration("a rabbit", "watercolor", {"width": 96, "height": 128})
+        self.assertEqual(image.size, (96, 128))
+
+        async def generate(seed):
+            image = await painter.agenerate_illustration("a rabbit", "watercolor", {"width": 96, "height": 128},
+                                                         seed=seed, preview=True)
+            await painter.aclose()
+            return image
+
+        # A new event loop and channel per run, the page's seed reaches the service
+        first, second = asyncio.run(generate(7)), asyncio.run(generate(8))
+        self.assertEqual(first.tobytes(), painter.generate_illustration(
+            "a rabbit", "watercolor", {"width": 96, "height": 128}, seed=7).tobytes())
+        self.assertNotEqual(first.tobytes(), second.tobytes())
+
+if __name__ == '__main__':
+    unittest.main()
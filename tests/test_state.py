@@ -0,0 +1,127 @@
+import unittest
+import os
+import tempfile
+from src.backends.page_painter_fake import PagePainter
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import BookGenerator, job_generator
+from src.core.state import StateStore
+from src.utils.book_io import load_book, write_book
+
+BOOK = {
+    "book_settings": {"art_style": "watercolor"},
+    "cover": {"title": "Resumable", "author": "A", "illustrator": "B"},
+    "pages": [{"text": f"Page {i}", "description": f"scene {i}"} for i in range(1, 5)],
+}
+
+class CrashingPagePainter(PagePainter):
+    def __init__(self, crash_on):
+        super().__init__()
+        self.crash_on = crash_on
+
+    def generate_illustration(self, description, art_style=None, image_size=None, seed=None, preview=False):
+        if description == self.crash_on:
+            raise RuntimeError("process killed")
+        return super().generate_illustration(description, art_style, image_size, seed, preview)
+
+class TestStateStore(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.state = StateStore(os.path.join(self.tmp, "state.db"))
+        self.addCleanup(self.state.close)
+
+    def test_wal_mode(self):
+        self.assertEqual(self.state.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_resume_generates_only_unfinished_pages(self):
+        generator = BookGenerator(
+            backend="fake", page_maker=CrashingPagePainter("scene 3"), cover_maker=BookCover(),
+            output_dir=self.tmp, state=self.state
+        )
+        with self.assertRaises(RuntimeError):
+            generator.build_book(BOOK)
+
+        job = self.state.jobs()[0]
+        self.assertEqual(job['status'], 'running')
+        self.assertEqual(self.state.unfinished_pages(job['id']), [3, 4])
+        pages = self.state.pages(job['id'])
+        self.assertEqual(pages[3]['status'], 'failed')
+        self.assertEqual(len({page['inputs_hash'] for page in pages}), 5)
+
+        painter = PagePainter()
+        resumed = BookGenerator(
+            backend="fake", page_maker=painter, cover_maker=BookCover(), output_dir=self.tmp, state=self.state
+        )
+        book_dir = resumed.resume(job['id'])
+
+        self.assertEqual(painter.calls, 2)
+        self.assertEqual(self.state.job(job['id'])['status'], 'done')
+        self.assertTrue(os.path.exists(os.path.join(book_dir, "04_page.png")))
+
+    def test_resume_with_other_settings_fails(self):
+        generator = BookGenerator(
+            backend="fake", page_maker=CrashingPagePainter("scene 3"), cover_maker=BookCover(),
+            output_dir=self.tmp, state=self.state
+        )
+        with self.assertRaises(RuntimeError):
+            generator.build_book(BOOK)
+        job_id = self.state.jobs()[0]['id']
+
+        painter = PagePainter()
+        resumed = BookGenerator(
+            backend="fake", page_maker=painter, cover_maker=BookCover(), output_dir=self.tmp, state=self.state,
+            encoding="webp:80", encoders=0
+        )
+        with self.assertRaises(ValueError) as error:
+            resumed.resume(job_id)
+        self.assertIn("other settings", str(error.exception))
+        self.assertEqual(painter.calls, 0)
+
+    def test_resume_with_recorded_settings(self):
+        generator = BookGenerator(
+            backend="fake", page_maker=CrashingPagePainter("scene 3"), cover_maker=BookCover(),
+            output_dir=self.tmp, state=self.state, encoding="webp:80", encoders=0, preview=True
+        )
+        with self.assertRaises(RuntimeError):
+            generator.build_book(BOOK)
+        job = self.state.job(self.state.jobs()[0]['id'])
+        self.assertEqual((job['settings']['encoding'], job['settings']['preview']), ("webp:80", True))
+
+        resumed = job_generator(job, self.state)
+        self.addCleanup(resumed.encoder.shutdown)
+        book_dir = resumed.resume(job['id'])
+        self.assertEqual(self.state.job(job['id'])['status'], 'done')
+        self.assertTrue(os.path.exists(os.path.join(book_dir, "04_page.webp")))
+
+    def test_jsonl_jobs_keep_pages_in_their_file(self):
+        jsonl_path = write_book(BOOK, os.path.join(self.tmp, "book.jsonl"))
+        generator = BookGenerator(
+            backend="fake", page_maker=CrashingPagePainter("scene 3"), cover_maker=BookCover(),
+            output_dir=self.tmp, state=self.state
+        )
+        with self.assertRaises(RuntimeError):
+            generator.build_book(load_book(jsonl_path))
+        job_id = self.state.jobs()[0]['id']
+
+        spec = self.state.conn.execute("SELECT spec FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        self.assertNotIn("scene 1", spec)
+        self.assertEqual(list(self.state.job(job_id)['spec']['pages']), BOOK['pages'])
+
+        painter = PagePainter()
+        resumed = BookGenerator(
+            backend="fake", page_maker=painter, cover_maker=BookCover(), output_dir=self.tmp, state=self.state
+        )
+        with open(jsonl_path, 'a', encoding='utf-8') as f:
+            f.write('{"text": "Page 5", "description": "scene 5"}\n')
+        with self.assertRaises(ValueError) as error:
+            resumed.resume(job_id)
+        self.assertIn("changed since it started", str(error.exception))
+
+        write_book(BOOK, jsonl_path)
+        resumed.resume(job_id)
+        self.assertEqual(painter.calls, 2)
+        self.assertEqual(self.state.job(job_id)['status'], 'done')
+
+if __name__ == '__main__':
+    unittest.main()
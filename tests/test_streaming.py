@@ -0,0 +1,73 @@
+import unittest
+import json
+import os
+import tempfile
+from src.backends.page_painter_fake import PagePainter
+from src.core.async_book_generator import AsyncBookGenerator
+from src.core.batch import BatchGenerator, iter_manifest
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import BookGenerator
+from src.utils.benchmark import make_book
+from src.utils.book_io import load_book, write_book
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.generator = BookGenerator(backend="fake", page_maker=PagePainter(), cover_maker=BookCover(),
+                                       output_dir=os.path.join(self.tmp, "books"))
+
+    def test_convert_round_trip(self):
+        book = make_book(5)
+        jsonl_path = write_book(book, os.path.join(self.tmp, "book.jsonl"))
+        with open(jsonl_path, 'r', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 6)
+        json_path = write_book(load_book(jsonl_path), os.path.join(self.tmp, "book.json"))
+        with open(json_path, 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f), book)
+
+    def test_plan_reads_page_tasks_once(self):
+        book = make_book(6)
+        book['pages'][3]['description'] = book['pages'][0]['description']
+        consumed = []
+
+        def tasks():
+            for task in self.generator.iter_page_tasks(book, self.tmp):
+                consumed.append(task['output_path'])
+                yield task
+
+        self.generator.plan_pages(tasks())
+        self.assertEqual(len(consumed), 6)
+        # Only the illustration shared by two pages is kept for later
+        self.assertEqual(list(self.generator.illustrator.planned.values()), [2])
+
+    def test_manifest_is_read_lazily(self):
+        manifest = os.path.join(self.tmp, "batch.jsonl")
+        with open(manifest, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"path": "one.jsonl"}) + "\n" + json.dumps({"path": "missing.json"}) + "\n")
+        write_book(make_book(3), os.path.join(self.tmp, "one.jsonl"))
+
+        books = iter_manifest(manifest)
+        name, book_data = next(books)
+        self.assertEqual((name, len(book_data['pages'])), ("one.jsonl", 3))
+        with self.assertRaises(FileNotFoundError):
+            next(books)
+
+    def test_jsonl_books_through_batch_and_async(self):
+        books_dir = os.path.join(self.tmp, "catalog")
+        os.makedirs(books_dir)
+        for i in range(3):
+            book = make_book(12)
+            book['cover']['title'] = f"Streamed {i}"
+            write_book(book, os.path.join(books_dir, f"book{i}.jsonl"))
+
+        progress = BatchGenerator(self.generator, workers=2).run(books_dir)
+        self.assertEqual([(book.done, book.failed) for book in progress], [(13, 0)] * 3)
+        self.assertTrue(os.path.exists(os.path.join(progress[2].book_dir, "12_page.png")))
+
+        progress = AsyncBookGenerator(self.generator, concurrency=2).run(iter_manifest(books_dir))
+        self.assertEqual([(book.done, book.failed) for book in progress], [(13, 0)] * 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import multiprocessing
+import os
+import tempfile
+import time
+from PIL import Image
+from src.backends.page_painter_fake import PagePainter
+from src.core.book_cover_fake import BookCover
+from src.core.book_generator import BookGenerator
+from src.core.work_queue import Coordinator, Worker, WorkQueue
+
+BOOK = {
+    "book_settings": {"art_style": "watercolor"},
+    "cover": {"title": "Sharded", "author": "A", "illustrator": "B"},
+    "pages": [{"text": f"Page {i}", "description": f"scene {i}"} for i in range(1, 9)],
+}
+
+def run_worker(directory, lease_seconds):
+    generator = BookGenerator(backend="fake", page_maker=PagePainter(latency=0.05), cover_maker=BookCover())
+    Worker(generator, WorkQueue(directory, lease_seconds=lease_seconds)).run(idle_timeout=1.0, poll_interval=0.05)
+
+class TestWorkQueue(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def test_claim_complete_and_retry(self):
+        queue = WorkQueue(os.path.join(self.tmp, "queue"), max_attempts=2)
+        queue.publish({"id": "a"})
+        task = queue.claim()
+        self.assertEqual(task['id'], "a")
+        self.assertIsNone(queue.claim())
+
+        queue.fail(task, "boom")
+        self.assertEqual(queue.counts()['pending'], 1)
+        queue.fail(queue.claim(), "boom again")
+        state, task = queue.result("a")
+        self.assertEqual((state, task['attempts'], task['error']), ("failed", 2, "boom again"))
+
+        queue.publish({"id": "b"})
+        queue.complete(queue.claim())
+        self.assertEqual(queue.result("b")[0], "done")
+
+    def test_expired_lease_goes_back_to_pending(self):
+        queue = WorkQueue(os.path.join(self.tmp, "queue"), lease_seconds=0.2)
+        queue.publish({"id": "a"})
+        task = queue.claim()
+        self.assertEqual(queue.requeue_expired(), 0)
+        time.sleep(0.3)
+        self.assertEqual(queue.requeue_expired(), 1)
+        self.assertFalse(queue.renew(task))
+        self.assertEqual(queue.claim()['id'], "a")
+
+    def test_book_on_worker_processes(self):
+        directory = os.path.join(self.tmp, "queue")
+        queue = WorkQueue(directory, lease_seconds=0.5)
+        generator = BookGenerator(backend="fake", page_maker=PagePainter(), cover_maker=BookCover(),
+                                  output_dir=self.tmp)
+        coordinator = Coordinator(generator, queue, poll_interval=0.05)
+        progress, task_ids = coordinator.publish_book(BOOK)
+        # A worker that died holding a task
+        queue.claim()
+
+        workers = [multiprocessing.Process(target=run_worker, args=(directory, 0.5)) for _ in range(3)]
+        for process in workers:
+            process.start()
+        try:
+            coordinator.wait(progress, task_ids, timeout=60)
+        finally:
+            for process in workers:
+                process.join(timeout=30)
+
+        self.assertEqual((progress.done, progress.failed), (9, 0))
+        self.assertEqual(sorted(os.listdir(progress.book_dir)),
+                         ["00_cover.png"] + [f"{i:02d}_page.png" for i in range(1, 9)])
+        self.assertEqual(queue.counts(), {"pending": 0, "leased": 0, "done": 9, "failed": 0})
+
+    def test_workers_write_the_published_encoding(self):
+        queue = WorkQueue(os.path.join(self.tmp, "queue"))
+        coordinator = Coordinator(
+            BookGenerator(backend="fake", page_maker=PagePainter(), cover_maker=BookCover(), output_dir=self.tmp,
+                          encoding="webp:80", encoders=0),
+            queue
+        )
+        progress, task_ids = coordinator.publish_book(dict(BOOK, pages=BOOK['pages'][:2]))
+
+        # A worker started with another encoding switches to the one of the tasks
+        generator = BookGenerator(backend="fake", page_maker=PagePainter(), cover_maker=BookCover(),
+                                  encoding="png:1", encoders=0)
+        worker = Worker(generator, queue)
+        while worker.run_one():
+            pass
+        coordinator.wait(progress, task_ids, timeout=10)
+
+        self.assertEqual(sorted(os.listdir(progress.book_dir)), ["00_cover.webp", "01_page.webp", "02_page.webp"])
+        for name in os.listdir(progress.book_dir):
+            with Image.open(os.path.join(progress.book_dir, name)) as image:
+                self.assertEqual(image.format, "WEBP")
+
+if __name__ == '__main__':
+    unittest.main()